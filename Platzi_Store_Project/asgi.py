@@ -5,6 +5,19 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Ejecutar el proyecto con un servidor ASGI:
+
+    pip install -r Platzi_Store_Project/requirements.txt
+    uvicorn Platzi_Store_Project.asgi:application --workers 4 --port 8001
+
+Al arrancar por aquí se activan las vistas asíncronas de products/async_views.py
+(PRODUCTS_ASYNC_VIEWS=1), que consultan la API de Platzi con httpx sin ocupar
+un hilo por petición. Con PRODUCTS_ASYNC_VIEWS=0 se sirven las vistas
+síncronas de siempre, útil para comparar:
+
+    gunicorn Platzi_Store_Project.wsgi:application --workers 4 --threads 8 --port 8000
+    python manage.py loadtest http://127.0.0.1:8000/products/ http://127.0.0.1:8001/products/
 """
 
 import os
@@ -12,5 +25,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Platzi_Store_Project.settings")
+os.environ.setdefault("PRODUCTS_ASYNC_VIEWS", "1")
 
 application = get_asgi_application()
+
+# Precarga las categorías en memoria antes de la primera petición
+from products.categories import category_cache  # noqa: E402
+
+category_cache.start()
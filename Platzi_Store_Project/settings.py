@@ -23,29 +23,6 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/products/'
 
 
-STATIC_URL = '/static/'
-STATICFILES_DIRS = [
-    BASE_DIR / "static",
-    ]
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [
-            BASE_DIR / 'products/templates',
-        ],
-        'APP_DIRS': True,
-        'OPTIONS': { 
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        }
-    }
-]
-
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -76,33 +53,181 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
+    # Límites de accounts/throttling.py (por usuario o por IP)
+    'DEFAULT_THROTTLE_RATES': {
+        'check_username': os.environ.get('THROTTLE_CHECK_USERNAME', '60/min'),
+        'login': os.environ.get('THROTTLE_LOGIN', '10/min'),
+        'register': os.environ.get('THROTTLE_REGISTER', '5/min'),
+    },
+}
+
+# Cliente de la API externa de Platzi (ver products/services.py)
+PLATZI_API = {
+    'BASE_URL': os.environ.get('PLATZI_API_BASE_URL', 'https://api.escuelajs.co/api/v1'),
+    'POOL_MAXSIZE': int(os.environ.get('PLATZI_API_POOL_MAXSIZE', 20)),
+    'MAX_RETRIES': int(os.environ.get('PLATZI_API_MAX_RETRIES', 3)),
+    'BACKOFF_FACTOR': float(os.environ.get('PLATZI_API_BACKOFF_FACTOR', 0.3)),
+    # Coalescencia de GET idénticos también entre workers (products/singleflight.py)
+    'SINGLE_FLIGHT_CROSS_PROCESS': os.environ.get('PLATZI_API_SINGLE_FLIGHT_CROSS_PROCESS', '0') == '1',
+}
+
+# Usa las vistas asíncronas de products/async_views.py (httpx) para las
+# páginas de lectura. asgi.py lo activa por defecto; con WSGI queda apagado.
+PRODUCTS_ASYNC_VIEWS = os.environ.get('PRODUCTS_ASYNC_VIEWS', '0') == '1'
+
+# Operaciones en lote (POST /api/products/bulk/, ver products/bulk.py)
+PRODUCTS_BULK = {
+    'MAX_ITEMS': 500,
+    'MAX_WORKERS': int(os.environ.get('PRODUCTS_BULK_MAX_WORKERS', 8)),
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF_FACTOR': 0.5,
+}
+
+# Escrituras diferidas: crear/editar/eliminar se guardan en la tabla
+# OutboxOperation y responden al momento; `manage.py drain_outbox` las envía
+# a la API (ver products/outbox.py). Apagado, las vistas esperan a la API.
+PRODUCTS_OUTBOX = {
+    'ENABLED': os.environ.get('PRODUCTS_OUTBOX', '0') == '1',
+    'BATCH_SIZE': int(os.environ.get('PRODUCTS_OUTBOX_BATCH_SIZE', 20)),
+    'MAX_WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_FACTOR': 2,
+}
+
+# Caché
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# El catálogo usa un backend en disco por defecto para que todos los
+# workers compartan las entradas y la invalidación tras crear/editar/eliminar.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "products": {
+        "BACKEND": os.environ.get(
+            "PRODUCTS_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ.get(
+            "PRODUCTS_CACHE_LOCATION", str(BASE_DIR / ".cache" / "products")
+        ),
+    },
+    # Fragmentos de plantilla ({% cache %}) de las tarjetas de producto y del
+    # resumen de pago. La clave incluye id y updatedAt, así que nunca quedan
+    # obsoletos y basta con la memoria de cada proceso
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "template-fragments",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("TEMPLATE_FRAGMENTS_MAX_ENTRIES", 5000))},
+    },
+    # Token -> usuario de la API (accounts/authentication.py). Compartida entre
+    # workers para que cerrar sesión invalide el token en todos
+    "auth": {
+        "BACKEND": os.environ.get(
+            "AUTH_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ.get(
+            "AUTH_CACHE_LOCATION", str(BASE_DIR / ".cache" / "auth")
+        ),
+    },
+}
+
+# Segundos que se recuerda la relación token -> usuario sin consultar la BD
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 60))
+
+# Segundos que una lista o un producto permanecen en caché
+PRODUCTS_CACHE_TTL = int(os.environ.get("PRODUCTS_CACHE_TTL", 300))
+
+# Segundos que se conserva la última lista buena de cada consulta, que se
+# sirve como desactualizada si la API cae
+PRODUCTS_CACHE_LAST_GOOD_TTL = int(os.environ.get("PRODUCTS_CACHE_LAST_GOOD_TTL", 7 * 24 * 3600))
+
+# Cada cuántos segundos se recargan las categorías en memoria (products/categories.py)
+CATEGORY_REFRESH_INTERVAL = int(os.environ.get("CATEGORY_REFRESH_INTERVAL", 3600))
+
+# Miniaturas de /img/<id>/<tamaño> (products/thumbnails.py)
+PRODUCTS_THUMBNAILS = {
+    "DIR": os.environ.get("PRODUCTS_THUMBNAILS_DIR", str(BASE_DIR / ".cache" / "thumbnails")),
+    "SIZES": (160, 320, 640),
+    "MAX_BYTES": int(os.environ.get("PRODUCTS_THUMBNAILS_MAX_MB", 256)) * 1024 * 1024,
+    "ALLOW_PRIVATE_HOSTS": os.environ.get("PRODUCTS_THUMBNAILS_ALLOW_PRIVATE", "0") == "1",
 }
 
+# Compresión de respuestas (products/middleware.py)
+COMPRESSION = {
+    "MIN_SIZE": int(os.environ.get("COMPRESSION_MIN_SIZE", 512)),
+    "BROTLI_QUALITY": int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4)),
+}
+
+# Caché de página completa de inicio, listado y pago para visitantes anónimos
+# (products/pagecache.py). PAGE_CACHE_TIMEOUT=0 la desactiva
+PAGE_CACHE = {
+    "ALIAS": os.environ.get("PAGE_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.environ.get("PAGE_CACHE_TIMEOUT", 30)),
+}
+
+# Token para leer /metrics (cabecera "Authorization: Bearer <token>");
+# sin token /metrics solo responde con DEBUG activado
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Tarjetas por bloque en el listado en streaming (products/streaming.py)
+PRODUCTS_STREAM_CHUNK_SIZE = int(os.environ.get("PRODUCTS_STREAM_CHUNK_SIZE", 50))
+
+# Límite inferior de cada rango de precio en los filtros del listado
+# (products/aggregates.py); el último rango no tiene tope
+PRODUCTS_PRICE_BUCKETS = (0, 10, 50, 100, 500, 1000)
+
+# Segundos durante los que el espejo local del catálogo (manage.py sync_catalog)
+# se considera fresco y las vistas lo leen en lugar de llamar a la API
+CATALOG_MIRROR_MAX_AGE = int(os.environ.get("CATALOG_MIRROR_MAX_AGE", 900))
+
+# max-age (segundos) de las páginas públicas del catálogo para visitantes anónimos
+PRODUCTS_PAGE_MAX_AGE = int(os.environ.get("PRODUCTS_PAGE_MAX_AGE", 60))
+
 MIDDLEWARE = [
+    # Latencia por vista y cabecera Server-Timing (products/metrics.py)
+    "products.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # gzip/brotli de HTML y JSON; por encima de ConditionalGet para que el
+    # ETag se calcule sobre el contenido sin comprimir
+    "products.middleware.CompressionMiddleware",
+    # ETag sobre el contenido para las respuestas que no traen uno (APIs JSON)
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # 503 si el pool de hashing de contraseñas está saturado (accounts/hashing.py)
+    "accounts.middleware.HashingBusyMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 ROOT_URLCONF = "Platzi_Store_Project.urls"
 
+# Las plantillas se compilan una vez por proceso (cached.Loader), también con
+# DEBUG: runserver vacía esa caché cuando cambia un archivo de plantilla.
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates que además mide cada render (products/metrics.py)
+        "BACKEND": "products.metrics.InstrumentedDjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
         },
     },
 ]
@@ -113,13 +238,93 @@ WSGI_APPLICATION = "Platzi_Store_Project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+# DB_ENGINE=sqlite (por defecto) o postgres.
+#
+# SQLite: WAL permite leer mientras otro proceso escribe, busy_timeout hace
+# que una escritura espere al bloqueo en lugar de fallar con "database is
+# locked" y synchronous=NORMAL es seguro con WAL. Las transacciones empiezan
+# en modo IMMEDIATE para que dos escrituras no choquen al pasar de lectura a
+# escritura.
+#
+# PostgreSQL (requiere psycopg[pool]). Para probar en local con una
+# instancia desechable:
+#   docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=platzi postgres:16
+#   DB_ENGINE=postgres DB_PASSWORD=platzi python manage.py migrate
+# Con DB_POOL=1 cada proceso mantiene un pool de DB_POOL_MIN..DB_POOL_MAX
+# conexiones; si no, se reutiliza una conexión persistente por hilo durante
+# DB_CONN_MAX_AGE segundos (Django no permite ambas cosas a la vez).
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    _db_pool = os.environ.get("DB_POOL", "1") == "1"
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DB_NAME", "platzi_store"),
+            "USER": os.environ.get("DB_USER", "postgres"),
+            "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+            "HOST": os.environ.get("DB_HOST", "localhost"),
+            "PORT": os.environ.get("DB_PORT", "5432"),
+            "CONN_MAX_AGE": 0 if _db_pool else int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.environ.get("DB_POOL_MIN", 2)),
+                    "max_size": int(os.environ.get("DB_POOL_MAX", 10)),
+                    "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+                },
+            } if _db_pool else {},
+        }
     }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DB_NAME", str(BASE_DIR / "db.sqlite3")),
+            "OPTIONS": {
+                "init_command": (
+                    "PRAGMA journal_mode=WAL;"
+                    f"PRAGMA busy_timeout={int(os.environ.get('DB_BUSY_TIMEOUT', 5000))};"
+                    "PRAGMA synchronous=NORMAL;"
+                ),
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+    }
+
+
+# Hashing de contraseñas (accounts/hashers.py y accounts/hashing.py).
+# ALGORITHM: "pbkdf2", "scrypt" o "argon2" (requiere argon2-cffi). Los costes
+# vacíos usan los valores por defecto de Django; al cambiarlos, los hashes
+# existentes se regeneran en el siguiente login.
+PASSWORD_HASHING = {
+    'ALGORITHM': os.environ.get('PASSWORD_HASHER', 'pbkdf2'),
+    'PBKDF2_ITERATIONS': _env_int('PBKDF2_ITERATIONS'),
+    'SCRYPT_WORK_FACTOR': _env_int('SCRYPT_WORK_FACTOR'),
+    'ARGON2_TIME_COST': _env_int('ARGON2_TIME_COST'),
+    'ARGON2_MEMORY_COST': _env_int('ARGON2_MEMORY_COST'),
+    'ARGON2_PARALLELISM': _env_int('ARGON2_PARALLELISM'),
+    # Hilos que calculan hashes a la vez (por defecto la mitad de los núcleos)
+    'WORKERS': _env_int('PASSWORD_HASHING_WORKERS'),
+    # Cálculos en curso o en cola antes de responder 503 (por defecto WORKERS * 4)
+    'MAX_PENDING': _env_int('PASSWORD_HASHING_MAX_PENDING'),
+    'QUEUE_TIMEOUT': 0.5,
 }
 
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+}
+# El primero es el que se usa para hashes nuevos; el resto solo verifica
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHING['ALGORITHM']]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHING['ALGORITHM']
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,13 +359,22 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
-
-
-# settings.py
+#
+# products/static se encuentra con AppDirectoriesFinder (no hace falta
+# STATICFILES_DIRS). Con DEBUG=False hay que ejecutar `manage.py collectstatic`:
+# genera en STATIC_ROOT los archivos con hash, minificados y con variantes
+# .gz/.br (products/storage.py)
 STATIC_URL = '/static/'
-STATICFILES_DIRS = [
-    os.path.join(BASE_DIR, 'products', 'static'),
-]
+STATIC_ROOT = os.environ.get("STATIC_ROOT", str(BASE_DIR / "staticfiles"))
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "products.storage.CompressedManifestStaticFilesStorage"},
+}
+# Servir STATIC_ROOT desde Django (views.archivo_estatico) cuando no hay un
+# servidor web delante. Los archivos con hash llevan Cache-Control immutable
+# de un año; los demás (p. ej. /static/css/styles.css) STATIC_MAX_AGE segundos
+STATIC_SERVE = os.environ.get("STATIC_SERVE", "1") == "1"
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 3600))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -16,11 +16,21 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from products.views import archivo_estatico
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('products.urls')),
     path('', include('accounts.urls')),
 ]
+
+if settings.STATIC_SERVE:
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.STATIC_URL.lstrip("/"))}(?P<path>.+)$', archivo_estatico, name='static'),
+    ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Platzi_Store_Project.settings")
 
 application = get_wsgi_application()
+
+# Precarga las categorías en memoria antes de la primera petición
+from products.categories import category_cache  # noqa: E402
+
+category_cache.start()
@@ -0,0 +1,47 @@
+"""
+TokenAuthentication con caché token -> usuario.
+
+TokenAuthentication hace un JOIN Token+User en la BD en cada petición
+autenticada. Aquí el par (usuario, token) se guarda en la caché "auth"
+durante TOKEN_AUTH_CACHE_TTL segundos, así que la mayoría de las llamadas a
+la API no tocan la BD.
+
+La entrada se borra al cerrar sesión (logout_api) y, mediante las señales de
+accounts/receivers.py, cuando se borra el token o se modifica el usuario
+(p. ej. desactivarlo desde el admin).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+CACHE_ALIAS = 'auth'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _cache_key(key):
+    # La clave del token no se guarda tal cual en el backend de caché
+    return 'token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    if key:
+        _cache().delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        cached = _cache().get(cache_key)
+        if cached is not None:
+            return cached
+        # Tokens inválidos o usuarios inactivos lanzan AuthenticationFailed y no se guardan
+        user, token = super().authenticate_credentials(key)
+        _cache().set(cache_key, (user, token), getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60))
+        return user, token
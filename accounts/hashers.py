@@ -0,0 +1,48 @@
+"""
+Hashers de contraseñas con coste configurable y cálculo en el pool de
+accounts/hashing.py.
+
+Conservan el nombre de algoritmo de los de Django, así que los hashes ya
+guardados siguen siendo válidos. Si cambia el algoritmo preferido
+(PASSWORD_HASHING['ALGORITHM']) o su coste, Django vuelve a generar el hash
+de forma transparente la próxima vez que el usuario inicia sesión.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .hashing import hashing_pool
+
+
+def _cost(name, default):
+    value = getattr(settings, 'PASSWORD_HASHING', {}).get(name)
+    return default if value is None else value
+
+
+class OffloadedHasherMixin:
+    """
+    Calcula encode() y verify() en el pool acotado en lugar del hilo de la petición.
+    """
+
+    def encode(self, *args, **kwargs):
+        return hashing_pool.run(super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        return hashing_pool.run(super().verify, *args, **kwargs)
+
+
+class PBKDF2PasswordHasher(OffloadedHasherMixin, hashers.PBKDF2PasswordHasher):
+    iterations = _cost('PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class ScryptPasswordHasher(OffloadedHasherMixin, hashers.ScryptPasswordHasher):
+    work_factor = _cost('SCRYPT_WORK_FACTOR', hashers.ScryptPasswordHasher.work_factor)
+
+
+class Argon2PasswordHasher(OffloadedHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Requiere argon2-cffi.
+    """
+    time_cost = _cost('ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = _cost('ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
+    parallelism = _cost('ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism)
+
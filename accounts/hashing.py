@@ -0,0 +1,70 @@
+"""
+Pool acotado de hilos para el hashing de contraseñas.
+
+PBKDF2, scrypt y Argon2 liberan el GIL mientras calculan, así que
+ejecutarlos en un pool de PASSWORD_HASHING['WORKERS'] hilos limita cuánta
+CPU se dedica a contraseñas a la vez: una ráfaga de logins o registros hace
+cola aquí en lugar de acaparar todos los núcleos del worker, y el resto de
+vistas sigue respondiendo.
+
+Si ya hay MAX_PENDING cálculos en curso o en cola se lanza HashingBusy y la
+vista responde 503 sin esperar (accounts/middleware.py en las que no lo
+capturan).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+THREAD_PREFIX = 'password-hashing'
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, default)
+
+
+class HashingPool:
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Tras un fork (gunicorn --preload) los hilos del padre no existen en el hijo
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            workers = _setting('WORKERS', None) or max(1, (os.cpu_count() or 1) // 2)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=THREAD_PREFIX)
+            self._slots = threading.BoundedSemaphore(_setting('MAX_PENDING', None) or workers * 4)
+            self._pid = os.getpid()
+
+    def run(self, func, *args, **kwargs):
+        """
+        Ejecuta func en el pool y espera su resultado.
+
+        Las llamadas hechas desde un hilo del pool (p. ej. verify() que llama
+        a encode()) se ejecutan directamente para no bloquear el pool.
+        """
+        if threading.current_thread().name.startswith(THREAD_PREFIX):
+            return func(*args, **kwargs)
+        self._ensure_started()
+        if not self._slots.acquire(timeout=_setting('QUEUE_TIMEOUT', 0.5)):
+            raise HashingBusy('Demasiadas operaciones de contraseña en curso.')
+        try:
+            return self._executor.submit(func, *args, **kwargs).result()
+        finally:
+            self._slots.release()
+
+
+hashing_pool = HashingPool()
@@ -0,0 +1,110 @@
+"""
+Índice en memoria de nombres de usuario y emails registrados.
+
+Sirve para responder "disponible" sin consultar la BD: si un valor no está
+en el índice, no existe. Si está, puede ser un usuario ya borrado o
+renombrado, así que esa respuesta siempre se confirma con la BD.
+
+Cada proceso carga el índice desde la BD la primera vez y lo mantiene al
+día con dos contadores en la caché "auth" que incrementan las señales de
+accounts/receivers.py:
+
+- ``users:index:created``: se creó un usuario; basta con leer los usuarios
+  con id mayor que el último conocido.
+- ``users:index:changed``: cambió el username o el email de un usuario
+  existente; se recarga el índice completo (es poco frecuente).
+
+Los borrados no hacen falta: un valor de más solo provoca una consulta.
+"""
+import threading
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+
+
+CREATED_KEY = 'users:index:created'
+CHANGED_KEY = 'users:index:changed'
+
+
+def _cache():
+    return caches['auth']
+
+
+def _bump(key):
+    cache = _cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La entrada desapareció entre add() e incr()
+        cache.set(key, 1, timeout=None)
+
+
+def user_created():
+    _bump(CREATED_KEY)
+
+
+def user_changed():
+    _bump(CHANGED_KEY)
+
+
+class UserIndex:
+
+    def __init__(self):
+        self._usernames = set()
+        self._emails = set()
+        self._max_pk = 0
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def _shared_versions(self):
+        values = _cache().get_many([CREATED_KEY, CHANGED_KEY])
+        return values.get(CREATED_KEY, 0), values.get(CHANGED_KEY, 0)
+
+    def sync(self):
+        versions = self._shared_versions()
+        if versions == self._versions:
+            return
+        with self._lock:
+            if self._versions is None or versions[1] != self._versions[1]:
+                self._rebuild()
+            else:
+                self._load(User.objects.filter(pk__gt=self._max_pk))
+            self._versions = versions
+
+    def _rebuild(self):
+        self._usernames = set()
+        self._emails = set()
+        self._max_pk = 0
+        self._load(User.objects.all())
+
+    def _load(self, queryset):
+        for pk, username, email in queryset.values_list('pk', 'username', 'email').iterator():
+            self._usernames.add(username)
+            if email:
+                self._emails.add(email)
+            self._max_pk = max(self._max_pk, pk)
+
+    def add(self, user):
+        """
+        Añade un usuario recién guardado en este proceso sin esperar a sync().
+        """
+        with self._lock:
+            self._usernames.add(user.username)
+            if user.email:
+                self._emails.add(user.email)
+
+    def username_taken(self, username):
+        self.sync()
+        if username not in self._usernames:
+            return False
+        return User.objects.filter(username=username).exists()
+
+    def email_taken(self, email):
+        self.sync()
+        if email not in self._emails:
+            return False
+        return User.objects.filter(email=email).exists()
+
+
+user_index = UserIndex()
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+from accounts.hashing import HashingBusy
+from products.management.commands.loadtest import percentile
+
+
+def run_verifies(hasher, encoded, clients, duration):
+    """
+    `clients` hilos verifican la contraseña en bucle durante `duration`
+    segundos, como logins concurrentes. Devuelve latencias (s) y rechazos.
+    """
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal rejected
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                hasher.verify('benchmark-password', encoded)
+            except HashingBusy:
+                with lock:
+                    rejected += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, rejected
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántos logins por segundo y por núcleo soporta cada hasher de "
+        "PASSWORD_HASHERS con el coste configurado (verificación a través del "
+        "pool de accounts/hashing.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('algorithms', nargs='*', help="Algoritmos a medir (por defecto pbkdf2_sha256, scrypt y argon2).")
+        parser.add_argument('--clients', type=int, default=os.cpu_count() or 1, help="Logins concurrentes.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Segundos por algoritmo.")
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        algorithms = options['algorithms'] or ['pbkdf2_sha256', 'scrypt', 'argon2']
+        header = f"{'Algoritmo':<15} {'logins/s':>9} {'/núcleo':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'503':>6}"
+        self.stdout.write(f"{cores} núcleos, {options['clients']} clientes concurrentes")
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for algorithm in algorithms:
+            try:
+                hasher = get_hasher(algorithm)
+                encoded = hasher.encode('benchmark-password', hasher.salt())
+            except ValueError as exc:
+                self.stdout.write(f"{algorithm:<15} no disponible: {exc}")
+                continue
+            latencies, rejected = run_verifies(hasher, encoded, options['clients'], options['duration'])
+            rate = len(latencies) / options['duration']
+            self.stdout.write(
+                f"{algorithm:<15} {rate:>9.1f} {rate / cores:>9.1f} "
+                f"{percentile(latencies, 50) * 1000:>9.1f} "
+                f"{percentile(latencies, 95) * 1000:>9.1f} "
+                f"{percentile(latencies, 99) * 1000:>9.1f} "
+                f"{rejected:>6}"
+            )
@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from products.management.commands.loadtest import percentile
+
+
+PREFIX = 'bench_'
+
+
+def _remote_addr(run, number, i):
+    # IP distinta por petición: los límites de accounts/throttling.py son por IP
+    return f'10.{(run + number) % 256}.{i // 256 % 256}.{i % 256}'
+
+
+def run_phase(requests_per_client, clients, make_request):
+    """
+    Lanza `clients` hilos (cada uno con su conexión a la BD) que hacen
+    `requests_per_client` peticiones. Devuelve latencias (s), errores y
+    duración total.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(number):
+        http = Client()
+        try:
+            for i in range(requests_per_client):
+                start = time.perf_counter()
+                try:
+                    response = make_request(http, number, i)
+                    error = None if response.status_code < 400 else f'HTTP {response.status_code}'
+                except Exception as exc:
+                    error = f'{type(exc).__name__}: {exc}'
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                    if error:
+                        errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la contención de escritura en la BD configurada: registros y "
+        "logins concurrentes contra register_api y login_api. Crea usuarios "
+        f"'{PREFIX}*' y los borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16, help="Hilos concurrentes.")
+        parser.add_argument('--requests', type=int, default=20, help="Peticiones por hilo y fase.")
+        parser.add_argument(
+            '--real-hashing', action='store_true',
+            help="Usar los hashers configurados (por defecto MD5, para medir solo la BD).",
+        )
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:6]
+        run = int(run_id, 16)
+        password = 'bench-password'
+
+        def username(number, i):
+            return f'{PREFIX}{run_id}_{number}_{i}'
+
+        def register(http, number, i):
+            return http.post(reverse('accounts:api_register'), {
+                'username': username(number, i), 'email': f'{username(number, i)}@bench.local',
+                'password': password, 'password2': password,
+            }, content_type='application/json', REMOTE_ADDR=_remote_addr(run, number, i))
+
+        def login(http, number, i):
+            return http.post(reverse('accounts:api_login'), {
+                'username': username(number, i), 'password': password,
+            }, content_type='application/json', REMOTE_ADDR=_remote_addr(run, number, i))
+
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if not options['real_hashing']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        vendor = connection.vendor
+        self.stdout.write(f"BD: {vendor} ({connection.settings_dict['NAME']}), {options['clients']} clientes")
+        header = f"{'Fase':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        try:
+            with override_settings(**overrides):
+                for name, make_request in (('registro', register), ('login', login)):
+                    latencies, errors, elapsed = run_phase(options['requests'], options['clients'], make_request)
+                    self.stdout.write(
+                        f"{name:<10} {len(latencies) / elapsed:>9.1f} "
+                        f"{percentile(latencies, 50) * 1000:>9.1f} "
+                        f"{percentile(latencies, 95) * 1000:>9.1f} "
+                        f"{percentile(latencies, 99) * 1000:>9.1f} "
+                        f"{len(errors):>8}"
+                    )
+                    for error in sorted(set(errors))[:5]:
+                        self.stdout.write(f"    {error}")
+        finally:
+            User.objects.filter(username__startswith=f'{PREFIX}{run_id}_').delete()
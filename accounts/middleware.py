@@ -0,0 +1,26 @@
+from django.http import HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .hashing import HashingBusy
+
+
+MESSAGE = 'Servicio ocupado, inténtelo de nuevo en unos segundos'
+
+
+class HashingBusyMiddleware(MiddlewareMixin):
+    """
+    Responde 503 con Retry-After cuando el pool de hashing (accounts/hashing.py)
+    está saturado, en cualquier vista que autentique o cambie contraseñas: el
+    login del admin, UserLoginSerializer, cambios de contraseña... login_api y
+    register_api ya lo hacen por su cuenta con el mismo mensaje.
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+        if 'text/html' in request.headers.get('Accept', ''):
+            response = HttpResponse(MESSAGE, status=503, content_type='text/plain; charset=utf-8')
+        else:
+            response = JsonResponse({'success': False, 'message': MESSAGE}, status=503)
+        response.headers['Retry-After'] = '1'
+        return response
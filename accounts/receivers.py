@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import index
+from .authentication import invalidate_token
+
+
+def _only_fields(update_fields, fields):
+    return bool(update_fields) and set(update_fields) <= fields
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # login() solo actualiza last_login: el usuario cacheado sigue siendo válido
+    if _only_fields(update_fields, {'last_login'}):
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+# Campos del índice de accounts/index.py
+INDEXED_FIELDS = ('username', 'email')
+
+
+def _indexed_values(instance):
+    # Sin acceder a los campos diferidos, que harían una consulta
+    return tuple(instance.__dict__.get(field) for field in INDEXED_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_indexed_values(sender, instance, **kwargs):
+    instance._indexed_values = _indexed_values(instance)
+
+
+@receiver(post_save, sender=User)
+def update_user_index(sender, instance, created=False, update_fields=None, **kwargs):
+    # El login, el rehash de la contraseña, etc. no tocan username/email
+    if update_fields and not set(update_fields) & set(INDEXED_FIELDS):
+        return
+    values = _indexed_values(instance)
+    loaded = getattr(instance, '_indexed_values', None)
+    instance._indexed_values = values
+    if not created and values == loaded:
+        return
+    index.user_index.add(instance)
+    transaction.on_commit(index.user_created if created else index.user_changed)
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 
+from .index import user_index
+
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
@@ -46,8 +48,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def validate_email(self, value):
         """
         Valida que el email no esté ya registrado en el sistema.
+        Solo consulta la BD si el email aparece en el índice en memoria.
         """
-        if User.objects.filter(email=value).exists():
+        if user_index.email_taken(value):
             raise serializers.ValidationError(
                 'Ya existe un usuario con este correo electrónico'
             )
@@ -1,3 +1,184 @@
-from django.test import TestCase
+"""
+Pruebas de accounts.
+"""
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from . import index
+from .authentication import CACHE_ALIAS, _cache_key
+from .hashing import HashingBusy, HashingPool, hashing_pool
+from .throttling import AccountsRateThrottle
+
+
+# Cachés en memoria y separadas por alias: las pruebas no tocan .cache/
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in settings.CACHES
+}
+
+
+# ---------------------------
+# CACHÉ DE TOKENS (authentication.py)
+# ---------------------------
+@override_settings(CACHES=TEST_CACHES)
+class TokenCacheTests(TestCase):
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.user = User.objects.create_user('cliente', password='x')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    def _cached(self):
+        return caches[CACHE_ALIAS].get(_cache_key(self.token.key))
+
+    def test_profile_caches_token(self):
+        self.assertEqual(self.client.get(reverse('accounts:api_profile'), **self.auth).status_code, 200)
+        user, token = self._cached()
+        self.assertEqual((user.pk, token.key), (self.user.pk, self.token.key))
+
+    def test_logout_invalidates(self):
+        self.client.get(reverse('accounts:api_profile'), **self.auth)
+        self.assertEqual(self.client.post(reverse('accounts:api_logout'), **self.auth).status_code, 200)
+        self.assertIsNone(self._cached())
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(self.client.get(reverse('accounts:api_profile'), **self.auth).status_code, 401)
+
+    def test_user_save_invalidates(self):
+        self.client.get(reverse('accounts:api_profile'), **self.auth)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self._cached())
+        self.assertEqual(self.client.get(reverse('accounts:api_profile'), **self.auth).status_code, 401)
+
+    def test_last_login_keeps_cache(self):
+        self.client.get(reverse('accounts:api_profile'), **self.auth)
+        self.user.save(update_fields=['last_login'])
+        self.assertIsNotNone(self._cached())
+
+
+# ---------------------------
+# ÍNDICE DE USUARIOS (index.py, receivers.py)
+# ---------------------------
+@override_settings(CACHES=TEST_CACHES)
+class UserIndexSignalTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('cliente', email='a@example.com', password='x')
+
+    def test_only_username_or_email_changes_bump(self):
+        with mock.patch.object(index, 'user_changed') as user_changed, \
+                mock.patch('django.db.transaction.on_commit', lambda func: func()):
+            self.user.first_name = 'Ana'
+            self.user.save()
+            User.objects.get(pk=self.user.pk).save()
+            self.assertEqual(user_changed.call_count, 0)
+
+            self.user.email = 'b@example.com'
+            self.user.save()
+            self.assertEqual(user_changed.call_count, 1)
+            # Guardarlo otra vez sin cambios no vuelve a avisar
+            self.user.save()
+            self.assertEqual(user_changed.call_count, 1)
+
+
+# ---------------------------
+# LÍMITES DE PETICIONES (throttling.py)
+# ---------------------------
+@override_settings(CACHES=TEST_CACHES)
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        # DRF lee la caché y las tasas al importar las clases
+        for name, value in (('cache', caches['auth']), ('THROTTLE_RATES', {
+            'check_username': '3/min', 'login': '2/min', 'register': '1/min',
+        })):
+            patcher = mock.patch.object(AccountsRateThrottle, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        caches['auth'].clear()
+
+    def _check(self, ip='10.0.0.1', **extra):
+        return self.client.get(reverse('accounts:api_check_username'), {'username': 'ana'}, REMOTE_ADDR=ip, **extra)
+
+    def test_limit_per_ip(self):
+        for _ in range(3):
+            self.assertEqual(self._check().status_code, 200)
+        response = self._check()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Otra IP tiene su propio límite
+        self.assertEqual(self._check(ip='10.0.0.2').status_code, 200)
+
+    def test_limit_per_user_with_token(self):
+        token = Token.objects.create(user=User.objects.create_user('cliente', password='x'))
+        auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self._check(ip=ip, **auth).status_code, 200)
+        self.assertEqual(self._check(ip='10.0.0.4', **auth).status_code, 429)
+        # Sin token, la IP no había gastado nada
+        self.assertEqual(self._check(ip='10.0.0.4').status_code, 200)
+
+    def test_login_limit_is_separate(self):
+        for _ in range(3):
+            self._check()
+        data = {'username': 'nadie', 'password': 'mala'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('accounts:api_login'), data, REMOTE_ADDR='10.0.0.1').status_code, 401)
+        self.assertEqual(self.client.post(reverse('accounts:api_login'), data, REMOTE_ADDR='10.0.0.1').status_code, 429)
+
+
+# ---------------------------
+# POOL DE HASHING (hashing.py, middleware.py)
+# ---------------------------
+@override_settings(CACHES=TEST_CACHES)
+class HashingBusyTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(AccountsRateThrottle, 'cache', caches['auth'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_rejects_when_full(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'hecho'
+
+        with self.settings(PASSWORD_HASHING={'WORKERS': 1, 'MAX_PENDING': 1, 'QUEUE_TIMEOUT': 0.01}):
+            pool = HashingPool()
+            results = []
+            worker = threading.Thread(target=lambda: results.append(pool.run(slow)))
+            worker.start()
+            started.wait(5)
+            with self.assertRaises(HashingBusy):
+                pool.run(lambda: 'otro')
+            release.set()
+            worker.join(5)
+            self.assertEqual(results, ['hecho'])
+            self.assertEqual(pool.run(lambda: 'otro'), 'otro')
+
+    def test_login_api_answers_503(self):
+        User.objects.create_user('cliente', password='x')
+        with mock.patch.object(hashing_pool, 'run', side_effect=HashingBusy('ocupado')):
+            response = self.client.post(reverse('accounts:api_login'), {'username': 'cliente', 'password': 'x'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_admin_login_answers_503(self):
+        User.objects.create_user('cliente', password='x')
+        with mock.patch.object(hashing_pool, 'run', side_effect=HashingBusy('ocupado')):
+            response = self.client.post(
+                reverse('admin:login'), {'username': 'cliente', 'password': 'x'}, HTTP_ACCEPT='text/html',
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
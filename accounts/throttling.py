@@ -0,0 +1,26 @@
+"""
+Límites de peticiones para los endpoints públicos de cuentas.
+
+Se limita por usuario si la petición trae token y si no por IP (lo hace
+UserRateThrottle). Las tasas están en REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+Los contadores van en la caché "auth", compartida entre workers, para que el
+límite no se multiplique por el número de procesos.
+"""
+from django.core.cache import caches
+from rest_framework.throttling import UserRateThrottle
+
+
+class AccountsRateThrottle(UserRateThrottle):
+    cache = caches['auth']
+
+
+class CheckUsernameThrottle(AccountsRateThrottle):
+    scope = 'check_username'
+
+
+class LoginThrottle(AccountsRateThrottle):
+    scope = 'login'
+
+
+class RegisterThrottle(AccountsRateThrottle):
+    scope = 'register'
@@ -1,12 +1,14 @@
-from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework import status
+from .authentication import CachedTokenAuthentication, invalidate_token
+from .hashing import HashingBusy
+from .index import user_index
 from .serializers import UserRegistrationSerializer, UserSerializer
+from .throttling import CheckUsernameThrottle, LoginThrottle, RegisterThrottle
 from django.shortcuts import render, redirect
 from django.contrib import messages
 
@@ -21,13 +23,25 @@ def register_view(request):
     return render(request, 'accounts/register.html')
 
 
+def _hashing_busy():
+    # El pool de hashing (accounts/hashing.py) está saturado: mejor reintentar que esperar
+    return Response(
+        {'success': False, 'message': 'Servicio ocupado, inténtelo de nuevo en unos segundos'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'},
+    )
+
+
 # Vista para cerrar sesión
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterThrottle])
 def register_api(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
+        try:
+            user = serializer.save()
+        except HashingBusy:
+            return _hashing_busy()
         token, _ = Token.objects.get_or_create(user=user)
         return Response({'success': True, 'message': 'Usuario registrado', 'user': UserSerializer(user).data, 'token': token.key}, status=status.HTTP_201_CREATED)
     return Response({'success': False, 'message': 'Error en registro', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -35,12 +49,16 @@ def register_api(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle])
 def login_api(request):
     username = request.data.get('username')
     password = request.data.get('password')
     if not username or not password:
         return Response({'success': False, 'message': 'Debe enviar username y password'}, status=status.HTTP_400_BAD_REQUEST)
-    user = authenticate(username=username, password=password)
+    try:
+        user = authenticate(username=username, password=password)
+    except HashingBusy:
+        return _hashing_busy()
     if user:
         login(request, user)
         token, _ = Token.objects.get_or_create(user=user)
@@ -49,15 +67,17 @@ def login_api(request):
 
 
 @api_view(['POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def logout_api(request):
     """
     Endpoint API para cerrar sesión usando token.
     """
     try:
-        # Eliminamos el token del usuario
-        request.user.auth_token.delete()
+        # Eliminamos el token del usuario y su entrada en la caché de autenticación
+        token = request.user.auth_token
+        invalidate_token(token.key)
+        token.delete()
     except Token.DoesNotExist:
         return Response({"success": False, "message": "Token no encontrado"}, status=400)
 
@@ -67,7 +87,7 @@ def logout_api(request):
 
 
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def profile_api(request):
     user = request.user
@@ -76,9 +96,10 @@ def profile_api(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([CheckUsernameThrottle])
 def check_username_api(request):
     username = request.GET.get('username', '')
     if not username:
         return Response({'success': False, 'message': 'Debe enviar un username'}, status=400)
-    exists = User.objects.filter(username=username).exists()
+    exists = user_index.username_taken(username)
     return Response({'success': True, 'available': not exists}, status=200)
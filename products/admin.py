@@ -1,3 +1,34 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CatalogSync, Category, OutboxOperation, Product, ProductImage
+
+
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    extra = 0
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'price', 'category', 'updated_at')
+    list_filter = ('category',)
+    search_fields = ('title',)
+    inlines = [ProductImageInline]
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'slug')
+
+
+@admin.register(CatalogSync)
+class CatalogSyncAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_at', 'created', 'updated', 'deleted', 'unchanged')
+
+
+@admin.register(OutboxOperation)
+class OutboxOperationAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'op', 'product_id', 'status', 'attempts', 'next_attempt_at')
+    list_filter = ('status', 'op')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('idempotency_key', 'created_at', 'updated_at')
@@ -0,0 +1,346 @@
+"""
+Agregados del catálogo para los filtros del listado: productos por
+categoría, precio mínimo, máximo y medio (global y por categoría) y
+productos por rango de precio.
+
+Se calculan en una sola pasada vectorizada sobre el catálogo completo (el
+espejo si está fresco; si no, la lista completa de ProductCache), con el
+precio y la categoría como columnas de NumPy. El resultado se guarda en la
+caché de productos junto con la versión del catálogo y las columnas: al
+crear, editar o eliminar un producto (receivers.py) se parchea su fila y se
+recalculan los agregados sin volver a leer el catálogo.
+
+Leer el catálogo completo nunca ocurre al atender una petición: si no hay
+agregados, o son de otra versión del catálogo, se recalculan en un hilo en
+segundo plano (o al terminar ``manage.py sync_catalog``). Mientras tanto el
+listado se muestra sin conteos, o con los de la versión anterior.
+
+Los rangos de precio son [min, max): los enlaces del listado filtran hasta
+max - PRICE_STEP, porque price_max incluye el límite.
+
+Sin NumPy se hace el mismo cálculo en Python puro.
+"""
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.db import connection
+
+from . import mirror
+from .breaker import is_upstream_failure
+from .cache import product_cache
+from .models import Category, Product
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependencia opcional
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+KEY = 'catalog:aggregates'
+# Precisión de los precios (céntimos): el tope de un rango en los filtros
+PRICE_STEP = 0.01
+# Límites inferiores de cada rango de precio; el último no tiene tope
+DEFAULT_PRICE_BUCKETS = (0, 10, 50, 100, 500, 1000)
+# Categoría de los productos sin categoría
+NO_CATEGORY = 0
+
+
+def price_buckets():
+    return tuple(getattr(settings, 'PRODUCTS_PRICE_BUCKETS', DEFAULT_PRICE_BUCKETS))
+
+
+def _price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _category(producto):
+    return (producto.get('category') or {}).get('id') or producto.get('categoryId') or NO_CATEGORY
+
+
+# ---------------------------
+# COLUMNAS
+# ---------------------------
+def _columns(ids, prices, categories):
+    if np is not None:
+        return (
+            np.asarray(ids, dtype=np.int64),
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(categories, dtype=np.int64),
+        )
+    return list(ids), [float(price) for price in prices], list(categories)
+
+
+def load_columns():
+    """
+    Lee (ids, precios, categorías) y los nombres de las categorías del
+    catálogo completo.
+    """
+    if mirror.is_fresh():
+        return _mirror_columns()
+    try:
+        productos, _ = product_cache.get_products_or_stale({})
+    except requests.exceptions.RequestException as exc:
+        if is_upstream_failure(exc) and mirror.has_data():
+            return _mirror_columns()
+        raise
+    names = {}
+    for producto in productos:
+        category = producto.get('category') or {}
+        if category.get('id'):
+            names[category['id']] = category.get('name', '')
+    columns = _columns(
+        [producto['id'] for producto in productos],
+        [_price(producto.get('price')) for producto in productos],
+        [_category(producto) for producto in productos],
+    )
+    return columns, names
+
+
+def _mirror_columns():
+    rows = list(Product.objects.order_by().values_list('id', 'price', 'category_id'))
+    columns = _columns(
+        [row[0] for row in rows], [float(row[1]) for row in rows], [row[2] or NO_CATEGORY for row in rows],
+    )
+    return columns, dict(Category.objects.values_list('id', 'name'))
+
+
+# ---------------------------
+# CÁLCULO
+# ---------------------------
+def compute(columns, names, buckets=None):
+    """
+    Devuelve los agregados (dict serializable a JSON) de las columnas.
+    """
+    buckets = buckets or price_buckets()
+    ids, prices, categories = columns
+    if not len(ids):
+        return {
+            'count': 0,
+            'price': {'min': None, 'max': None, 'avg': None},
+            'categories': [],
+            'price_buckets': _bucket_rows(buckets, [0] * len(buckets)),
+        }
+    if np is not None:
+        return _compute_numpy(prices, categories, names, buckets)
+    return _compute_python(prices, categories, names, buckets)
+
+
+def _compute_numpy(prices, categories, names, buckets):
+    category_ids, inverse, counts = np.unique(categories, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=prices)
+    mins = np.full(len(category_ids), np.inf)
+    maxs = np.full(len(category_ids), -np.inf)
+    np.minimum.at(mins, inverse, prices)
+    np.maximum.at(maxs, inverse, prices)
+
+    edges = np.asarray(buckets, dtype=np.float64)
+    positions = np.clip(np.searchsorted(edges, prices, side='right') - 1, 0, None)
+    bucket_counts = np.bincount(positions, minlength=len(edges))
+
+    return {
+        'count': int(len(prices)),
+        'price': _stats(float(prices.min()), float(prices.max()), float(prices.sum()), len(prices)),
+        'categories': [
+            _category_row(int(category), names, int(count), float(low), float(high), float(total))
+            for category, count, low, high, total in zip(category_ids, counts, mins, maxs, sums)
+        ],
+        'price_buckets': _bucket_rows(buckets, [int(count) for count in bucket_counts]),
+    }
+
+
+def _compute_python(prices, categories, names, buckets):
+    per_category = {}
+    bucket_counts = [0] * len(buckets)
+    for price, category in zip(prices, categories):
+        row = per_category.get(category)
+        if row is None:
+            per_category[category] = [1, price, price, price]
+        else:
+            row[0] += 1
+            row[1] = min(row[1], price)
+            row[2] = max(row[2], price)
+            row[3] += price
+        position = 0
+        for index, edge in enumerate(buckets):
+            if price >= edge:
+                position = index
+        bucket_counts[position] += 1
+
+    return {
+        'count': len(prices),
+        'price': _stats(min(prices), max(prices), sum(prices), len(prices)),
+        'categories': [
+            _category_row(category, names, *per_category[category]) for category in sorted(per_category)
+        ],
+        'price_buckets': _bucket_rows(buckets, bucket_counts),
+    }
+
+
+def _stats(low, high, total, count):
+    return {'min': low, 'max': high, 'avg': round(total / count, 2)}
+
+
+def _category_row(category, names, count, low, high, total):
+    return {
+        'id': category or None,
+        'name': names.get(category, '') if category else 'Sin categoría',
+        'count': count,
+        'price': _stats(low, high, total, count),
+    }
+
+
+def _bucket_rows(buckets, counts):
+    limits = list(buckets[1:]) + [None]
+    return [
+        {
+            'min': low,
+            'max': high,
+            # Para el filtro ?price_max=, que incluye el límite
+            'price_max': round(high - PRICE_STEP, 2) if high is not None else None,
+            'count': count,
+        }
+        for low, high, count in zip(buckets, limits, counts)
+    ]
+
+
+# ---------------------------
+# CACHÉ
+# ---------------------------
+def _store(version, columns, names):
+    entry = {'version': version, 'columns': columns, 'names': names, 'facets': compute(columns, names)}
+    product_cache.cache.set(KEY, entry, product_cache.timeout)
+    return entry
+
+
+def refresh():
+    """
+    Recalcula desde el catálogo completo los agregados de la versión actual
+    y los devuelve, o None si no se pudo leer el catálogo. Se llama desde el
+    hilo de schedule_refresh y al terminar sync_catalog, nunca en una vista.
+    """
+    version = product_cache.version()
+    try:
+        columns, names = load_columns()
+    except requests.exceptions.RequestException as exc:
+        logger.warning("No se pudieron calcular los agregados del catálogo: %s", exc)
+        return None
+    return _store(version, columns, names)['facets']
+
+
+_refreshing = False
+_refresh_lock = threading.Lock()
+
+
+def schedule_refresh():
+    """
+    Lanza refresh() en un hilo, salvo que ya haya uno en curso en el proceso.
+    """
+    global _refreshing
+    with _refresh_lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+
+def _refresh_in_background():
+    global _refreshing
+    try:
+        refresh()
+    finally:
+        # El hilo abre su propia conexión a la BD (espejo)
+        connection.close()
+        with _refresh_lock:
+            _refreshing = False
+
+
+def get_aggregates():
+    """
+    Agregados guardados para el listado, sin leer nunca el catálogo.
+
+    Si no hay, devuelve None; si son de una versión anterior del catálogo,
+    los devuelve igualmente. En ambos casos agenda el recálculo.
+    """
+    entry = product_cache.cache.get(KEY)
+    if entry is None or entry['version'] != product_cache.version():
+        schedule_refresh()
+    return entry['facets'] if entry is not None else None
+
+
+def listing_context(categorias):
+    """
+    Contexto de la plantilla del listado: ``facets`` (None mientras se
+    calculan) y las categorías del selector con su número de productos.
+    """
+    facets = get_aggregates()
+    return {'facets': facets, 'categorias': with_counts(categorias, facets)}
+
+
+def with_counts(categorias, facets):
+    """
+    Añade ``count`` (productos del catálogo) a cada categoría del selector.
+    """
+    if not facets:
+        return categorias
+    counts = {row['id']: row['count'] for row in facets['categories']}
+    return [{**categoria, 'count': counts.get(categoria['id'], 0)} for categoria in categorias]
+
+
+# ---------------------------
+# ACTUALIZACIÓN INCREMENTAL (receivers.py)
+# ---------------------------
+def _patch(product_id, price=None, category=None, name=None, delete=False):
+    entry = product_cache.cache.get(KEY)
+    if entry is None:
+        return
+    version = product_cache.version()
+    # ProductCache ya subió la versión por esta escritura; si subió más, los
+    # agregados se perdieron otros cambios y hay que recalcularlos
+    if entry['version'] != version - 1:
+        invalidate()
+        return
+    ids, prices, categories = entry['columns']
+    names = entry['names']
+    if name and category not in names:
+        names = {**names, category: name}
+
+    if np is not None:
+        keep = ids != product_id
+        ids, prices, categories = ids[keep], prices[keep], categories[keep]
+        if not delete:
+            ids = np.append(ids, product_id)
+            prices = np.append(prices, price)
+            categories = np.append(categories, category)
+    else:
+        rows = [row for row in zip(ids, prices, categories) if row[0] != product_id]
+        if not delete:
+            rows.append((product_id, price, category))
+        ids, prices, categories = _columns(*zip(*rows)) if rows else _columns([], [], [])
+
+    _store(version, (ids, prices, categories), names)
+
+
+def product_saved(producto, product_id=None):
+    producto = producto or {}
+    product_id = producto.get('id', product_id)
+    if product_id is None or 'price' not in producto:
+        # Sin el producto completo no se puede parchear la fila
+        invalidate()
+        return
+    name = (producto.get('category') or {}).get('name')
+    _patch(product_id, _price(producto.get('price')), _category(producto), name)
+
+
+def product_deleted(product_id):
+    _patch(product_id, delete=True)
+
+
+def invalidate():
+    product_cache.cache.delete(KEY)
@@ -0,0 +1,183 @@
+"""
+API JSON de solo lectura del catálogo (GET /api/products/).
+
+Sale del espejo local si está fresco y si no de la caché/API, igual que el
+listado HTML. Parámetros, además de los filtros y ?sort del listado:
+
+- ``fields``: claves a devolver, separadas por comas. Por defecto todas
+  menos ``category`` (el objeto anidado); ``categoryId`` va siempre que no
+  se pida una lista explícita.
+- ``limit``: productos por página (máximo listing.MAX_LIMIT).
+- ``cursor``: valor de ``next`` de la respuesta anterior.
+
+/api/products/search/?q= usa el buscador de products/search.py con los
+mismos ``fields``, ``limit`` y ``cursor``.
+
+/api/products/facets/ devuelve los agregados del catálogo (products/aggregates.py).
+
+La respuesta se serializa con orjson si está instalado.
+"""
+import base64
+import binascii
+import hashlib
+import json
+
+import requests
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from . import mirror, search
+from .breaker import is_upstream_failure
+from .cache import product_cache
+from .conditional import make_etag
+from .listing import sort_products
+from .models import API_FIELDS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+FIELDS = API_FIELDS + ('categoryId',)
+DEFAULT_FIELDS = tuple(field for field in FIELDS if field != 'category')
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def conditional_json_response(request, data):
+    """
+    Respuesta pública con ETag del cuerpo: si el cliente ya lo tiene, 304.
+    """
+    body = dumps(data)
+    etag = make_etag('api', hashlib.sha1(body).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response.headers['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.PRODUCTS_PAGE_MAX_AGE)
+    return response
+
+
+# ---------------------------
+# PARÁMETROS
+# ---------------------------
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown or not fields:
+        raise InvalidParameter(f'Campos no válidos: {", ".join(unknown)}. Disponibles: {", ".join(FIELDS)}.')
+    return fields
+
+
+def encode_cursor(offset, after):
+    raw = json.dumps({'o': offset, 'a': after}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    Devuelve (offset, id del último producto enviado) del cursor.
+    """
+    if not value:
+        return 0, None
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        data = json.loads(raw)
+        offset, after = int(data['o']), data['a']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidParameter('Cursor no válido.')
+    if offset < 0 or (after is not None and not isinstance(after, int)):
+        raise InvalidParameter('Cursor no válido.')
+    return offset, after
+
+
+# ---------------------------
+# DATOS
+# ---------------------------
+def _project(producto, fields):
+    category = producto.get('category') or {}
+    return {
+        field: category.get('id') if field == 'categoryId' else producto.get(field)
+        for field in fields
+    }
+
+
+def _mirror_rows(query, fields, offset, after):
+    queryset = mirror.filtered_queryset(query).select_related(None).prefetch_related(None)
+    if 'category' in fields:
+        queryset = queryset.select_related('category')
+    if 'images' in fields:
+        queryset = queryset.prefetch_related('images')
+    if after is not None and not query.sort:
+        # Orden por id: paginación por clave, sin OFFSET
+        rows = queryset.filter(id__gt=after)[:query.limit + 1]
+    else:
+        rows = queryset[offset:offset + query.limit + 1]
+    return [producto.to_dict(fields) for producto in rows]
+
+
+def _upstream_rows(query, fields, offset):
+    params = query.filter_params()
+    if query.sort:
+        # La API no ordena: lista filtrada completa (en caché) ordenada en local
+        productos, stale = product_cache.get_products_or_stale(params)
+        productos = sort_products(productos, query.sort)[offset:offset + query.limit + 1]
+    else:
+        params.update(offset=offset, limit=query.limit + 1)
+        productos, stale = product_cache.get_products_or_stale(params)
+    return [_project(producto, fields) for producto in productos], stale
+
+
+def product_list(query, fields, cursor):
+    """
+    Devuelve el cuerpo de la respuesta: results, next y stale.
+    """
+    offset, after = decode_cursor(cursor)
+    stale = False
+    if mirror.is_fresh():
+        rows = _mirror_rows(query, fields, offset, after)
+    else:
+        try:
+            rows, stale = _upstream_rows(query, fields, offset)
+        except requests.exceptions.RequestException as exc:
+            if not (is_upstream_failure(exc) and mirror.has_data()):
+                raise
+            rows, stale = _mirror_rows(query, fields, offset, after), True
+
+    has_next = len(rows) > query.limit
+    rows = rows[:query.limit]
+    next_cursor = None
+    if has_next:
+        last_id = rows[-1].get('id') if 'id' in fields else None
+        next_cursor = encode_cursor(offset + len(rows), last_id)
+    return {'results': rows, 'next': next_cursor, 'stale': stale}
+
+
+def search_results(text, fields, limit, cursor):
+    """
+    Cuerpo de /api/products/search/: results (por relevancia), total y next.
+    """
+    offset, _ = decode_cursor(cursor)
+    productos, total = search.search(text, limit=limit, offset=offset)
+    next_cursor = encode_cursor(offset + len(productos), None) if offset + len(productos) < total else None
+    return {
+        'results': [_project(producto, fields) for producto in productos],
+        'total': total,
+        'next': next_cursor,
+    }
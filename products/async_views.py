@@ -0,0 +1,122 @@
+"""
+Versiones asíncronas de las vistas de lectura de productos.
+
+Se usan en lugar de las de views.py cuando settings.PRODUCTS_ASYNC_VIEWS
+está activo (por defecto al arrancar con Platzi_Store_Project/asgi.py).
+Las llamadas a la API van por AsyncPlatziAPIService (httpx), así que una
+petición lenta no ocupa un hilo. Las categorías salen de la caché en
+memoria de products/categories.py.
+
+El ORM y render() siguen siendo síncronos y se ejecutan con sync_to_async.
+"""
+import requests
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
+
+from . import aggregates, mirror
+from .breaker import is_upstream_failure
+from .cache import product_cache
+from .categories import category_cache
+from .conditional import add_validators, listing_etag, not_modified, private_page, product_etag
+from .listing import SORT_OPTIONS, ListingQuery, aget_product_page
+from .pagecache import anonymous_page_cache
+
+
+arender = sync_to_async(render)
+# Leer los mensajes pendientes toca la sesión (ORM)
+anot_modified = sync_to_async(not_modified)
+# La versión del catálogo está en la caché de archivos
+alisting_etag = sync_to_async(listing_etag)
+aproduct_etag = sync_to_async(product_etag)
+
+
+async def _obtener_producto(product_id):
+    """
+    Lee el producto del espejo local si está fresco; si no, de la caché/API.
+    """
+    if await sync_to_async(mirror.is_fresh)():
+        producto = await sync_to_async(mirror.get_product)(product_id)
+        if producto is not None:
+            return producto
+    try:
+        return await product_cache.aget_product(product_id)
+    except requests.exceptions.RequestException as exc:
+        producto = None
+        if is_upstream_failure(exc):
+            producto = await sync_to_async(mirror.get_product)(product_id)
+        if producto is None:
+            raise
+        return producto
+
+
+# Listar productos
+@anonymous_page_cache
+async def porducts_views(request):
+    query = ListingQuery.from_request(request)
+    try:
+        page = await aget_product_page(query)
+        user = await request.auser()
+        etag = await alisting_etag(request, user, page)
+        response = await anot_modified(request, etag) or await arender(request, "lista_productos.html", {
+            'productos': page.productos,
+            'page': page,
+            'stale': page.stale,
+            'query': query,
+            **await sync_to_async(aggregates.listing_context)(await category_cache.aget()),
+            'sort_options': [(value, label) for value, (_, _, label) in SORT_OPTIONS.items()],
+        })
+        return add_validators(response, user, etag)
+
+    except requests.exceptions.HTTPError as e:
+        return await arender(request, "lista_productos.html", {'error': f"Error en la API: {e.response.status_code}"}, status=502)
+    except requests.exceptions.Timeout:
+        return await arender(request, "lista_productos.html", {'error': 'Tiempo de espera agotado al conectar con la API.'}, status=504)
+    except requests.exceptions.ConnectionError:
+        return await arender(request, "lista_productos.html", {'error': 'Error de conexión. Verifique su conexión a internet.'}, status=503)
+    except Exception as e:
+        return await arender(request, "lista_productos.html", {'error': f'Ocurrió un error inesperado: {str(e)}'}, status=500)
+
+
+# ---------------------------
+# CREAR PRODUCTO
+# ---------------------------
+@login_required
+async def crear_producto_view_form(request):
+    categorias = await category_cache.aget()
+    if not categorias:
+        messages.error(request, "No se pudieron cargar las categorías.")
+    return private_page(await arender(request, "crear_producto.html", {'categorias': categorias}))
+
+
+# ---------------------------
+# EDITAR PRODUCTO
+# ---------------------------
+@login_required
+async def editar_producto_form(request, product_id):
+    try:
+        producto = await _obtener_producto(product_id)
+        return private_page(await arender(request, "editar_producto.html", {
+            'producto': producto,
+            'categorias': await category_cache.aget(),
+        }))
+    except requests.exceptions.RequestException as e:
+        messages.error(request, f"Error al obtener el producto para editar: {e}")
+        return redirect('products:products')
+
+
+# ---------------------------
+# PAGAR PRODUCTO (PUBLICO)
+# ---------------------------
+@anonymous_page_cache
+async def pagar_producto(request, product_id):
+    try:
+        producto = await _obtener_producto(product_id)
+        user = await request.auser()
+        etag = await aproduct_etag(request, user, producto)
+        response = await anot_modified(request, etag) or await arender(request, "pagar_producto.html", {'producto': producto})
+        return add_validators(response, user, etag)
+    except requests.exceptions.RequestException as e:
+        messages.error(request, f"Error al obtener el producto para pago: {e}")
+        return redirect('products:products')
@@ -0,0 +1,165 @@
+"""
+Circuit breaker para las llamadas a la API de Platzi.
+
+El estado se guarda en la caché ``products`` para que todos los workers (y
+el comando ``manage.py circuit_breaker``) vean el mismo circuito.
+
+    closed    -> las peticiones pasan; se cuentan los fallos consecutivos.
+    open      -> se alcanzó el umbral; las peticiones fallan al instante
+                 hasta que pasa RESET_TIMEOUT.
+    half_open -> pasado RESET_TIMEOUT se deja pasar una petición de prueba;
+                 si funciona el circuito se cierra, si no vuelve a abrirse.
+"""
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Se lanza sin llamar a la API mientras el circuito está abierto.
+    """
+
+
+def is_upstream_failure(exc):
+    """
+    Solo los timeouts, errores de conexión y respuestas 5xx cuentan como
+    fallo de la API; un 4xx es un error de la petición, no de la API.
+    """
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return exc.response is not None and exc.response.status_code >= 500
+    return isinstance(exc, requests.exceptions.RequestException)
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, alias='products'):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def failures_key(self):
+        return f'breaker:{self.name}:failures'
+
+    @property
+    def opened_at_key(self):
+        return f'breaker:{self.name}:opened_at'
+
+    @property
+    def trial_key(self):
+        return f'breaker:{self.name}:trial'
+
+    # ---------------------------
+    # ESTADO
+    # ---------------------------
+    def snapshot(self):
+        values = self.cache.get_many([self.failures_key, self.opened_at_key])
+        failures = values.get(self.failures_key, 0)
+        opened_at = values.get(self.opened_at_key)
+        if opened_at is None:
+            state = CLOSED
+            retry_in = 0
+        else:
+            retry_in = max(0.0, opened_at + self.reset_timeout - time.time())
+            state = OPEN if retry_in > 0 else HALF_OPEN
+        return {
+            'name': self.name,
+            'state': state,
+            'failures': failures,
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout,
+            'opened_at': opened_at,
+            'retry_in': retry_in,
+        }
+
+    @property
+    def state(self):
+        return self.snapshot()['state']
+
+    def allow_request(self, snapshot=None):
+        state = (snapshot or self.snapshot())['state']
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            # Solo un worker hace la petición de prueba
+            return self.cache.add(self.trial_key, True, timeout=self.reset_timeout)
+        return False
+
+    def record_success(self):
+        self.cache.delete_many([self.failures_key, self.opened_at_key, self.trial_key])
+
+    def record_failure(self):
+        try:
+            failures = self.cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+            self.cache.set(self.failures_key, failures, timeout=None)
+
+        if failures >= self.failure_threshold or self.cache.get(self.trial_key):
+            self.cache.set(self.opened_at_key, time.time(), timeout=None)
+            self.cache.delete(self.trial_key)
+
+    def reset(self):
+        self.record_success()
+
+    # ---------------------------
+    # LLAMADAS
+    # ---------------------------
+    def _before_call(self):
+        """
+        Devuelve True si habrá que limpiar el estado tras la llamada; en el
+        camino habitual (circuito cerrado y sin fallos) no se escribe en caché.
+        """
+        snapshot = self.snapshot()
+        if not self.allow_request(snapshot):
+            raise CircuitOpenError(
+                f'Circuito "{self.name}" abierto: la API no responde, reintento en '
+                f'{snapshot["retry_in"]:.0f}s.'
+            )
+        return bool(snapshot['failures'] or snapshot['state'] != CLOSED)
+
+    def _after_failure(self, exc, dirty):
+        if is_upstream_failure(exc):
+            self.record_failure()
+        elif dirty:
+            self.record_success()
+
+    def call(self, func, *args, **kwargs):
+        dirty = self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except requests.exceptions.RequestException as exc:
+            self._after_failure(exc, dirty)
+            raise
+        if dirty:
+            self.record_success()
+        return result
+
+    async def acall(self, func, *args, **kwargs):
+        """
+        Versión de call() para corrutinas (ver AsyncPlatziAPIService). El
+        estado vive en la caché (de archivos o compartida): se lee y escribe
+        en un hilo para no bloquear el event loop.
+        """
+        dirty = await sync_to_async(self._before_call)()
+        try:
+            result = await func(*args, **kwargs)
+        except requests.exceptions.RequestException as exc:
+            await sync_to_async(self._after_failure)(exc, dirty)
+            raise
+        if dirty:
+            await sync_to_async(self.record_success)()
+        return result
@@ -0,0 +1,161 @@
+"""
+Operaciones en lote sobre productos (ver views.bulk_productos).
+
+Cada operación es un objeto JSON:
+
+    {"op": "create", "data": {"title", "price", "description", "categoryId", "images"}}
+    {"op": "update", "id": 12, "data": {...mismos campos...}}
+    {"op": "delete", "id": 12}
+
+Primero se validan todas; si alguna es inválida no se envía ninguna. Las
+válidas se envían a la API en paralelo con un número acotado de hilos. Los
+reintentos los hace el HTTPAdapter de PlatziAPIService; aquí solo se
+reintentan las altas que él no cubre (POST con 502/503/504).
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+
+from .breaker import is_upstream_failure
+from .images import InvalidImages, normalize_images
+from .services import get_api_service, get_config
+
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class TooManyOperations(ValueError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, 'PRODUCTS_BULK', {}).get(name, default)
+
+
+def max_items():
+    return _setting('MAX_ITEMS', 500)
+
+
+def validate_operation(raw):
+    """
+    Devuelve (operación normalizada, None) o (None, mensaje de error).
+    """
+    if not isinstance(raw, dict):
+        return None, 'Cada operación debe ser un objeto JSON.'
+    op = raw.get('op')
+    if op not in OPERATIONS:
+        return None, f'"op" debe ser uno de: {", ".join(OPERATIONS)}.'
+
+    operation = {'op': op}
+    if op in ('update', 'delete'):
+        try:
+            operation['id'] = int(raw.get('id'))
+        except (TypeError, ValueError):
+            return None, '"id" es requerido y debe ser un entero.'
+    if op == 'delete':
+        return operation, None
+
+    data = raw.get('data') or {}
+    title = data.get('title')
+    price = data.get('price')
+    description = data.get('description')
+    category_id = data.get('categoryId')
+    images = data.get('images')
+    if not all([title, price, description, category_id, images]):
+        return None, 'Título, precio, descripción, categoría e imágenes son requeridos.'
+    try:
+        operation['data'] = {
+            'title': title,
+            'price': float(price),
+            'description': description,
+            'categoryId': int(category_id),
+            'images': normalize_images(images),
+        }
+    except InvalidImages as exc:
+        return None, str(exc)
+    except (TypeError, ValueError):
+        return None, 'Precio o categoría con formato no válido.'
+    return operation, None
+
+
+def should_retry(operation, exc):
+    """
+    Si tiene sentido volver a enviar la operación tras este error (el outbox
+    la reintenta en otra ronda).
+    """
+    if not is_upstream_failure(exc):
+        return False
+    if operation['op'] != 'create':
+        return True
+    # POST no es idempotente: solo se reintenta si seguro no llegó a procesarse
+    if isinstance(exc, requests.exceptions.Timeout):
+        return False
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return exc.response.status_code in (429, 502, 503, 504)
+    return isinstance(exc, requests.exceptions.ConnectionError)
+
+
+def _retry_here(operation, exc):
+    """
+    El HTTPAdapter ya reintenta con backoff los errores de conexión y, salvo
+    en POST, los RETRY_STATUS_CODES: reintentar también aquí multiplicaría
+    las llamadas. Solo queda la respuesta de reintento a un alta.
+    """
+    return (
+        operation['op'] == 'create'
+        and isinstance(exc, requests.exceptions.HTTPError)
+        and exc.response is not None
+        and exc.response.status_code in get_config()['RETRY_STATUS_CODES']
+        and should_retry(operation, exc)
+    )
+
+
+def _execute(operation):
+    api = get_api_service()
+    if operation['op'] == 'create':
+        return api.create_product(operation['data'])
+    if operation['op'] == 'update':
+        return api.update_product(operation['id'], operation['data'])
+    return api.delete_product(operation['id'])
+
+
+def dispatch_one(index, operation):
+    max_attempts = _setting('MAX_ATTEMPTS', 3)
+    backoff = _setting('BACKOFF_FACTOR', 0.5)
+    result = {'index': index, 'op': operation['op'], 'id': operation.get('id')}
+
+    for attempt in range(1, max_attempts + 1):
+        result['attempts'] = attempt
+        try:
+            data = _execute(operation)
+        except requests.exceptions.RequestException as exc:
+            if attempt < max_attempts and _retry_here(operation, exc):
+                time.sleep(backoff * (2 ** (attempt - 1)))
+                continue
+            response = getattr(exc, 'response', None)
+            result.update({
+                'success': False,
+                'status': response.status_code if response is not None else None,
+                'error': str(exc),
+            })
+            return result
+
+        if operation['op'] == 'delete' and data is False:
+            result.update({'success': False, 'status': None, 'error': 'La API no eliminó el producto.'})
+        else:
+            result.update({'success': True, 'data': data})
+            if operation['op'] == 'create' and isinstance(data, dict):
+                result['id'] = data.get('id')
+        return result
+
+
+def dispatch(operations):
+    """
+    Envía las operaciones ya validadas y devuelve un resultado por operación,
+    en el mismo orden.
+    """
+    max_workers = _setting('MAX_WORKERS', 8)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bulk') as executor:
+        return list(executor.map(dispatch_one, range(len(operations)), operations))
@@ -0,0 +1,321 @@
+"""
+Caché local del catálogo de productos.
+
+Usa el framework de caché de Django (alias ``products`` en settings.CACHES)
+para guardar la lista de productos por consulta y cada producto por id.
+Las listas se guardan bajo una "versión de catálogo": cualquier escritura
+(crear, editar, eliminar) incrementa la versión y deja inaccesibles todas
+las listas anteriores sin tener que recorrerlas.
+
+Además se conserva la última lista buena de cada consulta durante
+PRODUCTS_CACHE_LAST_GOOD_TTL (una semana por defecto) para poder servirla
+(marcada como desactualizada) si la API cae. Esas listas no se versionan:
+cada escritura deja una marca por producto con la versión en que se hizo, y
+al servir una lista antigua se quitan los productos eliminados y se
+sustituyen los editados después de guardarla.
+"""
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .breaker import is_upstream_failure
+from .services import get_api_service, get_async_api_service
+
+
+VERSION_KEY = 'catalog:version'
+
+
+class ProductCache:
+    """
+    Lectura a través de caché (read-through) con invalidación al escribir.
+
+    Los contadores de aciertos/fallos son por proceso.
+    """
+
+    def __init__(self, alias='products', ttl=None):
+        self.alias = alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._refreshing = set()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'PRODUCTS_CACHE_TTL', 300)
+
+    @property
+    def last_good_timeout(self):
+        # Larga pero finita: cada filtro y página deja su copia
+        return getattr(settings, 'PRODUCTS_CACHE_LAST_GOOD_TTL', 7 * 24 * 3600)
+
+    # ---------------------------
+    # CLAVES
+    # ---------------------------
+    def version(self):
+        version = self.cache.get(VERSION_KEY)
+        if version is None:
+            version = 1
+            self.cache.add(VERSION_KEY, version, timeout=None)
+        return version
+
+    @staticmethod
+    def product_key(product_id):
+        return f'catalog:product:{product_id}'
+
+    @staticmethod
+    def query_digest(params=None):
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.md5(query.encode()).hexdigest()
+
+    def list_key(self, params=None, version=None):
+        if version is None:
+            version = self.version()
+        return f'catalog:list:v{version}:{self.query_digest(params)}'
+
+    def last_good_key(self, params=None):
+        return f'catalog:last_good:{self.query_digest(params)}'
+
+    @staticmethod
+    def written_key(product_id):
+        return f'catalog:written:{product_id}'
+
+    # ---------------------------
+    # CONTADORES
+    # ---------------------------
+    def _count(self, hit):
+        metrics.count_cache('products', hit)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    # ---------------------------
+    # LECTURAS
+    # ---------------------------
+    def get_products(self, params=None):
+        """
+        Devuelve la lista de productos para la consulta dada.
+
+        En un fallo se consulta la API y, además de la lista, se guarda cada
+        producto por id para que editar/pagar no vuelvan a pedirlo.
+        """
+        version = self.version()
+        key = self.list_key(params, version)
+        productos = self._lookup(key)
+        if productos is not None:
+            return productos
+        return self._fetch_products(key, params, version)
+
+    def _lookup(self, key):
+        value = self.cache.get(key)
+        self._count(hit=value is not None)
+        return value
+
+    def _fetch_products(self, key, params, version):
+        productos = get_api_service().get_products(params)
+        return self._store_products(key, params, productos, version)
+
+    def _store_products(self, key, params, productos, version):
+        """
+        ``version`` es la del catálogo antes de pedir la lista: las escrituras
+        posteriores se aplican al servirla como última buena.
+        """
+        entries = {self.product_key(p['id']): p for p in productos if 'id' in p}
+        entries[key] = productos
+        self.cache.set_many(entries, self.timeout)
+        self.cache.set(self.last_good_key(params), (version, productos), self.last_good_timeout)
+        return productos
+
+    def _last_good(self, params):
+        """
+        La última lista buena con las escrituras hechas después de guardarla:
+        sin los productos eliminados y con los editados al día (o sin ellos
+        si la API no devolvió el producto completo).
+        """
+        entry = self.cache.get(self.last_good_key(params))
+        if entry is None:
+            return None
+        if isinstance(entry, list):
+            # Guardada sin versión (antes de las marcas de escritura)
+            entry = (0, entry)
+        version, productos = entry
+        written = self.cache.get_many([self.written_key(p['id']) for p in productos if 'id' in p])
+        if not written:
+            return productos
+        result = []
+        for producto in productos:
+            mark = written.get(self.written_key(producto.get('id')))
+            if mark is None or mark[0] <= version:
+                result.append(producto)
+            elif mark[1] is not None:
+                result.append(mark[1])
+        return result
+
+    def cached_products(self, params=None):
+        """
+        La lista en caché o, si no está, la última buena conocida, sin llamar
+        nunca a la API. None si no hay ninguna.
+        """
+        productos = self.cache.get(self.list_key(params))
+        if productos is None:
+            productos = self._last_good(params)
+        return productos
+
+    def get_products_or_stale(self, params=None):
+        """
+        Como get_products, pero si la API falla (o el circuito está abierto)
+        devuelve la última lista buena conocida.
+
+        Devuelve una tupla (productos, stale). Cuando stale es True se agenda
+        un refresco en segundo plano para cuando la API se recupere.
+        """
+        try:
+            return self.get_products(params), False
+        except requests.exceptions.RequestException as exc:
+            return self._stale_or_raise(exc, params), True
+
+    def _stale_or_raise(self, exc, params):
+        last_good = self._last_good(params)
+        if last_good is None or not is_upstream_failure(exc):
+            raise exc
+        self.schedule_refresh(params)
+        return last_good
+
+    # ---------------------------
+    # REFRESCO EN SEGUNDO PLANO
+    # ---------------------------
+    def schedule_refresh(self, params=None):
+        digest = self.query_digest(params)
+        with self._lock:
+            if digest in self._refreshing:
+                return
+            self._refreshing.add(digest)
+        threading.Thread(target=self._refresh, args=(params, digest), daemon=True).start()
+
+    def _refresh(self, params, digest):
+        try:
+            # Con el circuito abierto esperamos a que pase a half_open antes de
+            # reintentar; si está cerrado o en half_open se reintenta ya
+            retry_in = get_api_service().breaker.snapshot()['retry_in']
+            if retry_in:
+                time.sleep(retry_in)
+            version = self.version()
+            self._fetch_products(self.list_key(params, version), params, version)
+        except requests.exceptions.RequestException:
+            # Si sigue caída, el siguiente acceso vuelve a agendar el refresco
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(digest)
+
+    def get_product(self, product_id):
+        key = self.product_key(product_id)
+        producto = self._lookup(key)
+        if producto is not None:
+            return producto
+
+        producto = get_api_service().get_product(product_id)
+        self.cache.set(key, producto, self.timeout)
+        return producto
+
+    # ---------------------------
+    # LECTURAS ASÍNCRONAS (async_views)
+    # ---------------------------
+    # La caché "products" es de archivos: cada lectura o escritura va en un
+    # hilo (sync_to_async) para no bloquear el event loop
+    async def aget_products(self, params=None):
+        version = await sync_to_async(self.version)()
+        key = self.list_key(params, version)
+        productos = await sync_to_async(self._lookup)(key)
+        if productos is not None:
+            return productos
+        productos = await get_async_api_service().get_products(params)
+        return await sync_to_async(self._store_products)(key, params, productos, version)
+
+    async def aget_products_or_stale(self, params=None):
+        try:
+            return await self.aget_products(params), False
+        except requests.exceptions.RequestException as exc:
+            return await sync_to_async(self._stale_or_raise)(exc, params), True
+
+    async def aget_product(self, product_id):
+        key = self.product_key(product_id)
+        producto = await sync_to_async(self._lookup)(key)
+        if producto is not None:
+            return producto
+        producto = await get_async_api_service().get_product(product_id)
+        await sync_to_async(self.cache.set)(key, producto, self.timeout)
+        return producto
+
+    # ---------------------------
+    # INVALIDACIÓN
+    # ---------------------------
+    def invalidate_lists(self):
+        try:
+            self.cache.incr(VERSION_KEY)
+        except ValueError:
+            # La versión expiró o nunca se creó
+            self.cache.set(VERSION_KEY, 2, timeout=None)
+
+    def product_saved(self, producto, product_id=None):
+        """
+        Escritura directa (write-through) tras crear o editar un producto.
+
+        Si la API no devuelve el producto completo se descarta la entrada
+        para que la siguiente lectura lo pida de nuevo.
+        """
+        product_id = (producto or {}).get('id', product_id)
+        complete = bool(producto) and 'id' in producto
+        if complete:
+            self.cache.set(self.product_key(product_id), producto, self.timeout)
+        elif product_id is not None:
+            self.cache.delete(self.product_key(product_id))
+        self.invalidate_lists()
+        if product_id is not None:
+            self._mark_written(product_id, producto if complete else None)
+
+    def product_deleted(self, product_id):
+        self.cache.delete(self.product_key(product_id))
+        self.invalidate_lists()
+        self._mark_written(product_id, None)
+
+    def _mark_written(self, product_id, producto):
+        # Dura lo mismo que las últimas listas buenas a las que corrige
+        self.cache.set(
+            self.written_key(product_id), (self.version(), producto), self.last_good_timeout,
+        )
+
+    def clear(self):
+        self.cache.clear()
+
+
+product_cache = ProductCache()
@@ -0,0 +1,115 @@
+"""
+Caché en memoria de las categorías para los formularios y el filtro del listado.
+
+Las categorías casi nunca cambian, así que cada proceso las guarda en
+memoria: se precargan al arrancar (wsgi.py/asgi.py llaman a start()), se
+refrescan en segundo plano cada CATEGORY_REFRESH_INTERVAL segundos y tras
+invalidate(). Renderizar un formulario no hace ninguna llamada a la API.
+"""
+import logging
+import os
+import threading
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import mirror
+from .services import get_api_service
+
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryCache:
+
+    def __init__(self):
+        self._categorias = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'CATEGORY_REFRESH_INTERVAL', 3600)
+
+    def get(self):
+        """
+        Devuelve la lista [{'id', 'name'}] en memoria.
+
+        Solo si el proceso nunca pudo cargarla se intenta una carga síncrona.
+        """
+        self._ensure_started()
+        categorias = self._categorias
+        if categorias is None:
+            categorias = self.refresh()
+        return categorias or []
+
+    async def aget(self):
+        """
+        Versión para async_views: la carga síncrona (ORM/API) va en un hilo.
+        """
+        if self._categorias is not None and self._pid == os.getpid():
+            return self._categorias
+        return await sync_to_async(self.get)()
+
+    def refresh(self):
+        """
+        Vuelve a cargar las categorías (del espejo si está fresco, si no de la API).
+
+        Si falla se conserva la lista anterior.
+        """
+        try:
+            if mirror.is_fresh():
+                categorias = mirror.get_categories()
+            else:
+                categorias = [
+                    {'id': cat['id'], 'name': cat['name']}
+                    for cat in get_api_service().get_categories()
+                ]
+        except requests.exceptions.RequestException as e:
+            logger.warning("No se pudieron refrescar las categorías: %s", e)
+            return self._categorias
+        with self._lock:
+            self._categorias = categorias
+        return categorias
+
+    def invalidate(self):
+        """
+        Pide al hilo de refresco que recargue ya, sin bloquear al llamador.
+        """
+        self._ensure_started()
+        self._wakeup.set()
+
+    def known(self, category_id):
+        return any(cat['id'] == category_id for cat in self._categorias or [])
+
+    # ---------------------------
+    # HILO DE REFRESCO
+    # ---------------------------
+    def start(self):
+        """
+        Precarga en segundo plano y arranca el refresco periódico del proceso.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Tras un fork (gunicorn --preload) el hilo del padre no existe en el hijo
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='category-cache', daemon=True).start()
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self.start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            # El hilo vive todo el proceso: no dejamos su conexión a la BD abierta
+            connections.close_all()
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+
+category_cache = CategoryCache()
@@ -0,0 +1,83 @@
+"""
+Validadores HTTP (ETag) y Cache-Control para las páginas de productos.
+
+El ETag se calcula con los datos que ya están en caché o en el espejo
+(versión del catálogo, id y updatedAt de cada producto), antes de
+renderizar: si el navegador o la CDN ya tienen esa versión se responde 304
+sin tocar la plantilla.
+
+El HTML incluye el menú del usuario y el token CSRF, así que el ETag
+también depende del usuario y de la cookie CSRF, y las páginas solo son
+``public`` para visitantes anónimos.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from . import outbox
+from .cache import product_cache
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _viewer(request, user):
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return user.pk if user.is_authenticated else 'anon', csrf_cookie
+
+
+def listing_etag(request, user, page):
+    """
+    ETag del listado: consulta + versiones del catálogo y del outbox + (id,
+    updatedAt) de cada fila.
+    """
+    rows = ','.join(f"{p.get('id')}:{p.get('updatedAt')}" for p in page.productos)
+    return make_etag(
+        'listing', request.get_full_path(), product_cache.version(), outbox.pending_version(), page.stale, rows,
+        *_viewer(request, user),
+    )
+
+
+def product_etag(request, user, producto):
+    return make_etag(
+        'product', producto.get('id'), producto.get('updatedAt'), product_cache.version(),
+        *_viewer(request, user),
+    )
+
+
+def not_modified(request, etag):
+    """
+    Devuelve la respuesta 304 si el cliente ya tiene esta versión, o None.
+
+    Si hay mensajes pendientes (p. ej. "Producto eliminado") la página
+    cambia aunque los datos no, así que nunca se responde 304.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def add_validators(response, user, etag, public=True):
+    """
+    Añade ETag, Cache-Control y Vary a la respuesta (también a un 304).
+    """
+    if etag:
+        response.headers['ETag'] = etag
+    if public and not user.is_authenticated:
+        patch_cache_control(response, public=True, max_age=settings.PRODUCTS_PAGE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def private_page(response):
+    """
+    Cache-Control para formularios: solo el navegador del usuario y siempre revalidando.
+    """
+    patch_cache_control(response, private=True, no_cache=True, max_age=0)
+    return response
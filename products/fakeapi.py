@@ -0,0 +1,237 @@
+"""
+Servidor local que imita la API de Platzi (api.escuelajs.co/api/v1) para
+pruebas de carga y benchmarks reproducibles (manage.py fake_platzi_api,
+manage.py benchmark).
+
+Sirve /products (con title, price_min, price_max, categoryId, offset y
+limit), /products/<id>, /categories y las escrituras POST/PUT/DELETE sobre
+un catálogo en memoria. El catálogo se genera de forma determinista a
+partir de una semilla o se carga de un fixture grabado de la API real
+(``record_fixture``).
+
+Se pueden inyectar latencia (fija + aleatoria) y una proporción de errores
+para ver cómo se comportan la caché, los reintentos y el circuit breaker.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+
+PREFIX = '/api/v1'
+TIMESTAMP = '2025-01-01T00:00:00.000Z'
+
+
+def generate_catalog(products=200, categories=5, seed=0):
+    rng = random.Random(seed)
+    categorias = [
+        {'id': i, 'name': f'Categoría {i}', 'slug': f'categoria-{i}',
+         'image': f'https://placehold.co/600x400?text=C{i}',
+         'creationAt': TIMESTAMP, 'updatedAt': TIMESTAMP}
+        for i in range(1, categories + 1)
+    ]
+    palabras = ['camiseta', 'zapatos', 'reloj', 'mesa', 'silla', 'lámpara', 'mochila', 'gorra', 'taza', 'libro']
+    productos = []
+    for i in range(1, products + 1):
+        categoria = categorias[rng.randrange(categories)]
+        titulo = ' '.join(rng.sample(palabras, 2)).capitalize()
+        productos.append({
+            'id': i,
+            'title': f'{titulo} {i}',
+            'slug': f'producto-{i}',
+            'price': rng.randint(5, 500),
+            'description': ' '.join(rng.choices(palabras, k=30)),
+            'category': categoria,
+            'images': [f'https://placehold.co/600x400?text=P{i}'],
+            'creationAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+        })
+    return {'products': productos, 'categories': categorias}
+
+
+def record_fixture(base_url, path):
+    """
+    Guarda el catálogo y las categorías de la API real en un fixture JSON.
+    """
+    base_url = base_url.rstrip('/')
+    data = {
+        'products': requests.get(f'{base_url}/products', timeout=30).json(),
+        'categories': requests.get(f'{base_url}/categories', timeout=30).json(),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return data
+
+
+class FakeCatalog:
+
+    def __init__(self, data):
+        self._lock = threading.Lock()
+        self.categories = {c['id']: c for c in data['categories']}
+        self.products = {p['id']: p for p in data['products']}
+        self._next_id = max(self.products, default=0) + 1
+
+    def list(self, query):
+        with self._lock:
+            productos = list(self.products.values())
+        if query.get('title'):
+            productos = [p for p in productos if query['title'].lower() in p['title'].lower()]
+        if query.get('categoryId'):
+            productos = [p for p in productos if str(p['category']['id']) == query['categoryId']]
+        if query.get('price_min') and query.get('price_max'):
+            low, high = float(query['price_min']), float(query['price_max'])
+            productos = [p for p in productos if low <= p['price'] <= high]
+        offset = int(query.get('offset') or 0)
+        limit = int(query['limit']) if query.get('limit') else None
+        return productos[offset:offset + limit if limit is not None else None]
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+    def _build(self, product_id, data, previous=None):
+        category = self.categories.get(data.get('categoryId')) if data.get('categoryId') else None
+        producto = dict(previous or {}, id=product_id, creationAt=(previous or {}).get('creationAt', TIMESTAMP))
+        for field in ('title', 'price', 'description', 'images'):
+            if field in data:
+                producto[field] = data[field]
+        if category or 'category' not in producto:
+            producto['category'] = category or next(iter(self.categories.values()))
+        producto['updatedAt'] = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        return producto
+
+    def create(self, data):
+        with self._lock:
+            product_id = self._next_id
+            self._next_id += 1
+            self.products[product_id] = self._build(product_id, data)
+            return self.products[product_id]
+
+    def update(self, product_id, data):
+        with self._lock:
+            if product_id not in self.products:
+                return None
+            self.products[product_id] = self._build(product_id, data, self.products[product_id])
+            return self.products[product_id]
+
+    def delete(self, product_id):
+        with self._lock:
+            return self.products.pop(product_id, None) is not None
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # ---------------------------
+    # RESPUESTAS
+    # ---------------------------
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self):
+        self._send(400, {'message': 'Could not find any entity', 'statusCode': 400})
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _route(self):
+        """
+        Aplica latencia y errores inyectados; devuelve (ruta, id) o None si
+        ya se respondió con un error.
+        """
+        server = self.server
+        delay = server.latency + server.rng.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if server.error_rate and server.rng.random() < server.error_rate:
+            self._send(server.error_status, {'message': 'Injected error', 'statusCode': server.error_status})
+            return None
+        path = urlsplit(self.path).path.rstrip('/')
+        if not path.startswith(PREFIX):
+            self._send(404, {'message': 'Not Found', 'statusCode': 404})
+            return None
+        parts = path[len(PREFIX):].strip('/').split('/')
+        product_id = None
+        if len(parts) == 2 and parts[1].isdigit():
+            product_id = int(parts[1])
+        return parts[0], product_id
+
+    def do_GET(self):
+        route = self._route()
+        if route is None:
+            return
+        resource, product_id = route
+        catalog = self.server.catalog
+        if resource == 'categories':
+            return self._send(200, list(catalog.categories.values()))
+        if resource == 'products' and product_id is None:
+            return self._send(200, catalog.list(dict(parse_qsl(urlsplit(self.path).query))))
+        if resource == 'products':
+            producto = catalog.get(product_id)
+            return self._send(200, producto) if producto else self._not_found()
+        self._send(404, {'message': 'Not Found', 'statusCode': 404})
+
+    def do_POST(self):
+        route = self._route()
+        if route is None:
+            return
+        if route != ('products', None):
+            return self._send(404, {'message': 'Not Found', 'statusCode': 404})
+        self._send(201, self.server.catalog.create(self._read_json()))
+
+    def do_PUT(self):
+        route = self._route()
+        if route is None:
+            return
+        producto = self.server.catalog.update(route[1], self._read_json()) if route[1] else None
+        return self._send(200, producto) if producto else self._not_found()
+
+    def do_DELETE(self):
+        route = self._route()
+        if route is None:
+            return
+        self._send(200, self.server.catalog.delete(route[1]))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakePlatziAPI(ThreadingHTTPServer):
+    """
+    Servidor HTTP con el catálogo falso. ``latency`` y ``jitter`` en segundos;
+    ``error_rate`` entre 0 y 1.
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), data=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=500, seed=0, verbose=False):
+        super().__init__(address, FakeAPIHandler)
+        self.catalog = FakeCatalog(data or generate_catalog(seed=seed))
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}{PREFIX}'
+
+    def start(self):
+        """
+        Atiende peticiones en un hilo en segundo plano y devuelve la URL base.
+        """
+        threading.Thread(target=self.serve_forever, name='fake-platzi-api', daemon=True).start()
+        return self.base_url
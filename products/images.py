@@ -0,0 +1,74 @@
+"""
+Validación y normalización de las listas de imágenes de un producto.
+
+La API de Platzi acepta cualquier texto como imagen y devuelve a veces
+URLs envueltas en corchetes o comillas (p. ej. '["https://i.imgur.com/a.jpeg"]').
+Antes de escribir se limpia la lista: solo URLs http(s) absolutas, sin
+duplicados y como mucho MAX_IMAGES.
+"""
+import json
+from urllib.parse import urlsplit, urlunsplit
+
+
+MAX_IMAGES = 10
+MAX_URL_LENGTH = 1000
+
+
+class InvalidImages(ValueError):
+    pass
+
+
+def clean_image_url(value):
+    """
+    Devuelve la URL normalizada, o None si no es una URL de imagen válida.
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip().strip('[]"\' ')
+    if not value or len(value) > MAX_URL_LENGTH:
+        return None
+    try:
+        parts = urlsplit(value)
+        hostname = parts.hostname
+        # Un puerto no numérico o fuera de rango lanza ValueError al leerlo
+        port = parts.port
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ('http', 'https') or not hostname:
+        return None
+    if parts.username or parts.password:
+        return None
+    # urlsplit quita los corchetes de las direcciones IPv6
+    host = f'[{hostname}]' if ':' in hostname else hostname
+    netloc = host if port is None else f'{host}:{port}'
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', parts.query, ''))
+
+
+def normalize_images(images):
+    """
+    Devuelve la lista de URLs limpia o lanza InvalidImages.
+
+    Acepta una lista, una sola URL o una lista serializada como texto JSON.
+    """
+    if isinstance(images, str):
+        text = images.strip()
+        if text.startswith('['):
+            try:
+                images = json.loads(text)
+            except ValueError:
+                images = [text]
+        else:
+            images = [text]
+    if not isinstance(images, list) or not images:
+        raise InvalidImages('Debe indicar al menos una imagen.')
+
+    urls = []
+    for image in images:
+        url = clean_image_url(image)
+        if url is None:
+            raise InvalidImages(f'URL de imagen no válida: {str(image)[:100]}')
+        if url not in urls:
+            urls.append(url)
+    if len(urls) > MAX_IMAGES:
+        raise InvalidImages(f'Como máximo {MAX_IMAGES} imágenes por producto.')
+    return urls
@@ -0,0 +1,61 @@
+"""
+Lectura incremental de un array JSON de la API.
+
+``iter_json_array`` va devolviendo cada elemento a medida que llegan los
+bytes, en lugar de esperar al cuerpo completo y parsearlo de una vez como
+``response.json()``: la memoria depende del tamaño de un producto, no del
+catálogo.
+"""
+import codecs
+import json
+
+import requests
+
+
+READ_CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(response, chunk_size=READ_CHUNK_SIZE):
+    """
+    Recorre un array JSON leído en streaming (requests con stream=True) y
+    cierra la respuesta al terminar.
+
+    Lanza requests.exceptions.InvalidJSONError si el cuerpo no es un array
+    o termina a medias.
+    """
+    decoder = json.JSONDecoder()
+    # JSON siempre va en UTF-8 (RFC 8259); un carácter puede quedar partido entre dos trozos
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    started = False
+    try:
+        for chunk in response.iter_content(chunk_size):
+            buffer = buffer[pos:] + text.decode(chunk)
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                char = buffer[pos]
+                if not started:
+                    if char != '[':
+                        raise requests.exceptions.InvalidJSONError('Se esperaba un array JSON.')
+                    started = True
+                    pos += 1
+                elif char == ',':
+                    pos += 1
+                elif char == ']':
+                    return
+                else:
+                    try:
+                        item, pos = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        # El elemento sigue en el próximo trozo
+                        break
+                    yield item
+        raise requests.exceptions.InvalidJSONError('El array JSON terminó a medias.')
+    finally:
+        response.close()
@@ -0,0 +1,265 @@
+"""
+Paginación, filtros y ordenamiento del listado de productos.
+
+La API de Platzi soporta offset/limit, title, price_min/price_max y
+categoryId, así que esos filtros se envían a la API y solo se descarga la
+página pedida. La API no sabe ordenar: cuando se pide un orden se descarga
+la lista filtrada (que queda en caché por consulta), se ordena en local y se
+recorta la página.
+
+Si el espejo local (products/mirror.py) está fresco, todo se resuelve con
+consultas a la base de datos sin llamar a la API.
+
+Sobre la página resultante se aplican las escrituras que siguen en el
+outbox (products/outbox.py).
+"""
+import requests
+from asgiref.sync import sync_to_async
+from django.core.paginator import EmptyPage, Paginator
+
+from . import mirror, outbox
+from .breaker import is_upstream_failure
+from .cache import product_cache
+from .services import get_api_service
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_PRICE = 10 ** 9
+
+# valor del parámetro ?sort= -> (campo, descendente, etiqueta)
+SORT_OPTIONS = {
+    'price': ('price', False, 'Precio: menor a mayor'),
+    '-price': ('price', True, 'Precio: mayor a menor'),
+    'title': ('title', False, 'Nombre: A-Z'),
+    '-title': ('title', True, 'Nombre: Z-A'),
+    'newest': ('creationAt', True, 'Más recientes'),
+}
+
+
+def _positive_int(value, default=None, maximum=None):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    if value < 1:
+        return default
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def _price(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+class ListingQuery:
+    """
+    Parámetros del listado ya validados a partir de request.GET.
+
+    Los valores inválidos se ignoran en lugar de devolver un error.
+    """
+
+    def __init__(self, page=1, limit=DEFAULT_LIMIT, category=None, price_min=None,
+                 price_max=None, title='', sort=''):
+        self.page = page
+        self.limit = limit
+        self.category = category
+        self.price_min = price_min
+        self.price_max = price_max
+        self.title = title
+        self.sort = sort
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.GET
+        sort = params.get('sort', '')
+        return cls(
+            page=_positive_int(params.get('page'), default=1),
+            limit=_positive_int(params.get('limit'), default=DEFAULT_LIMIT, maximum=MAX_LIMIT),
+            category=_positive_int(params.get('category')),
+            price_min=_price(params.get('price_min')),
+            price_max=_price(params.get('price_max')),
+            title=params.get('title', '').strip(),
+            sort=sort if sort in SORT_OPTIONS else '',
+        )
+
+    def filter_params(self):
+        """
+        Filtros en el formato de la API de Platzi (sin offset/limit).
+        """
+        params = {}
+        if self.title:
+            params['title'] = self.title
+        if self.category:
+            params['categoryId'] = self.category
+        if self.price_min is not None or self.price_max is not None:
+            # La API espera ambos extremos del rango
+            params['price_min'] = self.price_min if self.price_min is not None else 0
+            params['price_max'] = self.price_max if self.price_max is not None else MAX_PRICE
+        return params
+
+    @property
+    def has_filters(self):
+        return bool(self.filter_params())
+
+
+class ProductPage:
+    """
+    Página del listado con la misma interfaz que usa la plantilla para un
+    Page de Django (number, has_next, next_page_number, ...).
+
+    ``num_pages``/``count`` son None cuando la página viene paginada desde la
+    API, porque la API no devuelve el total.
+    """
+
+    def __init__(self, productos, number, limit, has_next, count=None, num_pages=None, stale=False):
+        self.productos = productos
+        self.number = number
+        self.limit = limit
+        self._has_next = has_next
+        self.count = count
+        self.num_pages = num_pages
+        self.stale = stale
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def _sort_key(field):
+    missing = 0 if field == 'price' else ''
+
+    def key(producto):
+        value = producto.get(field)
+        if value is None:
+            return missing
+        return value.lower() if isinstance(value, str) else value
+    return key
+
+
+def sort_products(productos, sort):
+    field, descending, _ = SORT_OPTIONS[sort]
+    return sorted(productos, key=_sort_key(field), reverse=descending)
+
+
+def get_product_page(query):
+    """
+    Devuelve la ProductPage para la consulta dada.
+
+    Lanza las mismas excepciones de requests que ProductCache cuando no hay
+    ni API ni catálogo previo para servir.
+    """
+    if mirror.is_fresh():
+        page = mirror.product_page(query)
+    else:
+        try:
+            productos, stale = product_cache.get_products_or_stale(upstream_params(query))
+        except requests.exceptions.RequestException as exc:
+            page = _mirror_fallback(query, exc)
+        else:
+            page = build_page(query, productos, stale)
+    return outbox.apply_pending(page, query)
+
+
+async def aget_product_page(query):
+    """
+    Versión asíncrona de get_product_page para async_views.
+    """
+    if await sync_to_async(mirror.is_fresh)():
+        page = await sync_to_async(mirror.product_page)(query)
+    else:
+        try:
+            productos, stale = await product_cache.aget_products_or_stale(upstream_params(query))
+        except requests.exceptions.RequestException as exc:
+            page = await sync_to_async(_mirror_fallback)(query, exc)
+        else:
+            page = build_page(query, productos, stale)
+    return await sync_to_async(outbox.apply_pending)(page, query)
+
+
+def iter_catalog(query, chunk_size=100):
+    """
+    Todos los productos de la consulta, sin paginar y sin cargarlos de una
+    vez en memoria, para el listado en streaming. Devuelve (iterador, stale).
+
+    Del espejo se leen por bloques con iterator(); de la API, parseando el
+    array a medida que llega. Con ?sort la API obliga a leer la lista
+    entera antes de ordenarla.
+    """
+    if mirror.is_fresh():
+        return _iter_mirror(query, chunk_size), False
+    try:
+        productos = get_api_service().iter_products(query.filter_params())
+    except requests.exceptions.RequestException as exc:
+        if is_upstream_failure(exc) and mirror.has_data():
+            return _iter_mirror(query, chunk_size), True
+        raise
+    if query.sort:
+        productos = iter(sort_products(productos, query.sort))
+    return productos, False
+
+
+def _iter_mirror(query, chunk_size):
+    for producto in mirror.filtered_queryset(query).iterator(chunk_size=chunk_size):
+        yield producto.to_dict()
+
+
+def _mirror_fallback(query, exc):
+    # Sin API ni lista previa en caché: el espejo, aunque sea viejo, sirve
+    if is_upstream_failure(exc) and mirror.has_data():
+        return mirror.product_page(query, stale=True)
+    raise exc
+
+
+def upstream_params(query):
+    """
+    Parámetros para la API: con orden se pide la lista filtrada completa;
+    sin orden, solo la página actual (+1 fila para saber si hay siguiente).
+    """
+    params = query.filter_params()
+    if not query.sort:
+        params['offset'] = (query.page - 1) * query.limit
+        params['limit'] = query.limit + 1
+    return params
+
+
+def build_page(query, productos, stale=False):
+    if not query.sort:
+        return ProductPage(
+            productos[:query.limit],
+            number=query.page,
+            limit=query.limit,
+            has_next=len(productos) > query.limit,
+            stale=stale,
+        )
+
+    paginator = Paginator(sort_products(productos, query.sort), query.limit)
+    try:
+        page = paginator.page(query.page)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+    return ProductPage(
+        page.object_list,
+        number=page.number,
+        limit=query.limit,
+        has_next=page.has_next(),
+        count=paginator.count,
+        num_pages=paginator.num_pages,
+        stale=stale,
+    )
@@ -0,0 +1,421 @@
+"""
+Benchmark reproducible de las vistas principales contra la API falsa
+(products/fakeapi.py).
+
+Cada escenario se ejecuta con N clientes concurrentes (django.test.Client,
+sin servidor HTTP de por medio) sobre una BD de pruebas desechable y cachés
+en memoria, así que no toca los datos ni las cachés reales. Por escenario se
+informa de peticiones/s, latencias p50/p95/p99, memoria asignada por petición
+(pico de tracemalloc, en una pasada aparte de un solo hilo) y errores.
+
+Con --save-baseline se guardan los resultados en JSON; con --baseline se
+comparan contra un JSON anterior y el comando falla si algún escenario
+empeora más de --tolerance.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from products.cache import product_cache
+from products.categories import category_cache
+from products.management.commands.loadtest import percentile
+from products.services import PlatziAPIService
+
+
+PASSWORD = 'bench-password'
+# Métricas comparadas con la línea base: (clave, True si más alto es peor)
+COMPARED = (('p95_ms', True), ('rps', False), ('alloc_kib', True))
+
+
+class Bench:
+    """
+    Estado compartido por los escenarios de una ejecución.
+    """
+
+    def __init__(self, clients, products):
+        self.run_id = os.urandom(3).hex()
+        self.run = int(self.run_id, 16)
+        self.products = products
+        self.users = []
+        self.tokens = []
+        self.created = []
+        self._lock = threading.Lock()
+        for number in range(clients):
+            user = User.objects.create_user(f'bench_{number}', f'bench_{number}@bench.local', PASSWORD)
+            self.users.append(user)
+            self.tokens.append(Token.objects.create(user=user).key)
+
+    def remote_addr(self, number, i):
+        # IP distinta por petición y ejecución: los límites de
+        # accounts/throttling.py son por IP y su caché no es la del benchmark
+        return f'10.{(self.run + number) % 256}.{i // 256 % 256}.{i % 256}'
+
+    def product_id(self, number, i):
+        return (number * 31 + i) % self.products + 1
+
+    def push_created(self, response):
+        if response.status_code == 200:
+            with self._lock:
+                self.created.append(response.json()['data']['id'])
+
+    def pop_created(self):
+        with self._lock:
+            return self.created.pop() if self.created else None
+
+
+def _producto(i):
+    return {'title': f'Bench {i}', 'price': 10 + i % 90, 'description': 'Producto de benchmark',
+            'categoryId': 1, 'images': ['https://placehold.co/600x400']}
+
+
+def listado(bench, http, number, i):
+    return http.get(reverse('products:products'))
+
+
+def listado_filtros(bench, http, number, i):
+    return http.get(reverse('products:products'), {'category': i % 5 + 1, 'sort': 'price', 'page': 1 + i % 2})
+
+
+def pagar(bench, http, number, i):
+    return http.get(reverse('products:pagar', args=[bench.product_id(number, i)]))
+
+
+def api_productos(bench, http, number, i):
+    return http.get(reverse('products:api_productos'), {'limit': 20, 'fields': 'id,title,price'})
+
+
+def crear(bench, http, number, i):
+    datos = _producto(i)
+    response = http.post(reverse('products:api_crear_producto'), {
+        'nombre': datos['title'], 'precio': datos['price'], 'descripcion': datos['description'],
+        'categoriaId': datos['categoryId'], 'imagen': datos['images'][0],
+    }, content_type='application/json')
+    bench.push_created(response)
+    return response
+
+
+def editar(bench, http, number, i):
+    product_id = bench.product_id(number, i)
+    return http.put(reverse('products:api_editar_producto', args=[product_id]), _producto(i),
+                    content_type='application/json')
+
+
+def eliminar(bench, http, number, i):
+    product_id = bench.pop_created() or bench.product_id(number, i)
+    return http.post(reverse('products:eliminar_producto', args=[product_id]))
+
+
+def registro(bench, http, number, i):
+    username = f'bench_{bench.run_id}_{number}_{i}'
+    return http.post(reverse('accounts:api_register'), {
+        'username': username, 'email': f'{username}@bench.local',
+        'password': PASSWORD, 'password2': PASSWORD,
+    }, content_type='application/json', REMOTE_ADDR=bench.remote_addr(number, i))
+
+
+def login(bench, http, number, i):
+    return http.post(reverse('accounts:api_login'), {
+        'username': bench.users[number].username, 'password': PASSWORD,
+    }, content_type='application/json', REMOTE_ADDR=bench.remote_addr(number, 10000 + i))
+
+
+def perfil(bench, http, number, i):
+    return http.get(reverse('accounts:api_profile'), HTTP_AUTHORIZATION=f'Token {bench.tokens[number]}')
+
+
+# nombre -> (necesita sesión iniciada, petición)
+SCENARIOS = {
+    'listado': (False, listado),
+    'listado_filtros': (False, listado_filtros),
+    'pagar': (False, pagar),
+    'api_productos': (False, api_productos),
+    'crear': (True, crear),
+    'editar': (True, editar),
+    'eliminar': (True, eliminar),
+    'registro': (False, registro),
+    'login': (False, login),
+    'perfil': (False, perfil),
+}
+
+
+def _client(bench, number, needs_login):
+    http = Client()
+    if needs_login:
+        http.force_login(bench.users[number])
+    return http
+
+
+def run_scenario(bench, name, clients, requests_per_client, warmup):
+    """
+    Devuelve latencias (s), errores y duración total de la fase concurrente.
+    """
+    needs_login, make_request = SCENARIOS[name]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def client(number):
+        try:
+            http = _client(bench, number, needs_login)
+            for i in range(warmup):
+                make_request(bench, http, number, -1 - i)
+        finally:
+            ready.wait()
+        try:
+            for i in range(requests_per_client):
+                start = time.perf_counter()
+                try:
+                    response = make_request(bench, http, number, i)
+                    error = None if response.status_code < 400 else f'HTTP {response.status_code}'
+                except Exception as exc:
+                    error = f'{type(exc).__name__}: {exc}'
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                    if error:
+                        errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def measure_allocations(bench, name, samples):
+    """
+    Pico de memoria (KiB) asignada durante cada petición, mediana de `samples`.
+    """
+    needs_login, make_request = SCENARIOS[name]
+    http = _client(bench, 0, needs_login)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(samples):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            make_request(bench, http, 0, 100000 + i)
+            peaks.append((tracemalloc.get_traced_memory()[1] - current) / 1024)
+    finally:
+        tracemalloc.stop()
+    return percentile(peaks, 50)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Devuelve líneas (texto, es_regresión) comparando con la línea base.
+    """
+    lines = []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        for key, higher_is_worse in COMPARED:
+            if not base.get(key):
+                continue
+            change = (current[key] - base[key]) / base[key]
+            regression = change > tolerance if higher_is_worse else change < -tolerance
+            lines.append((
+                f"{name:<16} {key:<10} {base[key]:>10.1f} -> {current[key]:>10.1f} ({change:+.0%})",
+                regression,
+            ))
+    return lines
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de listado, pago, crear/editar/eliminar y la API de cuentas "
+        "contra una API de Platzi falsa con latencia y errores configurables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--clients', type=int, default=8, help="Hilos concurrentes.")
+        parser.add_argument('--requests', type=int, default=25, help="Peticiones por hilo y escenario.")
+        parser.add_argument('--warmup', type=int, default=2, help="Peticiones previas sin medir por hilo.")
+        parser.add_argument('--alloc-samples', type=int, default=10)
+        parser.add_argument(
+            '--api-url',
+            help="Usar una API ya arrancada (p. ej. manage.py fake_platzi_api) en lugar de lanzar una.",
+        )
+        parser.add_argument('--products', type=int, default=200, help="Productos de la API falsa.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--latency', type=float, default=20.0, help="Latencia de la API falsa en ms.")
+        parser.add_argument('--jitter', type=float, default=5.0, help="Latencia aleatoria extra en ms.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Proporción de errores de la API falsa.")
+        parser.add_argument('--save-baseline', metavar='PATH', help="Guardar los resultados como línea base.")
+        parser.add_argument('--baseline', metavar='PATH', help="Comparar con una línea base guardada.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help="Empeoramiento relativo admitido antes de marcar una regresión (0.25 = 25%%).",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        fake = None
+        api_url = options['api_url']
+        if not api_url:
+            fake, api_url = self._start_fake_api(options)
+
+        workdir = tempfile.mkdtemp(prefix='benchmark-')
+        try:
+            results = self._run(api_url, workdir, options)
+        finally:
+            if fake is not None:
+                fake.terminate()
+                fake.wait()
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'config': {key: options[key] for key in (
+                        'clients', 'requests', 'products', 'seed', 'latency', 'jitter', 'error_rate',
+                    )},
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(f"Línea base guardada en {options['save_baseline']}")
+
+        if baseline is not None:
+            self._report_comparison(results, baseline, options['tolerance'])
+
+    # ---------------------------
+    # EJECUCIÓN
+    # ---------------------------
+    def _start_fake_api(self, options):
+        port = _free_port()
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'fake_platzi_api',
+            '--port', str(port), '--products', str(options['products']), '--seed', str(options['seed']),
+            '--latency', str(options['latency']), '--jitter', str(options['jitter']),
+            '--error-rate', str(options['error_rate']),
+        ]
+        # Proceso aparte: no compite por el GIL ni cuenta en tracemalloc
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        api_url = f'http://127.0.0.1:{port}/api/v1'
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                requests.get(f'{api_url}/categories', timeout=1)
+                return process, api_url
+            except requests.exceptions.ConnectionError:
+                if process.poll() is not None:
+                    break
+                time.sleep(0.1)
+        process.terminate()
+        raise CommandError("No se pudo arrancar la API falsa.")
+
+    def _overrides(self, api_url, workdir):
+        caches = dict(settings.CACHES)
+        for alias in ('default', 'products', 'auth'):
+            caches[alias] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'bench-{alias}'}
+        return {
+            'PLATZI_API': {**settings.PLATZI_API, 'BASE_URL': api_url},
+            'CACHES': caches,
+            'ALLOWED_HOSTS': ['testserver'],
+            # Mide las vistas, no el coste del hash (ver bench_hashing)
+            'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+            'PRODUCTS_THUMBNAILS': {**getattr(settings, 'PRODUCTS_THUMBNAILS', {}), 'DIR': os.path.join(workdir, 'thumbnails')},
+        }
+
+    def _run(self, api_url, workdir, options):
+        database = settings.DATABASES['default']
+        if database['ENGINE'].endswith('sqlite3'):
+            # Archivo temporal en lugar de la BD en memoria: varios hilos escriben a la vez
+            database.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+
+        with override_settings(**self._overrides(api_url, workdir)):
+            PlatziAPIService.reset_session()
+            old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            # Categorías de la API falsa, no las que el proceso tuviera de antes
+            category_cache.refresh()
+            try:
+                return self._run_scenarios(api_url, options)
+            finally:
+                connections.close_all()
+                teardown_databases(old_config, verbosity=0)
+                PlatziAPIService.reset_session()
+
+    def _run_scenarios(self, api_url, options):
+        bench = Bench(options['clients'], options['products'])
+        self.stdout.write(
+            f"API: {api_url}, {options['clients']} clientes x {options['requests']} peticiones, "
+            f"latencia {options['latency']}±{options['jitter']} ms, errores {options['error_rate']:.0%}"
+        )
+        header = (
+            f"{'Escenario':<16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'KiB/pet':>9} {'errores':>8}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        results = {}
+        for name in options['scenarios']:
+            product_cache.reset_stats()
+            latencies, errors, elapsed = run_scenario(
+                bench, name, options['clients'], options['requests'], options['warmup'],
+            )
+            alloc = measure_allocations(bench, name, options['alloc_samples'])
+            results[name] = {
+                'requests': len(latencies),
+                'rps': len(latencies) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'alloc_kib': alloc,
+                'errors': len(errors),
+                'cache_hit_ratio': product_cache.stats()['hit_ratio'],
+            }
+            row = results[name]
+            self.stdout.write(
+                f"{name:<16} {row['rps']:>9.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                f"{row['p99_ms']:>9.1f} {row['alloc_kib']:>9.1f} {row['errors']:>8}"
+            )
+            for error in sorted(set(errors))[:3]:
+                self.stdout.write(f"    {error}")
+        return results
+
+    def _report_comparison(self, results, baseline, tolerance):
+        self.stdout.write(f"\nComparación con la línea base del {baseline.get('created', '?')}:")
+        regressions = 0
+        for text, regression in compare(results, baseline, tolerance):
+            if regression:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f"{text}  REGRESIÓN"))
+            else:
+                self.stdout.write(text)
+        if regressions:
+            raise CommandError(f"{regressions} métricas empeoran más de un {tolerance:.0%}.")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones."))
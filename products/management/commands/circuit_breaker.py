@@ -0,0 +1,38 @@
+import json
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from products.services import get_api_service
+
+
+class Command(BaseCommand):
+    help = "Muestra (o reinicia) el estado del circuit breaker de la API de Platzi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Cierra el circuito y borra los fallos.")
+        parser.add_argument('--json', action='store_true', help="Imprime el estado en formato JSON.")
+
+    def handle(self, *args, **options):
+        breaker = get_api_service().breaker
+        if options['reset']:
+            breaker.reset()
+            self.stdout.write(self.style.SUCCESS("Circuito reiniciado."))
+
+        snapshot = breaker.snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(snapshot))
+            return
+
+        style = {
+            'closed': self.style.SUCCESS,
+            'half_open': self.style.WARNING,
+            'open': self.style.ERROR,
+        }[snapshot['state']]
+        self.stdout.write(f"Circuito:  {snapshot['name']}")
+        self.stdout.write(f"Estado:    {style(snapshot['state'])}")
+        self.stdout.write(f"Fallos:    {snapshot['failures']}/{snapshot['failure_threshold']}")
+        if snapshot['opened_at'] is not None:
+            opened_at = datetime.fromtimestamp(snapshot['opened_at'], tz=timezone.utc)
+            self.stdout.write(f"Abierto:   {opened_at.isoformat()}")
+            self.stdout.write(f"Reintento: {snapshot['retry_in']:.0f}s")
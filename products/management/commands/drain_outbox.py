@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products import outbox
+from products.models import OutboxOperation
+
+
+class Command(BaseCommand):
+    help = "Envía a la API de Platzi las escrituras pendientes del outbox (ver products/outbox.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Envía lo pendiente y termina, en lugar de quedarse esperando operaciones nuevas.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Operaciones por lote (por defecto PRODUCTS_OUTBOX['BATCH_SIZE']).",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Segundos de espera cuando no hay nada que enviar (por defecto %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        config = outbox.get_config()
+        recovered = outbox.recover_interrupted(config)
+        if recovered:
+            self.stdout.write(self.style.WARNING(f"{recovered} operaciones interrumpidas recuperadas."))
+
+        try:
+            while True:
+                operations = outbox.drain(options['batch_size'], config)
+                for operation in operations:
+                    self._log(operation, options['verbosity'])
+                if not operations:
+                    if options['once']:
+                        break
+                    close_old_connections()
+                    time.sleep(options['interval'])
+                    outbox.recover_interrupted(config)
+        except KeyboardInterrupt:
+            self.stdout.write("Detenido.")
+
+    def _log(self, operation, verbosity):
+        style = {
+            OutboxOperation.DONE: self.style.SUCCESS,
+            OutboxOperation.PENDING: self.style.WARNING,
+            OutboxOperation.FAILED: self.style.ERROR,
+        }[operation.status]
+        target = f" #{operation.product_id}" if operation.product_id else ""
+        line = f"{operation.op}{target} [{operation.idempotency_key}]: {style(operation.status)}"
+        if operation.error and verbosity > 1:
+            line += f" ({operation.error})"
+        self.stdout.write(line)
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from products.fakeapi import FakePlatziAPI, generate_catalog, record_fixture
+
+
+class Command(BaseCommand):
+    help = (
+        "Arranca un servidor local que imita la API de Platzi (products/fakeapi.py). "
+        "Usar con PLATZI_API_BASE_URL=http://127.0.0.1:<puerto>/api/v1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--products', type=int, default=200, help="Productos del catálogo generado.")
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--fixture', help="Servir el catálogo de un fixture JSON en lugar de generarlo.")
+        parser.add_argument(
+            '--record', metavar='URL',
+            help="Grabar el catálogo de la API en URL en --fixture y salir.",
+        )
+        parser.add_argument('--latency', type=float, default=0.0, help="Latencia fija en ms.")
+        parser.add_argument('--jitter', type=float, default=0.0, help="Latencia aleatoria extra en ms (0..jitter).")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Proporción de respuestas con error (0-1).")
+        parser.add_argument('--error-status', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['record']:
+            if not options['fixture']:
+                self.stderr.write("--record necesita --fixture con la ruta de salida.")
+                return
+            data = record_fixture(options['record'], options['fixture'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(data['products'])} productos y {len(data['categories'])} categorías "
+                f"grabados en {options['fixture']}"
+            ))
+            return
+
+        if options['fixture']:
+            with open(options['fixture'], encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = generate_catalog(options['products'], options['categories'], options['seed'])
+
+        server = FakePlatziAPI(
+            (options['host'], options['port']), data=data,
+            latency=options['latency'] / 1000, jitter=options['jitter'] / 1000,
+            error_rate=options['error_rate'], error_status=options['error_status'],
+            seed=options['seed'], verbose=options['verbosity'] > 1,
+        )
+        self.stdout.write(f"API falsa en {server.base_url} ({len(data['products'])} productos). Ctrl+C para salir.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_load(url, concurrency, duration):
+    """
+    Lanza `concurrency` clientes que piden `url` en bucle durante `duration`
+    segundos y devuelve las latencias (s) y el número de errores.
+    """
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30, follow_redirects=False) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga contra una o más URLs (p. ej. el mismo /products/ servido "
+        "por WSGI y por ASGI) e imprime peticiones por segundo y latencias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="URLs a comparar.")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10.0, help="Segundos por URL.")
+
+    def handle(self, *args, **options):
+        header = f"{'URL':<45} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for url in options['urls']:
+            latencies, errors = asyncio.run(
+                run_load(url, options['concurrency'], options['duration'])
+            )
+            rps = len(latencies) / options['duration']
+            self.stdout.write(
+                f"{url:<45} {rps:>9.1f} "
+                f"{percentile(latencies, 50) * 1000:>9.1f} "
+                f"{percentile(latencies, 95) * 1000:>9.1f} "
+                f"{percentile(latencies, 99) * 1000:>9.1f} "
+                f"{errors:>8}"
+            )
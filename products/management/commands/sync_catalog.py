@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+import requests
+
+from products import mirror
+
+
+class Command(BaseCommand):
+    help = "Sincroniza el espejo local del catálogo con la API de Platzi."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size', type=int, default=mirror.SYNC_PAGE_SIZE,
+            help="Productos por página pedidos a la API (por defecto %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        try:
+            sync = mirror.sync_catalog(page_size=options['page_size'], log=log)
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f"No se pudo sincronizar el catálogo: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Catálogo sincronizado: {sync.created} nuevos, {sync.updated} actualizados, "
+            f"{sync.deleted} eliminados, {sync.unchanged} sin cambios."
+        ))
@@ -0,0 +1,314 @@
+"""
+Métricas de la aplicación en formato Prometheus y cabecera Server-Timing.
+
+Se registran:
+
+- duración de cada petición por vista, método y código (MetricsMiddleware);
+- duración de cada llamada a la API de Platzi por endpoint y su resultado
+  (código HTTP, timeout, circuito abierto...), desde PlatziAPIService;
+- duración del renderizado de cada plantilla (InstrumentedDjangoTemplates);
+- consultas a la BD por petición y su duración;
+- aciertos y fallos de la caché de productos;
+- llamadas a la API deduplicadas por el single-flight (products/singleflight.py).
+
+Los valores viven en memoria de cada proceso: con varios workers cada uno
+expone los suyos en /metrics (Prometheus los suma por ``instance``).
+
+Durante una petición los tiempos también se acumulan en un objeto
+``RequestTimings`` (contextvar, válido en vistas síncronas y asíncronas) que el
+middleware convierte en la cabecera Server-Timing.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from django.template.backends.django import DjangoTemplates, Template
+
+from .breaker import CLOSED, CircuitOpenError
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[labels] = (counts, total + value)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'platzi_http_request_duration_seconds', 'Duración de las peticiones por vista.',
+    ('view', 'method', 'status'),
+)
+UPSTREAM_DURATION = Histogram(
+    'platzi_upstream_request_duration_seconds', 'Duración de las llamadas a la API de Platzi.',
+    ('endpoint', 'method'),
+)
+UPSTREAM_RESPONSES = Counter(
+    'platzi_upstream_responses_total', 'Resultados de las llamadas a la API de Platzi.',
+    ('endpoint', 'status'),
+)
+TEMPLATE_DURATION = Histogram(
+    'platzi_template_render_duration_seconds', 'Duración del renderizado por plantilla.',
+    ('template',),
+)
+DB_QUERIES = Histogram(
+    'platzi_db_queries_per_request', 'Consultas a la BD por petición.',
+    ('view',), buckets=COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'platzi_db_query_duration_seconds', 'Duración de las consultas a la BD.',
+    (), buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+CACHE_REQUESTS = Counter(
+    'platzi_cache_requests_total', 'Lecturas de la caché de productos.',
+    ('cache', 'result'),
+)
+UPSTREAM_COALESCED = Counter(
+    'platzi_upstream_coalesced_total',
+    'Llamadas a la API que reutilizaron la respuesta de otra idéntica en curso.',
+    ('endpoint', 'scope'),
+)
+
+REGISTRY = [
+    REQUEST_DURATION, UPSTREAM_DURATION, UPSTREAM_RESPONSES, TEMPLATE_DURATION,
+    DB_QUERIES, DB_DURATION, CACHE_REQUESTS, UPSTREAM_COALESCED,
+]
+
+
+# ---------------------------
+# TIEMPOS DE LA PETICIÓN ACTUAL
+# ---------------------------
+class RequestTimings:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def server_timing(self):
+        parts = []
+        for name, seconds in self.durations.items():
+            parts.append(f'{name};dur={seconds * 1000:.1f};desc="{self.counts[name]}"')
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def _record(name, seconds):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+# ---------------------------
+# HOOKS
+# ---------------------------
+def _upstream_status(exc):
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return str(exc.response.status_code)
+    if isinstance(exc, CircuitOpenError):
+        return 'circuit_open'
+    if isinstance(exc, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return 'connection_error'
+    return 'error'
+
+
+@contextmanager
+def track_upstream(endpoint, method):
+    """
+    Mide una llamada a la API. Dentro del bloque se puede fijar el código con
+    ``call['status'] = response.status_code``.
+    """
+    call = {'status': '200'}
+    start = time.perf_counter()
+    fast_fail = False
+    try:
+        yield call
+    except Exception as exc:
+        call['status'] = _upstream_status(exc)
+        # Con el circuito abierto no hubo llamada: solo se cuenta, sin latencia
+        fast_fail = isinstance(exc, CircuitOpenError)
+        raise
+    finally:
+        UPSTREAM_RESPONSES.inc(endpoint, str(call['status']))
+        if not fast_fail:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_DURATION.observe(elapsed, endpoint, method)
+            _record('upstream', elapsed)
+
+
+def observe_coalesced(endpoint, scope, seconds):
+    """
+    Cuenta una llamada deduplicada (``scope``: process o cache); la espera
+    aparece en Server-Timing como ``upstream_wait``.
+    """
+    UPSTREAM_COALESCED.inc(endpoint, scope)
+    _record('upstream_wait', seconds)
+
+
+def observe_template(name, seconds):
+    TEMPLATE_DURATION.observe(seconds, name or '<string>')
+    _record('tpl', seconds)
+
+
+class InstrumentedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            observe_template(self.origin.template_name, time.perf_counter() - start)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Backend de plantillas que mide cada render() de nivel superior (render,
+    render_to_string); los {% include %} cuentan dentro de su plantilla padre.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+def count_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """
+    Wrapper de connection.execute_wrapper instalado en cada conexión.
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        DB_DURATION.observe(elapsed)
+        _record('db', elapsed)
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    # Receptor de connection_created: cubre también las conexiones de los
+    # hilos de sync_to_async en las vistas asíncronas
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+def observe_request(view, method, status, timings):
+    REQUEST_DURATION.observe(time.perf_counter() - timings.started, view, method, str(status))
+    DB_QUERIES.observe(timings.counts.get('db', 0), view)
+
+
+# ---------------------------
+# EXPOSICIÓN
+# ---------------------------
+def expose():
+    from .cache import product_cache
+    from .services import get_api_service
+
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+
+    stats = product_cache.stats()
+    lines += [
+        '# HELP platzi_cache_hit_ratio Aciertos / lecturas de la caché de productos en este proceso.',
+        '# TYPE platzi_cache_hit_ratio gauge',
+        f'platzi_cache_hit_ratio{{cache="products"}} {stats["hit_ratio"]}',
+    ]
+    state = get_api_service().breaker.snapshot()['state']
+    lines += [
+        '# HELP platzi_circuit_open 1 si el circuit breaker de la API está abierto o semiabierto.',
+        '# TYPE platzi_circuit_open gauge',
+        f'platzi_circuit_open{{state="{state}"}} {0 if state == CLOSED else 1}',
+    ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,195 @@
+import secrets
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+
+DEFAULT_COMPRESSION = {
+    # Por debajo de este tamaño (bytes) no compensa comprimir
+    'MIN_SIZE': 512,
+    # Calidad baja: las respuestas dinámicas se comprimen en cada petición
+    'BROTLI_QUALITY': 4,
+    'CONTENT_TYPES': (
+        'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+    ),
+}
+
+
+class MetricsMiddleware:
+    """
+    Registra la latencia de cada petición por vista (products/metrics.py) y
+    añade la cabecera Server-Timing con el tiempo en la API, las plantillas
+    y la BD:
+
+        Server-Timing: upstream;dur=84.2;desc="1", tpl;dur=6.1;desc="1", db;dur=1.3;desc="4", total;dur=95.0
+
+    ``desc`` es el número de llamadas. Debe ir al principio de MIDDLEWARE
+    para medir también el resto de middlewares.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self._finish(request, response, timings)
+
+    @staticmethod
+    def _finish(request, response, timings):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        metrics.observe_request(view, request.method, response.status_code, timings)
+        response.headers.setdefault('Server-Timing', timings.server_timing())
+        return response
+
+
+def compression_config():
+    return {**DEFAULT_COMPRESSION, **getattr(settings, 'COMPRESSION', {})}
+
+
+# El mismo nivel que django.utils.text.compress_string
+GZIP_LEVEL = 6
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.lower().split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def _breach_padding(max_bytes):
+    """
+    Espacio en blanco aleatorio (en longitud y contenido) para el final de
+    una respuesta en brotli, que no tiene un campo de cabecera donde meter
+    bytes aleatorios como gzip. Al final de HTML, JSON, CSS o JS no cambia
+    su significado.
+    """
+    return bytes(secrets.choice(b' \t\n') for _ in range(secrets.randbelow(max_bytes + 1)))
+
+
+def _stream_compressor(encoding, config):
+    """
+    Devuelve (comprimir y vaciar un bloque, cerrar el flujo). Cada bloque se
+    envía en cuanto llega, para no retrasar el listado en streaming.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime con brotli (si está instalado y el cliente lo acepta) o gzip
+    las respuestas de texto/JSON de más de COMPRESSION['MIN_SIZE'] bytes.
+
+    Las respuestas en streaming se comprimen bloque a bloque. No toca las
+    que ya traen Content-Encoding (estáticos precomprimidos, ver
+    products/storage.py). Debe ir por encima de ConditionalGetMiddleware.
+    """
+    # Mitigación de BREACH como django.middleware.gzip.GZipMiddleware: longitud
+    # aleatoria de la respuesta comprimida (en gzip y en brotli)
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        config = compression_config()
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(config['CONTENT_TYPES']):
+            return response
+        if not response.streaming and len(response.content) < config['MIN_SIZE']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(response, encoding, config)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(
+                    response.content + _breach_padding(self.max_random_bytes), quality=config['BROTLI_QUALITY'],
+                )
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # El ETag fuerte pasa a débil: el cuerpo ya no es byte a byte el mismo
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(response, encoding, config):
+        compress, finish = _stream_compressor(encoding, config)
+        content = response.streaming_content
+
+        if response.is_async:
+            async def compressed():
+                async for chunk in content:
+                    data = compress(chunk)
+                    if data:
+                        yield data
+                yield finish()
+            return compressed()
+
+        def compressed():
+            for chunk in content:
+                data = compress(chunk)
+                if data:
+                    yield data
+            yield finish()
+        return compressed()
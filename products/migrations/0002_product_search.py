@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+# Índice FTS5 del buscador (products/search.py). Solo existe en SQLite y si
+# el SQLite del sistema trae FTS5; si no, el buscador usa un índice en memoria.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE products_search USING fts5("
+    "title, description, category, tokenize='unicode61 remove_diacritics 2')"
+)
+POPULATE_SQL = (
+    "INSERT INTO products_search(rowid, title, description, category) "
+    "SELECT p.id, p.title, p.description, COALESCE(c.name, '') "
+    "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id"
+)
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_SQL)
+    except OperationalError:
+        return
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS products_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,270 @@
+"""
+Espejo local (ORM) del catálogo de Platzi.
+
+``sync_catalog`` recorre la API por páginas y aplica solo los cambios:
+crea los productos nuevos, actualiza los que tienen un updatedAt distinto
+y, al terminar un recorrido completo, borra los que ya no existen. La API
+no permite filtrar por updatedAt, así que el recorrido es completo, pero
+las escrituras en la base de datos son incrementales.
+
+Las vistas leen del espejo cuando la última sincronización es más reciente
+que settings.CATALOG_MIRROR_MAX_AGE, o cuando la API no está disponible.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Paginator
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CatalogSync, Category, Product, ProductImage
+from .services import get_api_service
+from .signals import catalog_synced
+
+
+SYNC_PAGE_SIZE = 100
+
+# valor de ?sort= (ver listing.SORT_OPTIONS) -> order_by del ORM
+ORDERING = {
+    'price': ['price', 'id'],
+    '-price': ['-price', 'id'],
+    'title': ['title', 'id'],
+    '-title': ['-title', 'id'],
+    'newest': ['-creation_at', 'id'],
+}
+
+
+# ---------------------------
+# FRESCURA
+# ---------------------------
+def last_sync():
+    return (
+        CatalogSync.objects.filter(finished_at__isnull=False)
+        .order_by('-finished_at')
+        .values_list('finished_at', flat=True)
+        .first()
+    )
+
+
+def is_fresh():
+    finished_at = last_sync()
+    if finished_at is None:
+        return False
+    max_age = getattr(settings, 'CATALOG_MIRROR_MAX_AGE', 900)
+    return timezone.now() - finished_at <= timedelta(seconds=max_age)
+
+
+def has_data():
+    return last_sync() is not None
+
+
+# ---------------------------
+# LECTURAS
+# ---------------------------
+def products_queryset():
+    return Product.objects.select_related('category').prefetch_related('images')
+
+
+def get_product(product_id):
+    """
+    Devuelve el producto con la forma de la API, o None si no está en el espejo.
+    """
+    producto = products_queryset().filter(pk=product_id).first()
+    return producto.to_dict() if producto else None
+
+
+def get_categories():
+    return list(Category.objects.values('id', 'name'))
+
+
+def filtered_queryset(query):
+    queryset = products_queryset()
+    if query.title:
+        queryset = queryset.filter(title__icontains=query.title)
+    if query.category:
+        queryset = queryset.filter(category_id=query.category)
+    if query.price_min is not None:
+        queryset = queryset.filter(price__gte=query.price_min)
+    if query.price_max is not None:
+        queryset = queryset.filter(price__lte=query.price_max)
+    return queryset.order_by(*ORDERING.get(query.sort, ['id']))
+
+
+def product_page(query, stale=False):
+    """
+    Misma ProductPage que listing.get_product_page, resuelta con consultas
+    indexadas (COUNT + LIMIT/OFFSET) sobre el espejo.
+    """
+    from .listing import ProductPage
+
+    paginator = Paginator(filtered_queryset(query), query.limit)
+    try:
+        page = paginator.page(query.page)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+    return ProductPage(
+        [producto.to_dict() for producto in page.object_list],
+        number=page.number,
+        limit=query.limit,
+        has_next=page.has_next(),
+        count=paginator.count,
+        num_pages=paginator.num_pages,
+        stale=stale,
+    )
+
+
+# ---------------------------
+# ESCRITURAS
+# ---------------------------
+def _category_from_api(data):
+    return Category(
+        id=data['id'],
+        name=data.get('name', ''),
+        slug=data.get('slug') or '',
+        image=data.get('image') or '',
+        creation_at=parse_datetime(data['creationAt']) if data.get('creationAt') else None,
+        updated_at=parse_datetime(data['updatedAt']) if data.get('updatedAt') else None,
+    )
+
+
+def _product_from_api(data):
+    category = data.get('category') or {}
+    return Product(
+        id=data['id'],
+        title=data.get('title', ''),
+        slug=data.get('slug') or '',
+        price=data.get('price') or 0,
+        description=data.get('description') or '',
+        category_id=category.get('id') or data.get('categoryId'),
+        creation_at=parse_datetime(data['creationAt']) if data.get('creationAt') else None,
+        updated_at=parse_datetime(data['updatedAt']) if data.get('updatedAt') else None,
+    )
+
+
+def _images_from_api(data):
+    return [
+        ProductImage(product_id=data['id'], position=position, url=url)
+        for position, url in enumerate(data.get('images') or [])
+    ]
+
+
+def _upsert_categories(categorias):
+    Category.objects.bulk_create(
+        [_category_from_api(cat) for cat in categorias],
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=['name', 'slug', 'image', 'creation_at', 'updated_at'],
+    )
+
+
+def save_product(data, product_id=None):
+    """
+    Aplica en el espejo un producto devuelto por la API (crear/editar).
+    """
+    if data and 'id' not in data and product_id is not None:
+        data = {**data, 'id': product_id}
+    if not data or 'id' not in data or 'title' not in data:
+        return
+    with transaction.atomic():
+        if data.get('category'):
+            _upsert_categories([data['category']])
+        producto = _product_from_api(data)
+        if producto.category_id and not Category.objects.filter(pk=producto.category_id).exists():
+            producto.category_id = None
+        producto.save()
+        ProductImage.objects.filter(product_id=producto.id).delete()
+        ProductImage.objects.bulk_create(_images_from_api(data))
+
+
+def delete_product(product_id):
+    Product.objects.filter(pk=product_id).delete()
+
+
+# ---------------------------
+# SINCRONIZACIÓN
+# ---------------------------
+def sync_catalog(page_size=SYNC_PAGE_SIZE, log=None):
+    """
+    Sincroniza el espejo con la API y devuelve el CatalogSync resultante.
+    """
+    api = get_api_service()
+    sync = CatalogSync.objects.create()
+    existing = dict(Product.objects.values_list('id', 'updated_at'))
+    seen = set()
+
+    _upsert_categories(api.get_categories())
+    known_categories = set(Category.objects.values_list('id', flat=True))
+
+    offset = 0
+    # Solo un recorrido que llega a la última página permite borrar
+    complete = False
+    while True:
+        page = api.get_products({'offset': offset, 'limit': page_size})
+        if not page:
+            complete = True
+            break
+
+        last_page = len(page) < page_size
+        # Si el catálogo cambia durante el recorrido los offsets se desplazan
+        # y un producto puede repetirse entre páginas
+        page = [data for data in page if data['id'] not in seen]
+        if not page:
+            if last_page:
+                complete = True
+                break
+            offset += page_size
+            continue
+
+        to_create, to_update, images = [], [], []
+        new_categories = {}
+        for data in page:
+            seen.add(data['id'])
+            category = data.get('category') or {}
+            if category.get('id') and category['id'] not in known_categories:
+                new_categories[category['id']] = category
+
+            producto = _product_from_api(data)
+            if (producto.category_id and producto.category_id not in known_categories
+                    and producto.category_id not in new_categories):
+                # Solo categoryId, de una categoría que no conocemos: sin FK
+                producto.category_id = None
+            if data['id'] not in existing:
+                to_create.append(producto)
+            elif existing[data['id']] != producto.updated_at:
+                to_update.append(producto)
+            else:
+                sync.unchanged += 1
+                continue
+            images.extend(_images_from_api(data))
+
+        with transaction.atomic():
+            if new_categories:
+                _upsert_categories(new_categories.values())
+                known_categories.update(new_categories)
+            Product.objects.bulk_create(to_create)
+            Product.objects.bulk_update(
+                to_update,
+                ['title', 'slug', 'price', 'description', 'category', 'creation_at', 'updated_at'],
+            )
+            ProductImage.objects.filter(product_id__in=[p.id for p in to_update]).delete()
+            ProductImage.objects.bulk_create(images)
+
+        sync.created += len(to_create)
+        sync.updated += len(to_update)
+        if log:
+            log(f'offset={offset}: +{len(to_create)} ~{len(to_update)}')
+        if last_page:
+            complete = True
+            break
+        offset += page_size
+
+    # Solo tras un recorrido completo sabemos qué productos desaparecieron
+    removed = set(existing) - seen if complete else set()
+    if removed:
+        Product.objects.filter(pk__in=removed).delete()
+    sync.deleted = len(removed)
+    sync.finished_at = timezone.now()
+    sync.save()
+    catalog_synced.send(sender=None, sync=sync)
+    return sync
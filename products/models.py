@@ -1,3 +1,160 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+# Espejo local del catálogo de la API de Platzi. Los ids son los de la API;
+# los datos se cargan con `manage.py sync_catalog` (ver products/mirror.py).
+
+class Category(models.Model):
+    id = models.PositiveIntegerField(primary_key=True)
+    name = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, blank=True)
+    image = models.URLField(max_length=500, blank=True)
+    creation_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'categories'
+
+    def __str__(self):
+        return self.name
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'slug': self.slug,
+            'image': self.image,
+        }
+
+
+# Claves de un producto en la API de Platzi, en su orden
+API_FIELDS = ('id', 'title', 'slug', 'price', 'description', 'category', 'images', 'creationAt', 'updatedAt')
+
+
+class Product(models.Model):
+    id = models.PositiveIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.TextField(blank=True)
+    category = models.ForeignKey(Category, null=True, on_delete=models.SET_NULL, related_name='products')
+    creation_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['title'], name='product_title_idx'),
+            models.Index(fields=['-creation_at'], name='product_creation_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def to_dict(self, fields=API_FIELDS):
+        """
+        Devuelve el producto con la misma forma que la API de Platzi, para que
+        plantillas y vistas no distingan entre el espejo y la API.
+
+        Con ``fields`` solo se calculan esas claves (además admite
+        ``categoryId``): así no se consultan categoría ni imágenes si no se
+        piden.
+        """
+        getters = {
+            'id': lambda: self.id,
+            'title': lambda: self.title,
+            'slug': lambda: self.slug,
+            'price': lambda: int(self.price) if self.price == int(self.price) else float(self.price),
+            'description': lambda: self.description,
+            'category': lambda: self.category.to_dict() if self.category_id else None,
+            'categoryId': lambda: self.category_id,
+            'images': lambda: [image.url for image in self.images.all()],
+            'creationAt': lambda: self.creation_at.isoformat() if self.creation_at else None,
+            'updatedAt': lambda: self.updated_at.isoformat() if self.updated_at else None,
+        }
+        return {field: getters[field]() for field in fields}
+
+
+class ProductImage(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
+    position = models.PositiveSmallIntegerField(default=0)
+    url = models.URLField(max_length=1000)
+
+    class Meta:
+        ordering = ['product', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'position'], name='unique_product_image_position'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+
+class CatalogSync(models.Model):
+    """
+    Registro de cada ejecución de sync_catalog; la última terminada indica
+    qué tan fresco está el espejo.
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+        get_latest_by = 'finished_at'
+
+    def __str__(self):
+        return f'Sync {self.started_at:%Y-%m-%d %H:%M} (+{self.created} ~{self.updated} -{self.deleted})'
+
+
+class OutboxOperation(models.Model):
+    """
+    Escritura de un producto aceptada en local y pendiente de enviar a la
+    API de Platzi (ver products/outbox.py y ``manage.py drain_outbox``).
+    """
+    CREATE, UPDATE, DELETE = 'create', 'update', 'delete'
+    OPS = [(CREATE, 'Crear'), (UPDATE, 'Editar'), (DELETE, 'Eliminar')]
+
+    PENDING, PROCESSING, DONE, FAILED = 'pending', 'processing', 'done', 'failed'
+    STATUSES = [
+        (PENDING, 'Pendiente'),
+        (PROCESSING, 'Enviando'),
+        (DONE, 'Completada'),
+        (FAILED, 'Fallida'),
+    ]
+
+    # La envía el cliente (cabecera Idempotency-Key) o se genera al encolar;
+    # se reenvía a la API en cada intento
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    op = models.CharField(max_length=10, choices=OPS)
+    # Vacío en las altas hasta que la API devuelve el id
+    product_id = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=12, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='outbox_status_created_idx'),
+        ]
+
+    def __str__(self):
+        target = f' #{self.product_id}' if self.product_id else ''
+        return f'{self.get_op_display()}{target} ({self.get_status_display()})'
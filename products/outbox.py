@@ -0,0 +1,329 @@
+"""
+Escrituras diferidas (outbox) de productos.
+
+Con PRODUCTS_OUTBOX['ENABLED'] las vistas de crear, editar y eliminar
+validan los datos, guardan la operación en la tabla OutboxOperation y
+responden al momento (202, estado ``pending``), sin esperar a la API.
+``manage.py drain_outbox`` envía las operaciones pendientes:
+
+- por lotes de BATCH_SIZE, en paralelo con MAX_WORKERS hilos, pero nunca
+  dos operaciones del mismo producto a la vez ni fuera de orden;
+- con la cabecera Idempotency-Key de la operación en cada intento;
+- reintentando con backoff exponencial los fallos de la API (las altas
+  solo si es seguro que no llegaron, como en products/bulk.py) hasta
+  MAX_ATTEMPTS; después queda ``failed`` con el error.
+
+Al completarse se envían product_saved/product_deleted como en una
+escritura directa; es el único momento en que cambia la versión del
+catálogo. Mientras tanto el listado muestra los cambios pendientes
+(apply_pending), que tienen su propia versión (pending_version), y el
+estado de cada operación se consulta en /api/outbox/<idempotency_key>/.
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .bulk import should_retry
+from .cache import product_cache
+from .models import OutboxOperation
+from .services import get_api_service
+from .signals import product_deleted, product_saved
+
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    'BATCH_SIZE': 20,
+    'MAX_WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    # Segundos antes del reintento n: BACKOFF_FACTOR * 2 ** (n - 1)
+    'BACKOFF_FACTOR': 2,
+    # Una operación que lleva más que esto "enviando" se dio por interrumpida
+    'LEASE': 300,
+}
+
+ACTIVE = (OutboxOperation.PENDING, OutboxOperation.PROCESSING)
+MAX_KEY_LENGTH = 64
+PENDING_VERSION_KEY = 'outbox:version'
+
+
+class InvalidIdempotencyKey(ValueError):
+    pass
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'PRODUCTS_OUTBOX', {})}
+
+
+def enabled():
+    return get_config()['ENABLED']
+
+
+# ---------------------------
+# ENCOLAR
+# ---------------------------
+def enqueue(op, user, data=None, product_id=None, key=None):
+    """
+    Guarda la operación ya validada y devuelve (operación, creada).
+
+    Si ya existe una operación con esa Idempotency-Key del mismo usuario se
+    devuelve esa (un reenvío del mismo formulario no duplica el producto).
+    """
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise InvalidIdempotencyKey(f'Idempotency-Key debe tener entre 1 y {MAX_KEY_LENGTH} caracteres.')
+    key = key or uuid.uuid4().hex
+    user_id = user.pk if user is not None and user.is_authenticated else None
+
+    with transaction.atomic():
+        operation, created = OutboxOperation.objects.get_or_create(
+            idempotency_key=key,
+            defaults={'op': op, 'product_id': product_id, 'payload': data or {}, 'created_by_id': user_id},
+        )
+        if not created and (operation.created_by_id != user_id or operation.op != op):
+            raise IdempotencyConflict('La Idempotency-Key ya se usó para otra operación.')
+        if created:
+            # El listado muestra los cambios pendientes. El catálogo no cambia
+            # hasta que se aplique (y sin eso se invalidaría dos veces)
+            transaction.on_commit(pending_changed)
+    return operation, created
+
+
+def describe(operation):
+    """
+    Estado de la operación para las respuestas JSON.
+    """
+    return {
+        'id': operation.idempotency_key,
+        'op': operation.op,
+        'status': operation.status,
+        'product_id': operation.product_id,
+        'attempts': operation.attempts,
+        'error': operation.error or None,
+        'created_at': operation.created_at.isoformat(),
+        'updated_at': operation.updated_at.isoformat(),
+        'status_url': reverse('products:api_outbox_operacion', args=[operation.idempotency_key]),
+    }
+
+
+# ---------------------------
+# LISTADO CON CAMBIOS PENDIENTES
+# ---------------------------
+def pending_version():
+    """
+    Versión de las operaciones pendientes, aparte de la del catálogo para no
+    tirar las listas, los agregados y el índice del buscador al encolar.
+    Forma parte de la clave de las páginas en caché y del ETag del listado.
+    """
+    version = product_cache.cache.get(PENDING_VERSION_KEY)
+    if version is None:
+        version = 1
+        product_cache.cache.add(PENDING_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def pending_changed():
+    try:
+        product_cache.cache.incr(PENDING_VERSION_KEY)
+    except ValueError:
+        # La versión expiró o nunca se creó
+        product_cache.cache.set(PENDING_VERSION_KEY, 2, timeout=None)
+
+
+def pending_operations():
+    """
+    Operaciones pendientes o en curso, en caché por versión del catálogo y
+    de las pendientes: encolar o fallar una operación cambia la segunda y
+    completarla, la primera.
+    """
+    key = f'outbox:pending:v{product_cache.version()}.{pending_version()}'
+    operations = product_cache.cache.get(key)
+    if operations is None:
+        operations = list(
+            OutboxOperation.objects.filter(status__in=ACTIVE)
+            .order_by('created_at', 'id')
+            .values('idempotency_key', 'op', 'product_id', 'payload', 'created_at')
+        )
+        product_cache.cache.set(key, operations, product_cache.timeout)
+    return operations
+
+
+def _pending_product(operation):
+    data = operation['payload']
+    created_at = operation['created_at'].isoformat()
+    return {
+        'id': None,
+        'title': data.get('title', ''),
+        'slug': '',
+        'price': data.get('price'),
+        'description': data.get('description', ''),
+        'category': None,
+        'images': data.get('images') or [],
+        'creationAt': created_at,
+        'updatedAt': created_at,
+        'pending': OutboxOperation.CREATE,
+    }
+
+
+def apply_pending(page, query):
+    """
+    Aplica sobre la ProductPage las ediciones y bajas pendientes de sus
+    productos (marcados con ``pending``) y, en la primera página sin
+    filtros, antepone las altas pendientes.
+    """
+    operations = pending_operations()
+    if not operations:
+        return page
+
+    changes = {}
+    for operation in operations:
+        if operation['product_id'] is not None:
+            changes[operation['product_id']] = operation
+
+    productos = []
+    for producto in page.productos:
+        operation = changes.get(producto.get('id'))
+        if operation is None:
+            productos.append(producto)
+        elif operation['op'] == OutboxOperation.DELETE:
+            productos.append({**producto, 'pending': OutboxOperation.DELETE})
+        else:
+            data = operation['payload']
+            productos.append({
+                **producto,
+                **{field: data[field] for field in ('title', 'price', 'description', 'images') if field in data},
+                # Otro updatedAt: las tarjetas y miniaturas en caché dependen de él
+                'updatedAt': operation['created_at'].isoformat(),
+                'pending': OutboxOperation.UPDATE,
+            })
+
+    if page.number == 1 and not query.has_filters:
+        altas = [_pending_product(op) for op in operations if op['op'] == OutboxOperation.CREATE]
+        productos = altas[::-1] + productos
+    page.productos = productos
+    return page
+
+
+# ---------------------------
+# ENVÍO (drain_outbox)
+# ---------------------------
+def recover_interrupted(config=None):
+    """
+    Devuelve a la cola las operaciones de un worker que terminó a mitad de
+    un envío. Las altas no se reintentan: no se sabe si llegaron a la API.
+    """
+    config = config or get_config()
+    now = timezone.now()
+    stale = OutboxOperation.objects.filter(
+        status=OutboxOperation.PROCESSING, updated_at__lt=now - timedelta(seconds=config['LEASE']),
+    )
+    failed = stale.filter(op=OutboxOperation.CREATE).update(
+        status=OutboxOperation.FAILED, error='Envío interrumpido; revise si el producto se creó.', updated_at=now,
+    )
+    requeued = stale.update(status=OutboxOperation.PENDING, next_attempt_at=now, updated_at=now)
+    if failed or requeued:
+        pending_changed()
+    return failed + requeued
+
+
+def claim_batch(size):
+    """
+    Marca como ``processing`` hasta ``size`` operaciones listas y las devuelve.
+
+    Como máximo una por producto, y ninguna si hay otra anterior del mismo
+    producto en curso o esperando un reintento, para mantener el orden.
+    """
+    now = timezone.now()
+    claimed, blocked = [], set()
+    for operation in OutboxOperation.objects.filter(status__in=ACTIVE).order_by('created_at', 'id').iterator():
+        if len(claimed) >= size:
+            break
+        product_id = operation.product_id
+        if product_id is not None and product_id in blocked:
+            continue
+        if product_id is not None:
+            blocked.add(product_id)
+        if operation.status == OutboxOperation.PROCESSING or operation.next_attempt_at > now:
+            continue
+        # Actualización condicional: con varios workers solo uno se la lleva
+        taken = OutboxOperation.objects.filter(pk=operation.pk, status=OutboxOperation.PENDING).update(
+            status=OutboxOperation.PROCESSING, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if taken:
+            operation.status = OutboxOperation.PROCESSING
+            operation.attempts += 1
+            claimed.append(operation)
+    return claimed
+
+
+def _send(operation):
+    """
+    Envía una operación a la API. Devuelve (datos, excepción); se ejecuta
+    en los hilos del pool, sin tocar la base de datos.
+    """
+    api = get_api_service()
+    kwargs = {'endpoint': 'write', 'headers': {'Idempotency-Key': operation.idempotency_key}}
+    try:
+        if operation.op == OutboxOperation.CREATE:
+            return api.request('POST', 'products/', json=operation.payload, **kwargs), None
+        if operation.op == OutboxOperation.UPDATE:
+            return api.request('PUT', f'products/{operation.product_id}', json=operation.payload, **kwargs), None
+        return api.request('DELETE', f'products/{operation.product_id}', **kwargs), None
+    except requests.exceptions.RequestException as exc:
+        return None, exc
+
+
+def _finish(operation, data, exc, config):
+    now = timezone.now()
+    if exc is None and operation.op == OutboxOperation.DELETE and data is False:
+        exc = requests.exceptions.RequestException('La API no eliminó el producto.')
+
+    if exc is None:
+        operation.status = OutboxOperation.DONE
+        operation.result = data if isinstance(data, (dict, list)) else None
+        operation.error = ''
+        if operation.op == OutboxOperation.CREATE and isinstance(data, dict):
+            operation.product_id = data.get('id')
+    elif operation.attempts < config['MAX_ATTEMPTS'] and should_retry({'op': operation.op}, exc):
+        operation.status = OutboxOperation.PENDING
+        operation.next_attempt_at = now + timedelta(
+            seconds=config['BACKOFF_FACTOR'] * (2 ** (operation.attempts - 1))
+        )
+        operation.error = str(exc)
+    else:
+        operation.status = OutboxOperation.FAILED
+        operation.error = str(exc)
+    operation.save(update_fields=['status', 'result', 'error', 'product_id', 'next_attempt_at', 'updated_at'])
+
+    if operation.status == OutboxOperation.DONE:
+        if operation.op == OutboxOperation.DELETE:
+            product_deleted.send(sender=None, product_id=operation.product_id)
+        else:
+            product_saved.send(sender=None, producto=data, product_id=operation.product_id)
+    elif operation.status == OutboxOperation.FAILED:
+        # El cambio deja de mostrarse en el listado
+        pending_changed()
+    return operation
+
+
+def drain(batch_size=None, config=None):
+    """
+    Envía un lote de operaciones pendientes y devuelve las procesadas.
+    """
+    config = config or get_config()
+    operations = claim_batch(batch_size or config['BATCH_SIZE'])
+    if not operations:
+        return []
+    with ThreadPoolExecutor(max_workers=config['MAX_WORKERS'], thread_name_prefix='outbox') as executor:
+        results = list(executor.map(_send, operations))
+    # Señales (caché, espejo, buscador) y escrituras en la BD desde este hilo
+    return [_finish(operation, data, exc, config) for operation, (data, exc) in zip(operations, results)]
@@ -0,0 +1,132 @@
+"""
+Caché de página completa para visitantes anónimos (inicio, listado y pago).
+
+Solo se guarda y se sirve desde caché si el usuario no ha iniciado sesión,
+no trae cookie de sesión, no tiene mensajes pendientes y la petición es
+GET/HEAD: un usuario con sesión siempre recibe su propia página. La clave
+incluye la versión del catálogo y la de las operaciones pendientes del
+outbox, así que cualquier escritura invalida todas las páginas.
+
+Las páginas con formularios llevan el token CSRF, que es distinto para
+cada visitante: se guarda un marcador en su lugar y al servir la página se
+sustituye por el token del visitante actual. El ETag de una página en caché
+depende de su contenido y de la cookie CSRF (como en conditional.py).
+
+Solo se guardan respuestas 200: las vistas del listado responden los
+errores de la API con 5xx para que no queden en caché.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+
+from . import metrics, outbox
+from .cache import product_cache
+from .conditional import add_validators, make_etag
+
+
+DEFAULT_CONFIG = {
+    'ALIAS': 'default',
+    # Segundos; 0 desactiva la caché de páginas
+    'TIMEOUT': 30,
+}
+
+CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+PLACEHOLDER = b'__page_cache_csrf_token__'
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'PAGE_CACHE', {})}
+
+
+def page_key(request, name):
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{name}:v{product_cache.version()}.{outbox.pending_version()}:{digest}'
+
+
+def _cacheable(request, user):
+    # Leer los mensajes pendientes no los marca como leídos
+    return (
+        request.method in ('GET', 'HEAD')
+        and not user.is_authenticated
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and not len(messages.get_messages(request))
+    )
+
+
+def lookup(request, user, name):
+    """
+    Devuelve (respuesta en caché o None, clave con la que guardar la página
+    o None si esta petición no se cachea).
+    """
+    config = get_config()
+    if not config['TIMEOUT'] or not _cacheable(request, user):
+        return None, None
+    key = page_key(request, name)
+    entry = caches[config['ALIAS']].get(key)
+    metrics.count_cache('pages', entry is not None)
+    if entry is None:
+        return None, key
+    return _response_from(request, entry), key
+
+
+def _response_from(request, entry):
+    content, content_type, digest = entry
+    etag = make_etag('page', digest, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if PLACEHOLDER in content:
+            content = content.replace(PLACEHOLDER, get_token(request).encode())
+        response = HttpResponse(content, content_type=content_type)
+    return add_validators(response, AnonymousUser(), etag)
+
+
+def store(request, key, response):
+    """
+    Guarda la página si la respuesta es cacheable. Devuelve la misma respuesta.
+    """
+    if key is None or response.status_code != 200 or response.streaming or response.cookies:
+        return response
+    content = CSRF_INPUT.sub(rb'\1' + PLACEHOLDER + rb'\2', response.content)
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE') and PLACEHOLDER not in content:
+        # El token se usó fuera de un <input> (p. ej. en un script): no se puede sustituir
+        return response
+    config = get_config()
+    entry = (content, response['Content-Type'], hashlib.sha1(content).hexdigest())
+    caches[config['ALIAS']].set(key, entry, config['TIMEOUT'])
+    return response
+
+
+def anonymous_page_cache(view):
+    """
+    Decorador para vistas síncronas o asíncronas. Las dos versiones de una
+    vista (views y async_views) comparten entradas.
+    """
+    name = view.__name__
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            cached, key = await sync_to_async(lookup)(request, user, name)
+            if cached is not None:
+                return cached
+            response = await view(request, *args, **kwargs)
+            return await sync_to_async(store)(request, key, response)
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cached, key = lookup(request, request.user, name)
+        if cached is not None:
+            return cached
+        return store(request, key, view(request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,73 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import aggregates, metrics, mirror, search
+from .cache import product_cache
+from .categories import category_cache
+from .signals import catalog_synced, product_deleted, product_saved
+
+
+@receiver(product_saved)
+def update_cache_on_save(sender, producto=None, product_id=None, **kwargs):
+    product_cache.product_saved(producto, product_id=product_id)
+
+
+@receiver(product_deleted)
+def update_cache_on_delete(sender, product_id, **kwargs):
+    product_cache.product_deleted(product_id)
+
+
+@receiver(product_saved)
+def update_mirror_on_save(sender, producto=None, product_id=None, **kwargs):
+    mirror.save_product(producto, product_id=product_id)
+
+
+@receiver(product_deleted)
+def update_mirror_on_delete(sender, product_id, **kwargs):
+    mirror.delete_product(product_id)
+
+
+@receiver(product_saved)
+def refresh_categories_on_new_category(sender, producto=None, **kwargs):
+    category = (producto or {}).get('category') or {}
+    if category.get('id') and not category_cache.known(category['id']):
+        category_cache.invalidate()
+
+
+# Después de caché y espejo: el buscador lee la versión del catálogo y el espejo
+@receiver(product_saved)
+def update_search_on_save(sender, producto=None, product_id=None, **kwargs):
+    if producto and 'id' not in producto and product_id is not None:
+        producto = {**producto, 'id': product_id}
+    search.index_product(producto)
+
+
+@receiver(product_deleted)
+def update_search_on_delete(sender, product_id, **kwargs):
+    search.remove_product(product_id)
+
+
+@receiver(catalog_synced)
+def rebuild_search_on_sync(sender, **kwargs):
+    search.rebuild()
+
+
+# Después de la caché: los agregados se guardan con la versión ya actualizada
+@receiver(product_saved)
+def update_aggregates_on_save(sender, producto=None, product_id=None, **kwargs):
+    aggregates.product_saved(producto, product_id=product_id)
+
+
+@receiver(product_deleted)
+def update_aggregates_on_delete(sender, product_id, **kwargs):
+    aggregates.product_deleted(product_id)
+
+
+# sync_catalog corre en un comando: recalcular aquí no retrasa ninguna petición
+@receiver(catalog_synced)
+def refresh_aggregates_on_sync(sender, **kwargs):
+    aggregates.refresh()
+
+
+# Cuenta y mide las consultas de cada conexión (Server-Timing y /metrics)
+connection_created.connect(metrics.install_db_wrapper, dispatch_uid='products_metrics_db')
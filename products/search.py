@@ -0,0 +1,275 @@
+"""
+Buscador de productos sobre título, descripción y nombre de categoría.
+
+Dos implementaciones con la misma interfaz (search, index_product,
+remove_product, rebuild):
+
+- ``FTS5Index``: tabla virtual FTS5 ``products_search`` en la base SQLite
+  del espejo (migración 0002), compartida por todos los workers. Ordena con
+  bm25 dando más peso al título.
+- ``MemoryIndex``: índice invertido en memoria del proceso, para bases de
+  datos sin FTS5 (p. ej. PostgreSQL) o si el espejo nunca se sincronizó. Se
+  construye desde el espejo (o desde el catálogo que ya está en caché) y se
+  reconstruye cuando cambia la versión del catálogo (otro worker escribió).
+
+En ambos casos cada término de la búsqueda se trata como prefijo ("cam"
+encuentra "camiseta") y deben aparecer todos. Las escrituras de las vistas
+actualizan el índice producto a producto (receivers.py); sync_catalog lo
+reconstruye entero. Buscar nunca llama a la API.
+"""
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection
+from django.db.utils import OperationalError
+
+from . import mirror
+from .cache import product_cache
+from .models import Category
+
+
+TABLE = 'products_search'
+# Peso de cada campo en el ranking: título > categoría > descripción
+WEIGHTS = {'title': 10.0, 'description': 1.0, 'category': 3.0}
+MAX_TERMS = 8
+
+
+def tokenize(text):
+    """
+    Minúsculas, sin tildes y separado en palabras, como el tokenizador
+    unicode61 (remove_diacritics) de FTS5.
+    """
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text)
+
+
+def _category_name(data):
+    category = data.get('category') or {}
+    if category.get('name'):
+        return category['name']
+    category_id = category.get('id') or data.get('categoryId')
+    if not category_id:
+        return ''
+    return Category.objects.filter(pk=category_id).values_list('name', flat=True).first() or ''
+
+
+class FTS5Index:
+
+    def search(self, text, limit=20, offset=0):
+        terms = tokenize(text)[:MAX_TERMS]
+        if not terms:
+            return [], 0
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(WEIGHTS[field]) for field in ('title', 'description', 'category'))
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {TABLE} WHERE {TABLE} MATCH %s", [match])
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s "
+                f"ORDER BY bm25({TABLE}, {weights}) LIMIT %s OFFSET %s",
+                [match, limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        productos = {p.id: p.to_dict() for p in mirror.products_queryset().filter(pk__in=ids)}
+        return [productos[product_id] for product_id in ids if product_id in productos], total
+
+    def index_product(self, data):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [data['id']])
+            cursor.execute(
+                f"INSERT INTO {TABLE}(rowid, title, description, category) VALUES (%s, %s, %s, %s)",
+                [data['id'], data.get('title') or '', data.get('description') or '', _category_name(data)],
+            )
+
+    def remove_product(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [product_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+            cursor.execute(
+                f"INSERT INTO {TABLE}(rowid, title, description, category) "
+                "SELECT p.id, p.title, p.description, COALESCE(c.name, '') "
+                "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id"
+            )
+
+
+class MemoryIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._docs = {}
+        self._postings = {}
+        self._terms = []
+        self._lengths = {}
+
+    def _load_catalog(self):
+        """
+        Catálogo del espejo o el que ya está en caché, o None si no hay
+        ninguno: el buscador nunca lo descarga de la API.
+        """
+        if mirror.has_data():
+            return [producto.to_dict() for producto in mirror.products_queryset()]
+        return product_cache.cached_products({})
+
+    def _ensure_current(self):
+        version = product_cache.version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                productos = self._load_catalog()
+                self._build(productos or [])
+                # Sin catálogo se busca sobre un índice vacío y se reintenta
+                # en la siguiente búsqueda
+                self._version = version if productos is not None else None
+
+    def _build(self, productos):
+        docs, postings, lengths = {}, defaultdict(dict), {}
+        for data in productos:
+            docs[data['id']] = data
+            lengths[data['id']] = self._add_postings(postings, data)
+        self._docs, self._postings, self._lengths = docs, dict(postings), lengths
+        self._terms = sorted(self._postings)
+
+    @staticmethod
+    def _add_postings(postings, data):
+        length = 0
+        for field, weight in WEIGHTS.items():
+            value = _category_name(data) if field == 'category' else data.get(field)
+            for term in tokenize(value):
+                doc_scores = postings.setdefault(term, {})
+                doc_scores[data['id']] = doc_scores.get(data['id'], 0.0) + weight
+                length += 1
+        return length
+
+    def _prefix_matches(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, text, limit=20, offset=0):
+        self._ensure_current()
+        terms = tokenize(text)[:MAX_TERMS]
+        if not terms:
+            return [], 0
+        docs, postings, lengths = self._docs, self._postings, self._lengths
+        average = (sum(lengths.values()) / len(lengths)) if lengths else 1.0
+        scores = None
+        for prefix in terms:
+            term_scores = defaultdict(float)
+            for term in self._prefix_matches(prefix):
+                matches = postings[term]
+                idf = math.log(1 + (len(docs) - len(matches) + 0.5) / (len(matches) + 0.5))
+                for product_id, tf in matches.items():
+                    # BM25 simplificado (k1=1.2, b=0.75) con tf ya ponderado por campo
+                    norm = 1.2 * (0.25 + 0.75 * lengths[product_id] / average)
+                    term_scores[product_id] += idf * tf * 2.2 / (tf + norm)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+        ranked = sorted(scores, key=lambda pid: (-scores[pid], pid))
+        return [docs[pid] for pid in ranked[offset:offset + limit]], len(ranked)
+
+    def _adopt_version(self, previous):
+        # Si la única escritura desde que se construyó es esta, el índice sigue
+        # al día sin reconstruirlo; si hubo otras (otro worker), se reconstruye
+        version = product_cache.version()
+        if previous is not None and version == previous + 1:
+            self._version = version
+
+    def index_product(self, data):
+        with self._lock:
+            if self._version is None:
+                return
+            previous = self._version
+            self._remove(data['id'])
+            postings = dict(self._postings)
+            # Copia por término para no modificar listas que otra búsqueda está leyendo
+            new_postings = defaultdict(dict)
+            length = self._add_postings(new_postings, data)
+            for term, doc_scores in new_postings.items():
+                postings[term] = {**postings.get(term, {}), **doc_scores}
+            self._docs = {**self._docs, data['id']: data}
+            self._lengths = {**self._lengths, data['id']: length}
+            self._postings = postings
+            self._terms = sorted(postings)
+            self._adopt_version(previous)
+
+    def _remove(self, product_id):
+        if product_id not in self._docs:
+            return
+        self._postings = {
+            term: {pid: tf for pid, tf in doc_scores.items() if pid != product_id}
+            for term, doc_scores in self._postings.items()
+            if set(doc_scores) != {product_id}
+        }
+        self._terms = sorted(self._postings)
+        self._docs = {pid: data for pid, data in self._docs.items() if pid != product_id}
+        self._lengths = {pid: n for pid, n in self._lengths.items() if pid != product_id}
+
+    def remove_product(self, product_id):
+        with self._lock:
+            if self._version is None:
+                return
+            previous = self._version
+            self._remove(product_id)
+            self._adopt_version(previous)
+
+    def rebuild(self):
+        with self._lock:
+            self._version = None
+
+
+_fts5_available = None
+_memory_index = MemoryIndex()
+_fts5_index = FTS5Index()
+
+
+def get_index():
+    """
+    FTS5 si la base es SQLite con la tabla creada y el espejo tiene datos;
+    si no, el índice en memoria del proceso.
+    """
+    global _fts5_available
+    if _fts5_available is None:
+        _fts5_available = (
+            connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+        )
+    if _fts5_available and mirror.has_data():
+        return _fts5_index
+    return _memory_index
+
+
+def search(text, limit=20, offset=0):
+    """
+    Devuelve (productos con la forma de la API ordenados por relevancia, total).
+    """
+    try:
+        return get_index().search(text, limit=limit, offset=offset)
+    except OperationalError:
+        # Consulta que FTS5 no acepta: sin resultados en lugar de un 500
+        return [], 0
+
+
+def index_product(data):
+    if data and 'id' in data and 'title' in data:
+        get_index().index_product(data)
+
+
+def remove_product(product_id):
+    get_index().remove_product(product_id)
+
+
+def rebuild():
+    get_index().rebuild()
@@ -0,0 +1,326 @@
+"""
+Cliente compartido para la API externa de Platzi (api.escuelajs.co).
+
+Todas las vistas deben pasar por PlatziAPIService en lugar de llamar a
+requests.get/post/put/delete directamente: así cada proceso mantiene un
+único pool de conexiones keep-alive y no se paga un handshake TCP+TLS
+por cada petición.
+"""
+import asyncio
+import json
+import os
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+from . import metrics
+from .breaker import CircuitBreaker
+from .jsonstream import iter_json_array
+from .singleflight import across_processes, async_single_flight, flight_key, single_flight
+
+
+DEFAULT_CONFIG = {
+    'BASE_URL': 'https://api.escuelajs.co/api/v1',
+    # Número de hosts distintos que se guardan en el pool y conexiones por host
+    'POOL_CONNECTIONS': 4,
+    'POOL_MAXSIZE': 20,
+    # Reintentos con backoff exponencial (0.3s, 0.6s, 1.2s, ...)
+    'MAX_RETRIES': 3,
+    'BACKOFF_FACTOR': 0.3,
+    'RETRY_STATUS_CODES': (429, 502, 503, 504),
+    # Circuit breaker: fallos consecutivos para abrir y segundos hasta reintentar
+    'BREAKER_FAILURE_THRESHOLD': 5,
+    'BREAKER_RESET_TIMEOUT': 30,
+    # Timeouts (conexión, lectura) en segundos por endpoint
+    'TIMEOUTS': {
+        'default': (3.05, 10),
+        'products': (3.05, 10),
+        'product': (3.05, 5),
+        'categories': (3.05, 5),
+        'write': (3.05, 10),
+    },
+    # GET idénticos simultáneos comparten una sola llamada (products/singleflight.py)
+    'SINGLE_FLIGHT': True,
+    # Además entre procesos, con un candado en la caché SINGLE_FLIGHT_CACHE
+    'SINGLE_FLIGHT_CROSS_PROCESS': False,
+    'SINGLE_FLIGHT_CACHE': 'products',
+    # Segundos que un llamador espera la respuesta compartida antes de pedirla él
+    'SINGLE_FLIGHT_WAIT': 10,
+}
+
+
+def get_config():
+    """
+    Combina la configuración por defecto con settings.PLATZI_API.
+    """
+    config = dict(DEFAULT_CONFIG)
+    overrides = getattr(settings, 'PLATZI_API', {})
+    config.update(overrides)
+    config['TIMEOUTS'] = {**DEFAULT_CONFIG['TIMEOUTS'], **overrides.get('TIMEOUTS', {})}
+    return config
+
+
+class PlatziAPIService:
+    """
+    Cliente HTTP para la API de Platzi con un pool de conexiones por proceso.
+
+    La sesión de requests se crea una sola vez por proceso (y se recrea si el
+    proceso hace fork, p. ej. con gunicorn --preload) y se comparte entre
+    todas las instancias del servicio.
+    """
+    _session = None
+    _session_pid = None
+    _lock = threading.Lock()
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.base_url = self.config['BASE_URL'].rstrip('/')
+        self.breaker = CircuitBreaker(
+            'platzi',
+            failure_threshold=self.config['BREAKER_FAILURE_THRESHOLD'],
+            reset_timeout=self.config['BREAKER_RESET_TIMEOUT'],
+        )
+
+    # ---------------------------
+    # SESIÓN / POOL DE CONEXIONES
+    # ---------------------------
+    @classmethod
+    def build_session(cls, config):
+        """
+        Crea una sesión con un HTTPAdapter configurado con pool y reintentos.
+        """
+        retry = Retry(
+            total=config['MAX_RETRIES'],
+            backoff_factor=config['BACKOFF_FACTOR'],
+            status_forcelist=config['RETRY_STATUS_CODES'],
+            # POST no es idempotente: solo se reintentan métodos seguros
+            allowed_methods=frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config['POOL_CONNECTIONS'],
+            pool_maxsize=config['POOL_MAXSIZE'],
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept': 'application/json'})
+        return session
+
+    @property
+    def session(self):
+        cls = type(self)
+        pid = os.getpid()
+        if cls._session is None or cls._session_pid != pid:
+            with cls._lock:
+                if cls._session is None or cls._session_pid != pid:
+                    cls._session = cls.build_session(self.config)
+                    cls._session_pid = pid
+        return cls._session
+
+    @classmethod
+    def reset_session(cls):
+        """
+        Cierra el pool actual; la siguiente petición abre uno nuevo.
+        """
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+            cls._session = None
+            cls._session_pid = None
+
+    # ---------------------------
+    # PETICIONES
+    # ---------------------------
+    def timeout_for(self, endpoint):
+        timeouts = self.config['TIMEOUTS']
+        return timeouts.get(endpoint, timeouts['default'])
+
+    def request(self, method, path, endpoint='default', **kwargs):
+        """
+        Ejecuta una petición contra la API y devuelve el JSON de la respuesta.
+
+        Lanza requests.exceptions.RequestException (incluido HTTPError para
+        códigos 4xx/5xx), igual que hacían las vistas con raise_for_status().
+        Con el circuito abierto lanza CircuitOpenError sin tocar la red.
+        """
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        def fetch():
+            return self._fetch(method, url, endpoint, **kwargs)
+
+        if method == 'GET' and self.config['SINGLE_FLIGHT']:
+            key = flight_key(url, kwargs.get('params'))
+            wait = self.config['SINGLE_FLIGHT_WAIT']
+            if self.config['SINGLE_FLIGHT_CROSS_PROCESS']:
+                alias = self.config['SINGLE_FLIGHT_CACHE']
+                content = single_flight.do(
+                    key, lambda: across_processes(key, fetch, alias, wait, endpoint), wait, endpoint,
+                )
+            else:
+                content = single_flight.do(key, fetch, wait, endpoint)
+        else:
+            content = fetch()
+        # Cada llamador parsea su copia: las respuestas compartidas no se mutan
+        return json.loads(content) if content else None
+
+    def _fetch(self, method, url, endpoint, **kwargs):
+        with metrics.track_upstream(endpoint, method):
+            response = self.breaker.call(self._send, method, url, **kwargs)
+        return response.content
+
+    def _send(self, method, url, **kwargs):
+        response = self.session.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def get_products(self, params=None):
+        return self.request('GET', 'products', endpoint='products', params=params)
+
+    def iter_products(self, params=None):
+        """
+        Como get_products(), pero sin leer el cuerpo entero: devuelve un
+        iterador que parsea el array a medida que llega (ver jsonstream.py).
+
+        Los errores de conexión y de estado se lanzan aquí, antes de empezar
+        a iterar; un corte a mitad de la lectura se lanza al iterar.
+        """
+        with metrics.track_upstream('products', 'GET'):
+            response = self.breaker.call(
+                self._send, 'GET', f'{self.base_url}/products',
+                params=params, timeout=self.timeout_for('products'), stream=True,
+            )
+        return iter_json_array(response)
+
+    def get_product(self, product_id):
+        return self.request('GET', f'products/{product_id}', endpoint='product')
+
+    def get_categories(self):
+        return self.request('GET', 'categories', endpoint='categories')
+
+    def create_product(self, data):
+        return self.request('POST', 'products/', endpoint='write', json=data)
+
+    def update_product(self, product_id, data):
+        return self.request('PUT', f'products/{product_id}', endpoint='write', json=data)
+
+    def delete_product(self, product_id):
+        return self.request('DELETE', f'products/{product_id}', endpoint='write')
+
+
+def _as_requests_error(exc, request=None):
+    """
+    Traduce una excepción de httpx a su equivalente de requests, para que
+    el circuit breaker, la caché y las vistas manejen un solo tipo de error.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        response = requests.Response()
+        response.status_code = exc.response.status_code
+        response.url = str(exc.request.url)
+        response._content = exc.response.content
+        return requests.exceptions.HTTPError(str(exc), response=response)
+    if isinstance(exc, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(exc))
+    if isinstance(exc, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(exc))
+    return requests.exceptions.RequestException(str(exc))
+
+
+class AsyncPlatziAPIService(PlatziAPIService):
+    """
+    Variante asíncrona (httpx) del cliente para las vistas de async_views.
+
+    Comparte configuración, timeouts y circuit breaker con la versión
+    síncrona. El AsyncClient (y su pool) se crea una vez por event loop.
+    """
+    _client = None
+    _client_loop = None
+
+    @property
+    def client(self):
+        cls = type(self)
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client_loop is not loop:
+            limits = httpx.Limits(
+                max_connections=self.config['POOL_MAXSIZE'],
+                max_keepalive_connections=self.config['POOL_MAXSIZE'],
+            )
+            cls._client = httpx.AsyncClient(
+                limits=limits,
+                headers={'Accept': 'application/json'},
+                # Reintentos de conexión; los de status se hacen en _send
+                transport=httpx.AsyncHTTPTransport(retries=self.config['MAX_RETRIES'], limits=limits),
+            )
+            cls._client_loop = loop
+        return cls._client
+
+    async def request(self, method, path, endpoint='default', **kwargs):
+        timeout = kwargs.pop('timeout', self.timeout_for(endpoint))
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        kwargs['timeout'] = timeout
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        async def fetch():
+            with metrics.track_upstream(endpoint, method):
+                response = await self.breaker.acall(self._send, method, url, **kwargs)
+            return response.content
+
+        if method == 'GET' and self.config['SINGLE_FLIGHT']:
+            # Solo dentro del event loop: el candado en caché bloquearía el loop
+            content = await async_single_flight.do(flight_key(url, kwargs.get('params')), fetch, endpoint)
+        else:
+            content = await fetch()
+        return json.loads(content) if content else None
+
+    async def _send(self, method, url, **kwargs):
+        retries = self.config['MAX_RETRIES'] if method != 'POST' else 0
+        for attempt in range(retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code in self.config['RETRY_STATUS_CODES'] and attempt < retries:
+                    await asyncio.sleep(self.config['BACKOFF_FACTOR'] * (2 ** attempt))
+                    continue
+                response.raise_for_status()
+                return response
+            except httpx.HTTPError as exc:
+                raise _as_requests_error(exc) from exc
+
+    async def get_products(self, params=None):
+        return await self.request('GET', 'products', endpoint='products', params=params)
+
+    async def get_product(self, product_id):
+        return await self.request('GET', f'products/{product_id}', endpoint='product')
+
+    async def get_categories(self):
+        return await self.request('GET', 'categories', endpoint='categories')
+
+    async def create_product(self, data):
+        return await self.request('POST', 'products/', endpoint='write', json=data)
+
+    async def update_product(self, product_id, data):
+        return await self.request('PUT', f'products/{product_id}', endpoint='write', json=data)
+
+    async def delete_product(self, product_id):
+        return await self.request('DELETE', f'products/{product_id}', endpoint='write')
+
+
+def get_api_service():
+    """
+    Devuelve el cliente compartido del proceso.
+    """
+    return PlatziAPIService()
+
+
+def get_async_api_service():
+    """
+    Devuelve el cliente asíncrono compartido del event loop actual.
+    """
+    return AsyncPlatziAPIService()
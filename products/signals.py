@@ -0,0 +1,16 @@
+"""
+Señales que se envían cuando una escritura contra la API de Platzi tiene
+éxito, para que cada capa local (caché, espejo, ...) se actualice sin que
+las vistas tengan que conocerlas todas.
+"""
+from django.dispatch import Signal
+
+
+# kwargs: producto (dict devuelto por la API, puede ser None), product_id
+product_saved = Signal()
+
+# kwargs: product_id
+product_deleted = Signal()
+
+# kwargs: sync (CatalogSync terminado)
+catalog_synced = Signal()
@@ -0,0 +1,168 @@
+"""
+Single-flight para los GET a la API de Platzi (ver PlatziAPIService.request).
+
+Si llegan a la vez varias peticiones idénticas (misma URL y parámetros),
+solo la primera ("líder") llama a la API; las demás esperan y reciben el
+mismo cuerpo de respuesta (o la misma excepción). Cada llamador parsea su
+propia copia del JSON, así que nadie comparte listas o diccionarios.
+
+Con SINGLE_FLIGHT_CROSS_PROCESS el líder de cada proceso toma además un
+candado en la caché SINGLE_FLIGHT_CACHE: los líderes de otros workers
+esperan a que publique el cuerpo (durante unos segundos) en lugar de repetir
+la petición. La caché "products" por defecto es de archivos, donde el
+candado es aproximado; con Redis o Memcached es atómico.
+
+Las peticiones deduplicadas se cuentan en la métrica
+platzi_upstream_coalesced_total (products/metrics.py).
+"""
+import asyncio
+import copy
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import caches
+
+from . import metrics
+
+
+POLL_INTERVAL = 0.05
+# Segundos que el cuerpo publicado sigue disponible para otros procesos
+RESULT_TTL = 2
+
+
+def flight_key(url, params=None):
+    if isinstance(params, dict):
+        params = sorted(params.items())
+    query = urlencode(params or [], doseq=True)
+    return f'{url}?{query}' if query else url
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescencia entre hilos del mismo proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, wait_timeout, label='default'):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            start = time.perf_counter()
+            finished = call.event.wait(wait_timeout)
+            metrics.observe_coalesced(label, 'process', time.perf_counter() - start)
+            if finished:
+                if call.error is not None:
+                    # Una copia por hilo: relanzar la misma excepción en
+                    # varios hilos mezclaría sus tracebacks
+                    raise copy.copy(call.error)
+                return call.result
+            # El líder tarda demasiado: petición propia
+            return fn()
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Coalescencia entre tareas del mismo event loop (AsyncPlatziAPIService).
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, label='default'):
+        loop = asyncio.get_running_loop()
+        future = self._calls.get((loop, key))
+        if future is not None:
+            start = time.perf_counter()
+            # asyncio.wait no cancela el futuro si se cancela este seguidor
+            await asyncio.wait((future,))
+            metrics.observe_coalesced(label, 'process', time.perf_counter() - start)
+            if not future.cancelled():
+                return future.result()
+            # El líder se canceló (p. ej. el cliente cortó): petición propia
+            return await fn()
+
+        future = loop.create_future()
+        self._calls[(loop, key)] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Marca la excepción como leída aunque no haya seguidores
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[(loop, key)]
+
+
+def across_processes(key, fn, alias, wait_timeout, label='default'):
+    """
+    Ejecuta ``fn`` con un candado en la caché ``alias``; si otro proceso ya
+    tiene el candado, espera a que publique el resultado (bytes).
+    """
+    cache = caches[alias]
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    lock_key, result_key = f'singleflight:lock:{digest}', f'singleflight:result:{digest}'
+
+    if cache.add(lock_key, 1, timeout=int(wait_timeout) + 1):
+        try:
+            result = fn()
+            cache.set(result_key, result, RESULT_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    start = time.perf_counter()
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result = cache.get(result_key)
+        if result is not None:
+            metrics.observe_coalesced(label, 'cache', time.perf_counter() - start)
+            return result
+        if not cache.has_key(lock_key):
+            # El otro proceso falló sin publicar nada
+            break
+    return fn()
+
+
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
@@ -0,0 +1,80 @@
+// Menú desplegable y cierre de sesión de la cabecera (templates/base.html).
+// Las URLs llegan en data-home-url y data-logout-url del <body>.
+document.addEventListener('DOMContentLoaded', function () {
+    const urls = document.body.dataset;
+
+    // Lógica para el dropdown
+    const buttons = document.querySelectorAll('.dropbtn');
+
+    buttons.forEach(button => {
+        button.addEventListener('click', function (e) {
+            e.stopPropagation();
+            closeAllDropdowns();
+            const menu = this.nextElementSibling;
+            menu.classList.toggle('show');
+        });
+    });
+
+    document.addEventListener('click', closeAllDropdowns);
+
+    function closeAllDropdowns() {
+        const menus = document.querySelectorAll('.dropdown-content');
+        menus.forEach(menu => menu.classList.remove('show'));
+    }
+
+    function getCookie(name) {
+        const match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+
+    // Lógica para el logout
+    const logoutLink = document.getElementById('logout-link');
+    if (logoutLink) {
+        logoutLink.addEventListener('click', function(event) {
+            event.preventDefault(); // Evita que el enlace recargue la página
+
+            // Obtiene el token de autenticación del almacenamiento local
+            const authToken = localStorage.getItem('authToken');
+
+            // Verifica si existe el token antes de hacer la petición
+            if (!authToken) {
+                alert('No hay una sesión activa para cerrar.');
+                window.location.href = urls.homeUrl;
+                return;
+            }
+
+            // Configura los encabezados, incluyendo el token de autorización
+            const headers = new Headers();
+            headers.append('Content-Type', 'application/json');
+            headers.append('X-CSRFToken', getCookie('csrftoken'));
+            headers.append('Authorization', `Token ${authToken}`);
+
+            fetch(urls.logoutUrl, {
+                method: 'POST',
+                headers: headers,
+            })
+            .then(response => {
+                // Aunque falle la petición, se borra el token para forzar el logout
+                localStorage.removeItem('authToken');
+
+                if (response.ok) {
+                    alert('¡Sesión cerrada exitosamente!');
+                    window.location.href = urls.homeUrl;
+                } else {
+                    // Maneja el caso de error de la API
+                    return response.json().then(errorData => {
+                        console.error('Error del servidor al cerrar sesión:', errorData);
+                        alert(errorData.detail || 'Error al cerrar sesión.');
+                    });
+                }
+            })
+            .catch(error => {
+                console.error('Error de red:', error);
+                // También se borra el token si hay un error de red
+                localStorage.removeItem('authToken');
+                alert('Ocurrió un error de red. Por favor, inténtalo de nuevo.');
+                window.location.href = urls.homeUrl;
+            });
+        });
+    }
+});
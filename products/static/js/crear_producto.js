@@ -0,0 +1,69 @@
+// Envío del formulario de templates/crear_producto.html a la API.
+// URLs en data-api-url y data-success-url del formulario.
+// La Idempotency-Key se mantiene mientras no cambien los datos: reenviar el
+// mismo formulario (p. ej. tras un error de red) no duplica el cambio. Se
+// genera una nueva al editar cualquier campo y tras cada envío correcto.
+function newIdempotencyKey() {
+    return window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+let idempotencyKey = newIdempotencyKey();
+
+document.getElementById('crear-producto-form').addEventListener('input', function() {
+    idempotencyKey = newIdempotencyKey();
+});
+
+document.getElementById('crear-producto-form').addEventListener('submit', function(event) {
+    event.preventDefault();
+
+    const form = event.target;
+    const alertDiv = document.getElementById('alert-message');
+    const submitBtn = document.getElementById('submit-btn');
+
+    const productData = {
+        nombre: document.getElementById('nombre').value,
+        precio: document.getElementById('precio').value,
+        descripcion: document.getElementById('descripcion').value,
+        categoriaId: document.getElementById('categoriaId').value, // Ahora obtenemos el ID
+        imagen: document.getElementById('imagen').value,
+    };
+
+    submitBtn.disabled = true;
+    submitBtn.textContent = 'Creando...';
+    alertDiv.innerHTML = '';
+
+    fetch(form.dataset.apiUrl, {
+        method: 'POST',
+        body: JSON.stringify(productData),
+        headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey,
+            'X-CSRFToken': form.querySelector('[name=csrfmiddlewaretoken]').value
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            idempotencyKey = newIdempotencyKey();
+            const message = data.pending
+                ? 'Producto recibido; se publicará en unos segundos. Redirigiendo...'
+                : 'Producto creado exitosamente. Redirigiendo...';
+            alertDiv.innerHTML = `<div class="alert alert-success" role="alert">${message}</div>`;
+            setTimeout(() => {
+                window.location.href = form.dataset.successUrl;
+            }, 2000);
+        } else {
+            alertDiv.innerHTML = `<div class="alert alert-danger" role="alert">Error: ${data.error}</div>`;
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Crear Producto';
+        }
+    })
+    .catch(error => {
+        alertDiv.innerHTML = '<div class="alert alert-danger" role="alert">Error de conexión. Inténtelo de nuevo.</div>';
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Crear Producto';
+        console.error('Error:', error);
+    });
+});
@@ -0,0 +1,77 @@
+// Envío del formulario de templates/editar_producto.html a la API (PUT).
+// URLs en data-api-url y data-success-url del formulario.
+// La Idempotency-Key se mantiene mientras no cambien los datos: reenviar el
+// mismo formulario (p. ej. tras un error de red) no duplica el cambio. Se
+// genera una nueva al editar cualquier campo y tras cada envío correcto.
+function newIdempotencyKey() {
+    return window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+let idempotencyKey = newIdempotencyKey();
+
+document.getElementById('editar-producto-form').addEventListener('input', function() {
+    idempotencyKey = newIdempotencyKey();
+});
+
+document.getElementById('editar-producto-form').addEventListener('submit', function(event) {
+    event.preventDefault();
+
+    const form = event.target;
+    const alertDiv = document.getElementById('alert-message');
+    const submitBtn = document.getElementById('submit-btn');
+    const categoryId = document.getElementById('category-id').value;
+
+    const productData = {
+        title: document.getElementById('title').value,
+        price: document.getElementById('price').value,
+        description: document.getElementById('description').value,
+        categoryId: parseInt(categoryId),
+        images: [document.getElementById('images').value]
+    };
+
+    submitBtn.disabled = true;
+    submitBtn.textContent = 'Guardando...';
+    alertDiv.innerHTML = '';
+
+    fetch(form.dataset.apiUrl, {
+        method: 'PUT',
+        body: JSON.stringify(productData),
+        headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey,
+            'X-CSRFToken': form.querySelector('[name=csrfmiddlewaretoken]').value
+        }
+    })
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(errorData => {
+                throw new Error(errorData.error || `Error desconocido: ${response.status}`);
+            });
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (data.success) {
+            idempotencyKey = newIdempotencyKey();
+            const message = data.pending
+                ? 'Cambios recibidos; se aplicarán en unos segundos. Redirigiendo...'
+                : 'Producto actualizado exitosamente. Redirigiendo...';
+            alertDiv.innerHTML = `<div class="alert alert-success">${message}</div>`;
+            setTimeout(() => {
+                window.location.href = form.dataset.successUrl;
+            }, 2000);
+        } else {
+            alertDiv.innerHTML = `<div class="alert alert-danger">Error: ${data.error}</div>`;
+            submitBtn.disabled = false;
+            submitBtn.textContent = 'Guardar Cambios';
+        }
+    })
+    .catch(error => {
+        alertDiv.innerHTML = `<div class="alert alert-danger">Error de conexión: ${error.message}</div>`;
+        submitBtn.disabled = false;
+        submitBtn.textContent = 'Guardar Cambios';
+        console.error('Error:', error);
+    });
+});
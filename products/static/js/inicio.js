@@ -0,0 +1,14 @@
+// Carrusel de imágenes de templates/inicio.html.
+document.addEventListener('DOMContentLoaded', function () {
+    const images = document.querySelectorAll('.carousel-image');
+    let currentIndex = 0;
+    if (!images.length) {
+        return;
+    }
+
+    setInterval(() => {
+        images[currentIndex].classList.remove('active');
+        currentIndex = (currentIndex + 1) % images.length;
+        images[currentIndex].classList.add('active');
+    }, 1000);
+});
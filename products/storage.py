@@ -0,0 +1,117 @@
+"""
+Almacenamiento de estáticos para producción (STORAGES['staticfiles']).
+
+``manage.py collectstatic`` deja en STATIC_ROOT, además de cada archivo:
+
+- su copia con el hash del contenido en el nombre (css/styles.3f2a1b.css) y
+  el manifiesto staticfiles.json que usa {% static %} (ManifestStaticFilesStorage);
+- CSS y JS minificados (rcssmin/rjsmin si están instalados; sin ellos el CSS
+  se minifica de forma conservadora y el JS se copia tal cual);
+- variantes precomprimidas .gz y, con el paquete brotli, .br.
+
+Los sirve views.archivo_estatico: la variante comprimida según
+Accept-Encoding y, para los nombres con hash, Cache-Control immutable.
+"""
+import gzip
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover - dependencia opcional
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover - dependencia opcional
+    rjsmin = None
+
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.xml', '.html')
+MIN_COMPRESS_SIZE = 256
+# (Accept-Encoding, sufijo) en orden de preferencia
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def _save(self, name, content):
+        # Se minifica al escribir: el hash del nombre es el del archivo fuente
+        extension = os.path.splitext(name)[1]
+        if extension in MINIFIERS and '.min.' not in name:
+            content.seek(0)
+            text = content.read().decode('utf-8')
+            content = ContentFile(MINIFIERS[extension](text).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            # Solo si compensa: el navegador tendría que descomprimirlo igual
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+    def is_hashed(self, name):
+        if not hasattr(self, '_hashed_names'):
+            self._hashed_names = set(self.hashed_files.values())
+        return name in self._hashed_names
+
+
+def encoded_variant(path, accept_encoding):
+    """
+    Devuelve (ruta, codificación) de la mejor variante precomprimida que
+    acepta el cliente, o (path, None).
+    """
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def is_hashed(name):
+    storage = staticfiles_storage
+    return getattr(storage, 'is_hashed', lambda name: False)(name)
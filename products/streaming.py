@@ -0,0 +1,89 @@
+"""
+Listado completo de productos enviado por partes (StreamingHttpResponse).
+
+La página se renderiza una vez con ``streaming=True``: la plantilla deja
+una marca donde irían las tarjetas y se parte ahí en cabecera y pie. Se
+envía la cabecera en cuanto se conoce el origen de los datos, luego las
+tarjetas en bloques de PRODUCTS_STREAM_CHUNK_SIZE y al final el pie, así que
+el tiempo hasta el primer byte no depende del tamaño del catálogo.
+
+Con ASGI el contenido es un iterador asíncrono: Django consumiría uno
+síncrono entero (``sync_to_async(list)``) antes de enviar nada. Cada bloque
+se sigue generando en un hilo con ``sync_to_async``, porque leer de la API
+y renderizar bloquean.
+"""
+import logging
+from itertools import islice
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.template.loader import render_to_string
+
+
+logger = logging.getLogger(__name__)
+
+MARKER = '<!--product-cards-->'
+
+
+def chunk_size():
+    return getattr(settings, 'PRODUCTS_STREAM_CHUNK_SIZE', 50)
+
+
+def _chunks(productos, size):
+    productos = iter(productos)
+    while chunk := list(islice(productos, size)):
+        yield chunk
+
+
+_DONE = object()
+
+
+async def _aiterate(iterator):
+    """
+    Recorre un iterador síncrono desde el bucle de eventos, un elemento por
+    llamada a sync_to_async. Si el cliente corta, cierra el generador (y
+    con él la respuesta de la API) en el mismo hilo.
+    """
+    next_item = sync_to_async(next)
+    try:
+        while (item := await next_item(iterator, _DONE)) is not _DONE:
+            yield item
+    finally:
+        await sync_to_async(iterator.close)()
+
+
+def stream_listing(request, productos, context):
+    """
+    Contenido para StreamingHttpResponse: el generador de _render_listing,
+    envuelto en un iterador asíncrono si la petición llega por ASGI.
+    """
+    content = _render_listing(request, productos, context)
+    if isinstance(request, ASGIRequest):
+        return _aiterate(content)
+    return content
+
+
+def _render_listing(request, productos, context):
+    """
+    Genera el HTML del listado: cabecera, tarjetas por bloques y pie.
+    """
+    head, tail = render_to_string(
+        'lista_productos.html', {**context, 'streaming': True}, request
+    ).split(MARKER, 1)
+    yield head
+
+    sent = 0
+    try:
+        for chunk in _chunks(productos, chunk_size()):
+            sent += len(chunk)
+            yield render_to_string('tarjetas_productos.html', {'productos': chunk}, request)
+    except requests.exceptions.RequestException as e:
+        # La respuesta ya empezó con 200: solo queda avisar dentro de la página
+        logger.warning("Listado en streaming interrumpido tras %s productos: %s", sent, e)
+        yield '<div class="alert alert-warning"><p>No se pudo cargar el resto del catálogo.</p></div>'
+    if not sent:
+        yield '<div class="alert alert-info"><p>No hay productos disponibles en este momento.</p></div>'
+
+    yield tail
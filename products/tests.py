@@ -1,3 +1,1460 @@
-from django.test import TestCase
+"""
+Pruebas de products. Las que llaman a la API lo hacen contra el servidor
+falso de products/fakeapi.py, nunca contra api.escuelajs.co.
+"""
+import io
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse, reverse_lazy
+from PIL import Image
+
+from . import aggregates, api, metrics, mirror, outbox, search, thumbnails
+from .breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from .cache import VERSION_KEY, product_cache
+from .categories import category_cache
+from .fakeapi import FakePlatziAPI, generate_catalog
+from .images import InvalidImages, clean_image_url, normalize_images
+from .jsonstream import iter_json_array
+from .middleware import CompressionMiddleware, brotli
+from .listing import MAX_LIMIT, ListingQuery, get_product_page
+from .models import OutboxOperation, Product
+from .pagecache import PLACEHOLDER
+from .services import PlatziAPIService
+from .signals import product_deleted, product_saved
+from .singleflight import SingleFlight
+
+
+# Cachés en memoria y separadas por alias: las pruebas no tocan .cache/
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in settings.CACHES
+}
+
+# Sin collectstatic no hay manifest: las plantillas usan las rutas sin hash
+TEST_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, PAGE_CACHE={'TIMEOUT': 0})
+class FakeAPITestCase(TestCase):
+    """
+    Arranca un FakePlatziAPI por clase y apunta PLATZI_API a él, sin
+    reintentos ni esperas.
+    """
+    products = 30
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake_api = FakePlatziAPI(data=generate_catalog(products=cls.products, categories=3))
+        base_url = cls.fake_api.start()
+        cls._api_settings = override_settings(PLATZI_API={
+            **settings.PLATZI_API, 'BASE_URL': base_url, 'MAX_RETRIES': 0, 'BACKOFF_FACTOR': 0,
+        })
+        cls._api_settings.enable()
+        PlatziAPIService.reset_session()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._api_settings.disable()
+        PlatziAPIService.reset_session()
+        cls.fake_api.shutdown()
+        cls.fake_api.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        # Las categorías se refrescan en un hilo que sobrevive a la prueba (y
+        # al PLATZI_API de la prueba): que una escritura no lo despierte
+        patcher = mock.patch.object(category_cache, 'invalidate')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Lo mismo con el recálculo de agregados que agenda el listado
+        patcher = mock.patch.object(aggregates, 'schedule_refresh')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+# ---------------------------
+# API FALSA (fakeapi.py)
+# ---------------------------
+class FakeCatalogTests(SimpleTestCase):
+
+    def test_generated_catalog_is_deterministic(self):
+        self.assertEqual(generate_catalog(products=10, seed=3), generate_catalog(products=10, seed=3))
+        self.assertNotEqual(generate_catalog(products=10, seed=3), generate_catalog(products=10, seed=4))
+
+
+class FakePlatziAPITests(FakeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = PlatziAPIService()
+
+    def test_filters_and_pagination(self):
+        productos = self.api.get_products({'offset': 5, 'limit': 10})
+        self.assertEqual([p['id'] for p in productos], list(range(6, 16)))
+
+        baratos = self.api.get_products({'price_min': 0, 'price_max': 100})
+        self.assertTrue(baratos)
+        self.assertTrue(all(p['price'] <= 100 for p in baratos))
+
+    def test_writes(self):
+        creado = self.api.create_product({'title': 'Nuevo', 'price': 7, 'categoryId': 2, 'images': []})
+        self.assertEqual(self.api.get_product(creado['id'])['category']['id'], 2)
+        self.api.update_product(creado['id'], {'title': 'Editado'})
+        self.assertEqual(self.api.get_product(creado['id'])['title'], 'Editado')
+        self.assertTrue(self.api.delete_product(creado['id']))
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.api.get_product(creado['id'])
+
+    def test_injected_errors(self):
+        self.fake_api.error_rate = 1.0
+        self.addCleanup(setattr, self.fake_api, 'error_rate', 0.0)
+        with self.assertRaises(requests.exceptions.HTTPError) as cm:
+            self.api.get_categories()
+        self.assertEqual(cm.exception.response.status_code, 500)
+
+
+# ---------------------------
+# IMÁGENES Y MINIATURAS (images.py, thumbnails.py)
+# ---------------------------
+class CleanImageURLTests(SimpleTestCase):
+
+    def test_normalizes(self):
+        self.assertEqual(clean_image_url(' ["HTTPS://I.Imgur.com/a.jpeg"] '), 'https://i.imgur.com/a.jpeg')
+        self.assertEqual(clean_image_url('http://example.com:8080'), 'http://example.com:8080/')
+
+    def test_keeps_ipv6_brackets(self):
+        self.assertEqual(clean_image_url('http://[2001:db8::1]/x.jpg'), 'http://[2001:db8::1]/x.jpg')
+        self.assertEqual(clean_image_url('http://[2001:db8::1]:8080/x.jpg'), 'http://[2001:db8::1]:8080/x.jpg')
+
+    def test_rejects(self):
+        invalid = [
+            None, '', 'ftp://example.com/x.jpg', '/relativa.jpg', 'http://user:pw@example.com/x.jpg',
+            'http://example.com:abc/x.jpg', 'http://example.com:99999/x.jpg', 'http://[roto/x.jpg',
+        ]
+        for value in invalid:
+            with self.subTest(value=value):
+                self.assertIsNone(clean_image_url(value))
+
+    def test_normalize_images(self):
+        self.assertEqual(
+            normalize_images('["http://a.com/1.jpg", "http://a.com/1.jpg", "http://a.com/2.jpg"]'),
+            ['http://a.com/1.jpg', 'http://a.com/2.jpg'],
+        )
+        for value in ([], 'http://example.com:abc/x.jpg', ['nada']):
+            with self.subTest(value=value), self.assertRaises(InvalidImages):
+                normalize_images(value)
+
+
+def _png(color=(255, 0, 0), size=(40, 40)):
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, 'PNG')
+    return output.getvalue()
+
+
+class ImageServer(ThreadingHTTPServer):
+    """
+    Sirve la misma imagen PNG en cualquier ruta y cuenta las peticiones.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        self.body = _png()
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                self.requests.append((handler.path, handler.headers.get('Host')))
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'image/png')
+                handler.send_header('Content-Length', str(len(self.body)))
+                handler.end_headers()
+                handler.wfile.write(self.body)
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class ThumbnailDownloadTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ImageServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    def test_rejects_private_and_loopback_hosts(self):
+        for url in (f'http://127.0.0.1:{self.server.port}/a.png', f'http://localhost:{self.server.port}/a.png',
+                    'http://10.0.0.1/a.png', 'http://192.168.1.1/a.png', 'http://[::1]/a.png'):
+            with self.subTest(url=url), self.assertRaises(thumbnails.BrokenImage):
+                thumbnails.download(url)
+        self.assertEqual(self.server.requests, [])
+
+    def test_allow_private_hosts(self):
+        with self.settings(PRODUCTS_THUMBNAILS={**settings.PRODUCTS_THUMBNAILS, 'ALLOW_PRIVATE_HOSTS': True}):
+            self.assertEqual(thumbnails.download(f'http://127.0.0.1:{self.server.port}/a.png'), self.server.body)
+
+    def test_connects_to_validated_address(self):
+        # Primera resolución: pública (simulada); la segunda apuntaría a la red interna
+        answers = iter(['127.0.0.1', '10.0.0.1'])
+        real_getaddrinfo = socket.getaddrinfo
+
+        def getaddrinfo(host, *args, **kwargs):
+            # urllib3 también resuelve (la IP ya fijada) con socket.getaddrinfo
+            if host != 'imagenes.test':
+                return real_getaddrinfo(host, *args, **kwargs)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (next(answers), 0))]
+
+        url = f'http://imagenes.test:{self.server.port}/a.png'
+        with mock.patch('products.thumbnails.socket.getaddrinfo', getaddrinfo), \
+                mock.patch('products.thumbnails._is_public', lambda address: not address.startswith('10.')):
+            self.assertEqual(thumbnails.download(url), self.server.body)
+            with self.assertRaises(thumbnails.BrokenImage):
+                thumbnails.download(url)
+        # Se conectó a la IP validada conservando el Host original
+        self.assertEqual(self.server.requests, [('/a.png', f'imagenes.test:{self.server.port}')])
+
+
+class ThumbnailStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = thumbnails.ThumbnailStore(directory.name, max_bytes=2500)
+
+    def _age(self, digest, seconds):
+        path = self.store.path_for(digest)
+        stamp = time.time() - seconds
+        os.utime(path, (stamp, stamp))
+
+    def test_same_content_same_file(self):
+        self.assertEqual(self.store.put(b'a' * 10), self.store.put(b'a' * 10))
+
+    def test_evicts_least_recently_used(self):
+        viejo = self.store.put(b'a' * 1000)
+        usado = self.store.put(b'b' * 1000)
+        self._age(viejo, 300)
+        self._age(usado, 200)
+        # Un acierto actualiza el mtime: pasa a ser el más reciente
+        self.assertIsNotNone(self.store.get(usado))
+
+        nuevo = self.store.put(b'c' * 1000)
+
+        self.assertIsNone(self.store.get(viejo))
+        self.assertIsNotNone(self.store.get(usado))
+        self.assertIsNotNone(self.store.get(nuevo))
+
+
+class MiniaturaViewTests(FakeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(thumbnails, '_store', thumbnails.ThumbnailStore(directory.name, 10 ** 6))
+        self.store = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Las imágenes del catálogo falso no se descargan: todas van al marcador
+        patcher = mock.patch.object(thumbnails, 'download', side_effect=thumbnails.BrokenImage('sin red'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_placeholder_with_short_cache(self):
+        response = self.client.get(reverse('products:miniatura', args=[1, 160]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn(f"max-age={thumbnails.get_config()['BROKEN_TTL']}", response['Cache-Control'])
+        self.assertEqual(
+            self.client.get(reverse('products:miniatura', args=[1, 160]), HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304,
+        )
+
+    def test_unknown_size(self):
+        self.assertEqual(self.client.get(reverse('products:miniatura', args=[1, 123])).status_code, 404)
+
+    def test_regenerates_evicted_file(self):
+        first = thumbnails.get_thumbnail
+        calls = []
+
+        def evicted_once(url, size):
+            path, digest, ok = first(url, size)
+            calls.append(path)
+            if len(calls) == 1:
+                path.unlink()
+            return path, digest, ok
+
+        with mock.patch.object(thumbnails, 'get_thumbnail', evicted_once):
+            response = self.client.get(reverse('products:miniatura', args=[1, 160]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content))
+        self.assertEqual(len(calls), 2)
+
+
+class EditarProductoTests(FakeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('editor', password='x'))
+        self.url = reverse('products:api_editar_producto', args=[1])
+        self.data = {
+            'title': 'Editado', 'price': 10, 'description': 'Desc', 'categoryId': 1,
+            'images': ['https://i.imgur.com/a.jpeg'],
+        }
+
+    def _put(self, **changes):
+        return self.client.put(self.url, json.dumps({**self.data, **changes}), content_type='application/json')
+
+    def test_updates(self):
+        response = self._put()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fake_api.catalog.get(1)['title'], 'Editado')
+
+    def test_invalid_values_are_400(self):
+        for changes in ({'price': 'abc'}, {'categoryId': 'uno'}, {'categoryId': [1]},
+                        {'images': ['http://example.com:abc/x.jpg']}):
+            with self.subTest(changes=changes):
+                response = self._put(**changes)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+        self.assertNotEqual(self.fake_api.catalog.get(1)['title'], 'Editado')
+
+
+# ---------------------------
+# LISTADO EN STREAMING (jsonstream.py, streaming.py)
+# ---------------------------
+class ChunkedResponse:
+    """
+    Lo mínimo de requests.Response que usa iter_json_array.
+    """
+
+    def __init__(self, body, size):
+        self.body = body
+        self.size = size
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), self.size):
+            yield self.body[start:start + self.size]
+
+    def close(self):
+        self.closed = True
+
+
+class IterJSONArrayTests(SimpleTestCase):
+    items = [{'id': 1, 'title': 'Cámara "réflex"', 'tags': [1, [2]]}, {'id': 2, 'title': '€ y ñ'}, 3, 'x,]']
+
+    def test_any_chunk_boundary(self):
+        body = json.dumps(self.items, ensure_ascii=False, indent=1).encode()
+        # Trozos de 1 byte parten también los caracteres UTF-8 de varios bytes
+        for size in (1, 2, 3, 7, len(body)):
+            with self.subTest(size=size):
+                response = ChunkedResponse(body, size)
+                self.assertEqual(list(iter_json_array(response)), self.items)
+                self.assertTrue(response.closed)
+
+    def test_empty(self):
+        self.assertEqual(list(iter_json_array(ChunkedResponse(b' [ ] ', 1))), [])
+
+    def test_invalid(self):
+        for body in (b'{"a": 1}', b'[{"id": 1}, {"id"'):
+            with self.subTest(body=body), self.assertRaises(requests.exceptions.InvalidJSONError):
+                list(iter_json_array(ChunkedResponse(body, 4)))
+
+
+@override_settings(PRODUCTS_STREAM_CHUNK_SIZE=7)
+class StreamListingTests(FakeAPITestCase):
+    url = reverse_lazy('products:products_stream')
+
+    def test_wsgi_streams_every_product(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.is_async)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('class="card-title"'), self.products)
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        response = await AsyncClient().get(self.url)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # Cabecera, cinco bloques de tarjetas y pie, sin juntarlos
+        self.assertEqual(len(chunks), 7)
+        self.assertEqual(b''.join(chunks).decode().count('class="card-title"'), self.products)
+
+    async def test_asgi_gzip_streams(self):
+        response = await AsyncClient().get(self.url, headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 2)
+        body = zlib.decompress(b''.join(chunks), 16 + zlib.MAX_WBITS).decode()
+        self.assertEqual(body.count('class="card-title"'), self.products)
+
+
+# ---------------------------
+# CIRCUIT BREAKER (breaker.py)
+# ---------------------------
+@override_settings(CACHES=TEST_CACHES)
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.breaker = CircuitBreaker('tests', failure_threshold=2, reset_timeout=30)
+
+    def _fail(self):
+        raise requests.exceptions.ConnectionError('caída')
+
+    def test_opens_after_threshold(self):
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.breaker.call(self._fail)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        func = mock.Mock()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(func)
+        func.assert_not_called()
+
+    def test_client_errors_do_not_count(self):
+        response = requests.Response()
+        response.status_code = 404
+        error = requests.exceptions.HTTPError(response=response)
+        for _ in range(3):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.breaker.call(mock.Mock(side_effect=error))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_allows_one_trial(self):
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.breaker.call(self._fail)
+        later = time.time() + 31
+        with mock.patch('products.breaker.time.time', return_value=later):
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            self.assertTrue(self.breaker.allow_request())
+            # Solo un worker hace la petición de prueba
+            self.assertFalse(self.breaker.allow_request())
+
+    def test_trial_success_closes(self):
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.breaker.call(self._fail)
+        with mock.patch('products.breaker.time.time', return_value=time.time() + 31):
+            self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(self.breaker.snapshot()['state'], CLOSED)
+        self.assertEqual(self.breaker.snapshot()['failures'], 0)
+
+    def test_trial_failure_reopens(self):
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.breaker.call(self._fail)
+        later = time.time() + 31
+        with mock.patch('products.breaker.time.time', return_value=later):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.breaker.call(self._fail)
+            self.assertEqual(self.breaker.state, OPEN)
+
+
+class LastGoodTests(FakeAPITestCase):
+    params = {'offset': 0, 'limit': 5}
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(product_cache, 'schedule_refresh')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, self.fake_api, 'error_rate', 0.0)
+
+    def _outage(self):
+        self.fake_api.error_rate = 1.0
+        return product_cache.get_products_or_stale(self.params)
+
+    def test_served_when_api_fails(self):
+        productos, stale = product_cache.get_products_or_stale(self.params)
+        self.assertFalse(stale)
+        product_cache.invalidate_lists()
+
+        self.assertEqual(self._outage(), (productos, True))
+        product_cache.schedule_refresh.assert_called_once_with(self.params)
+
+    def test_without_last_good_raises(self):
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self._outage()
+
+    def test_applies_later_writes(self):
+        productos, _ = product_cache.get_products_or_stale(self.params)
+        editado = {**productos[1], 'title': 'Editado'}
+        product_cache.product_deleted(productos[0]['id'])
+        product_cache.product_saved(editado)
+        # Edición sin el producto completo: no se sabe cómo quedó
+        product_cache.product_saved(None, product_id=productos[2]['id'])
+
+        stale, _ = self._outage()
+        self.assertEqual(stale, [editado] + productos[3:])
+        self.assertEqual(product_cache.cached_products(self.params), stale)
+
+    def test_ignores_writes_before_the_list(self):
+        productos, _ = product_cache.get_products_or_stale(self.params)
+        product_cache.product_saved(None, product_id=productos[0]['id'])
+        # La lista vuelve a pedirse después de la escritura y ya la refleja
+        fresh, _ = product_cache.get_products_or_stale(self.params)
+        product_cache.invalidate_lists()
+
+        self.assertEqual(self._outage(), (fresh, True))
+
+
+# ---------------------------
+# OUTBOX (outbox.py)
+# ---------------------------
+@override_settings(PRODUCTS_OUTBOX={'ENABLED': True, 'MAX_WORKERS': 2, 'BACKOFF_FACTOR': 0})
+class OutboxTests(FakeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('vendedor', password='x')
+        self.client.force_login(self.user)
+        self.data = {
+            'nombre': 'Taza azul', 'precio': 12, 'descripcion': 'Taza de cerámica',
+            'categoriaId': 1, 'imagen': 'https://placehold.co/600x400',
+        }
+
+    def _crear(self, key, client=None):
+        return (client or self.client).post(
+            reverse('products:api_crear_producto'), json.dumps(self.data),
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_same_key_is_enqueued_once(self):
+        first = self._crear('clave-1')
+        second = self._crear('clave-1')
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(first.json()['operation']['id'], second.json()['operation']['id'])
+        self.assertEqual(OutboxOperation.objects.count(), 1)
+
+    def test_key_of_another_user_conflicts(self):
+        self._crear('clave-1')
+        other = self.client_class()
+        other.force_login(User.objects.create_user('otro', password='x'))
+        self.assertEqual(self._crear('clave-1', client=other).status_code, 409)
+
+    def test_drain_sends_and_completes(self):
+        self._crear('clave-1')
+        before = len(self.fake_api.catalog.products)
+
+        processed = outbox.drain()
+
+        self.assertEqual(len(processed), 1)
+        operation = OutboxOperation.objects.get(idempotency_key='clave-1')
+        self.assertEqual(operation.status, OutboxOperation.DONE)
+        self.assertEqual(operation.attempts, 1)
+        self.assertIsNotNone(operation.product_id)
+        self.assertEqual(len(self.fake_api.catalog.products), before + 1)
+        self.assertEqual(self.fake_api.catalog.get(operation.product_id)['title'], 'Taza azul')
+        # Nada más que enviar, ni siquiera reenviando la misma clave
+        self._crear('clave-1')
+        self.assertEqual(outbox.drain(), [])
+        self.assertEqual(len(self.fake_api.catalog.products), before + 1)
+
+    def test_operations_of_one_product_keep_order(self):
+        outbox.enqueue(OutboxOperation.UPDATE, self.user, {'title': 'Primero'}, product_id=1)
+        outbox.enqueue(OutboxOperation.UPDATE, self.user, {'title': 'Segundo'}, product_id=1)
+
+        self.assertEqual(len(outbox.drain()), 1)
+        self.assertEqual(self.fake_api.catalog.get(1)['title'], 'Primero')
+        self.assertEqual(len(outbox.drain()), 1)
+        self.assertEqual(self.fake_api.catalog.get(1)['title'], 'Segundo')
+
+    def test_invalid_key(self):
+        self.assertEqual(self._crear('x' * (outbox.MAX_KEY_LENGTH + 1)).status_code, 400)
+
+    def test_catalog_version_bumps_once(self):
+        version = product_cache.version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self._crear('clave-1')
+        self.assertEqual(len(callbacks), 1)
+        # Encolar solo cambia lo pendiente: las listas, agregados y buscador siguen valiendo
+        self.assertEqual(product_cache.version(), version)
+
+        outbox.drain()
+        self.assertEqual(product_cache.version(), version + 1)
+
+    def test_listing_shows_pending_changes(self):
+        url = reverse('products:products')
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.enqueue(OutboxOperation.DELETE, self.user, product_id=20)
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(outbox.pending_operations()[0]['product_id'], 20)
+
+        outbox.drain()
+        self.assertEqual(outbox.pending_operations(), [])
+        self.assertIsNone(self.fake_api.catalog.get(20))
+
+    def test_failed_operation_leaves_the_listing(self):
+        self.fake_api.error_rate = 1.0
+        self.addCleanup(setattr, self.fake_api, 'error_rate', 0.0)
+        version = product_cache.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.enqueue(OutboxOperation.DELETE, self.user, product_id=1)
+        self.assertEqual(len(outbox.pending_operations()), 1)
+
+        with self.settings(PRODUCTS_OUTBOX={**settings.PRODUCTS_OUTBOX, 'ENABLED': True, 'MAX_ATTEMPTS': 1}):
+            outbox.drain()
+
+        self.assertEqual(OutboxOperation.objects.get().status, OutboxOperation.FAILED)
+        self.assertEqual(outbox.pending_operations(), [])
+        self.assertEqual(product_cache.version(), version)
+
+
+
+# ---------------------------
+# CACHÉ DEL CATÁLOGO (cache.py)
+# ---------------------------
+class ProductCacheTests(FakeAPITestCase):
+    params = {'offset': 0, 'limit': 5}
+
+    def setUp(self):
+        super().setUp()
+        product_cache.reset_stats()
+        self.addCleanup(product_cache.reset_stats)
+
+    def test_miss_then_hit(self):
+        with mock.patch.object(PlatziAPIService, 'get_products', autospec=True,
+                               side_effect=PlatziAPIService.get_products) as get_products:
+            first = product_cache.get_products(self.params)
+            second = product_cache.get_products(self.params)
+
+        self.assertEqual(first, second)
+        get_products.assert_called_once()
+        self.assertEqual(product_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_list_fills_products_by_id(self):
+        productos = product_cache.get_products(self.params)
+        with mock.patch.object(PlatziAPIService, 'get_product') as get_product:
+            self.assertEqual(product_cache.get_product(productos[0]['id']), productos[0])
+        get_product.assert_not_called()
+
+    def test_writes_bump_version(self):
+        product_cache.get_products(self.params)
+        version = product_cache.version()
+
+        product_cache.product_saved({'id': 1, 'title': 'Nuevo'})
+        self.assertEqual(product_cache.version(), version + 1)
+        self.assertEqual(product_cache.get_product(1)['title'], 'Nuevo')
+        product_cache.product_deleted(2)
+        self.assertEqual(product_cache.version(), version + 2)
+
+        # Las listas de la versión anterior ya no se sirven
+        self.assertIsNone(product_cache.cache.get(product_cache.list_key(self.params)))
+        product_cache.get_products(self.params)
+        self.assertEqual(product_cache.stats()['misses'], 2)
+
+    def test_incomplete_save_drops_product(self):
+        producto = product_cache.get_product(3)
+        product_cache.product_saved(None, product_id=3)
+        self.assertIsNone(product_cache.cache.get(product_cache.product_key(3)))
+        self.assertEqual(product_cache.get_product(3), producto)
+
+    def test_version_recreated(self):
+        product_cache.cache.delete(VERSION_KEY)
+        product_cache.invalidate_lists()
+        self.assertEqual(product_cache.version(), 2)
+
+
+# ---------------------------
+# LISTADO: PAGINACIÓN, FILTROS Y ORDEN (listing.py)
+# ---------------------------
+class ListingQueryTests(SimpleTestCase):
+
+    def _query(self, **params):
+        return ListingQuery.from_request(RequestFactory().get('/products/', params))
+
+    def test_invalid_values_are_ignored(self):
+        query = self._query(page='-1', limit='mucho', category='x', price_min='-5', sort='random')
+        self.assertEqual((query.page, query.limit, query.category, query.price_min, query.sort), (1, 20, None, None, ''))
+        self.assertFalse(query.has_filters)
+        self.assertEqual(self._query(limit='100000').limit, MAX_LIMIT)
+
+    def test_filter_params(self):
+        query = self._query(title=' taza ', category='2', price_max='50')
+        self.assertEqual(query.filter_params(), {'title': 'taza', 'categoryId': 2, 'price_min': 0, 'price_max': 50.0})
+
+
+class ProductPageTests(FakeAPITestCase):
+
+    def _page(self, **params):
+        return get_product_page(ListingQuery(**params))
+
+    def _ids(self, page):
+        return [p['id'] for p in page.productos]
+
+    def test_pagination(self):
+        page = self._page(page=2, limit=7)
+        self.assertEqual(self._ids(page), list(range(8, 15)))
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        last = self._page(page=5, limit=7)
+        self.assertEqual(self._ids(last), [29, 30])
+        self.assertFalse(last.has_next())
+
+    def test_filters(self):
+        page = self._page(category=2, limit=100)
+        self.assertTrue(page.productos)
+        self.assertTrue(all(p['category']['id'] == 2 for p in page.productos))
+
+        page = self._page(price_min=100, price_max=500, limit=100)
+        self.assertTrue(all(100 <= p['price'] <= 500 for p in page.productos))
+        self.assertEqual(len(page.productos), sum(100 <= p['price'] <= 500 for p in self.fake_api.catalog.products.values()))
+
+    def test_sort(self):
+        page = self._page(sort='-price', limit=10)
+        precios = sorted((p['price'] for p in self.fake_api.catalog.products.values()), reverse=True)
+        self.assertEqual([p['price'] for p in page.productos], precios[:10])
+        self.assertEqual((page.count, page.num_pages), (30, 3))
+
+        titles = [p['title'].lower() for p in self._page(sort='title', limit=100).productos]
+        self.assertEqual(titles, sorted(titles))
+
+    def test_sorted_page_out_of_range(self):
+        page = self._page(sort='price', page=99, limit=10)
+        self.assertEqual(page.number, 3)
+        self.assertFalse(page.has_next())
+
+    def test_view(self):
+        response = self.client.get(reverse('products:products'), {'category': 1, 'sort': 'price', 'limit': 4})
+        self.assertEqual(response.status_code, 200)
+        productos = response.context['productos']
+        self.assertEqual(len(productos), 4)
+        self.assertEqual([p['price'] for p in productos], sorted(p['price'] for p in productos))
+
+
+# ---------------------------
+# ESPEJO LOCAL (mirror.py, sync_catalog)
+# ---------------------------
+class SyncCatalogTests(FakeAPITestCase):
+
+    def test_first_sync_creates_everything(self):
+        self.assertFalse(mirror.is_fresh())
+        sync = mirror.sync_catalog(page_size=7)
+
+        total = len(self.fake_api.catalog.products)
+        self.assertEqual((sync.created, sync.updated, sync.deleted, sync.unchanged), (total, 0, 0, 0))
+        self.assertEqual(Product.objects.count(), total)
+        self.assertTrue(mirror.is_fresh())
+        producto = self.fake_api.catalog.get(1)
+        self.assertEqual(mirror.get_product(1)['images'], producto['images'])
+
+    def test_second_sync_applies_changes(self):
+        mirror.sync_catalog(page_size=7)
+        catalog = self.fake_api.catalog
+        # Otro updatedAt aunque la prueba vaya más rápido que el reloj
+        catalog.update(3, {'title': 'Editado'})['updatedAt'] = '2030-01-01T00:00:00.000Z'
+        catalog.delete(4)
+        nuevo = catalog.create({'title': 'Nuevo', 'price': 5, 'images': ['https://i.imgur.com/n.jpeg']})
+
+        sync = mirror.sync_catalog(page_size=7)
+
+        self.assertEqual((sync.created, sync.updated, sync.deleted), (1, 1, 1))
+        self.assertEqual(sync.unchanged, len(catalog.products) - 2)
+        self.assertEqual(Product.objects.get(pk=3).title, 'Editado')
+        self.assertFalse(Product.objects.filter(pk=4).exists())
+        self.assertEqual(mirror.get_product(nuevo['id'])['images'], ['https://i.imgur.com/n.jpeg'])
+
+    def test_incomplete_sync_does_not_delete(self):
+        mirror.sync_catalog(page_size=7)
+        self.fake_api.catalog.delete(5)
+        real_get_products = PlatziAPIService.get_products
+
+        def second_page_fails(api, params=None):
+            if params['offset']:
+                raise requests.exceptions.ConnectionError('caída')
+            return real_get_products(api, params)
+
+        with mock.patch.object(PlatziAPIService, 'get_products', second_page_fails), \
+                self.assertRaises(requests.exceptions.ConnectionError):
+            mirror.sync_catalog(page_size=7)
+        # Sin llegar a la última página no se sabe qué desapareció
+        self.assertTrue(Product.objects.filter(pk=5).exists())
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('sync_catalog', page_size=10, stdout=output)
+        self.assertIn(f'{len(self.fake_api.catalog.products)} nuevos', output.getvalue())
+
+
+# ---------------------------
+# ETAG Y CACHE-CONTROL (conditional.py)
+# ---------------------------
+class ConditionalTests(FakeAPITestCase):
+
+    def _check_revalidation(self, url):
+        # La primera visita fija la cookie CSRF, que forma parte del ETag
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(f'max-age={settings.PRODUCTS_PAGE_MAX_AGE}', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(again['Cache-Control'], response['Cache-Control'])
+        return response['ETag']
+
+    def test_listing(self):
+        url = reverse('products:products')
+        etag = self._check_revalidation(url)
+        self.assertNotEqual(self._check_revalidation(url + '?page=2'), etag)
+
+        # Una escritura cambia la versión del catálogo
+        product_cache.product_saved({**self.fake_api.catalog.get(1), 'title': 'Editado'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail(self):
+        url = reverse('products:pagar', args=[2])
+        etag = self._check_revalidation(url)
+
+        producto = {**self.fake_api.catalog.get(2), 'updatedAt': '2030-01-01T00:00:00.000Z'}
+        product_cache.product_saved(producto)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_authenticated_is_private(self):
+        url = reverse('products:products')
+        anonymous = self._check_revalidation(url)
+        self.client.force_login(User.objects.create_user('comprador', password='x'))
+
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        # El HTML lleva el menú del usuario: no vale el ETag del anónimo
+        self.assertNotEqual(response['ETag'], anonymous)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+# ---------------------------
+# LOTES NDJSON (views.bulk_productos)
+# ---------------------------
+@override_settings(PRODUCTS_BULK={'MAX_ITEMS': 3})
+class BulkNDJSONTests(FakeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('vendedor', password='x'))
+
+    def _post(self, operations):
+        body = '\n'.join(json.dumps(operation) for operation in operations)
+        return self.client.post(reverse('products:api_bulk_productos'), body, content_type='application/x-ndjson')
+
+    def test_within_limit(self):
+        data = {
+            'title': 'Nuevo', 'price': 10, 'description': 'Descripción', 'categoryId': 1,
+            'images': ['https://placehold.co/600x400'],
+        }
+        response = self._post([{'op': 'update', 'id': 1, 'data': data}])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.fake_api.catalog.get(1)['title'], 'Nuevo')
+
+    def test_invalid_operation_sends_nothing(self):
+        response = self._post([{'op': 'delete', 'id': 2}, {'op': 'update', 'id': 3, 'data': {'price': 'abc'}}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1])
+        self.assertIsNotNone(self.fake_api.catalog.get(2))
+
+    def test_too_many_items(self):
+        response = self._post([{'op': 'delete', 'id': product_id} for product_id in range(1, 5)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('entre 1 y 3', response.json()['error'])
+        # No se envió ninguna
+        self.assertIsNotNone(self.fake_api.catalog.get(1))
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_body_too_big(self):
+        response = self._post([{'op': 'delete', 'id': 1, 'relleno': 'x' * 200}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNotNone(self.fake_api.catalog.get(1))
+
+
+# ---------------------------
+# CURSOR Y PROYECCIÓN (api.py)
+# ---------------------------
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        for offset, after in ((0, None), (20, 57), (1000, None)):
+            with self.subTest(offset=offset, after=after):
+                self.assertEqual(api.decode_cursor(api.encode_cursor(offset, after)), (offset, after))
+
+    def test_empty_cursor_is_first_page(self):
+        self.assertEqual(api.decode_cursor(None), (0, None))
+        self.assertEqual(api.decode_cursor(''), (0, None))
+
+    def test_invalid_cursor(self):
+        invalid = [
+            'no-es-base64!',
+            api.encode_cursor(-1, None),
+            api.encode_cursor(0, 'abc'),
+            'eyJ4IjoxfQ',  # {"x":1}
+        ]
+        for value in invalid:
+            with self.subTest(value=value), self.assertRaises(api.InvalidParameter):
+                api.decode_cursor(value)
+
+    def test_parse_fields(self):
+        self.assertEqual(api.parse_fields(None), api.DEFAULT_FIELDS)
+        self.assertEqual(api.parse_fields('id, title,id'), ('id', 'title'))
+        with self.assertRaises(api.InvalidParameter):
+            api.parse_fields('id,password')
+
+    def test_project(self):
+        producto = {'id': 1, 'title': 'Taza', 'price': 5, 'category': {'id': 3, 'name': 'Hogar'}}
+        self.assertEqual(api._project(producto, ('id', 'categoryId')), {'id': 1, 'categoryId': 3})
+        self.assertEqual(api._project({'id': 2}, ('id', 'categoryId')), {'id': 2, 'categoryId': None})
+
+
+class ProductListAPITests(FakeAPITestCase):
+
+    def test_pages_with_cursor(self):
+        url = reverse('products:api_productos')
+        first = self.client.get(url, {'fields': 'id,title', 'limit': 10}).json()
+        self.assertTrue(first['success'])
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(set(first['results'][0]), {'id', 'title'})
+
+        second = self.client.get(url, {'fields': 'id,title', 'limit': 10, 'cursor': first['next']}).json()
+        first_ids = [row['id'] for row in first['results']]
+        second_ids = [row['id'] for row in second['results']]
+        self.assertEqual(len(second_ids), 10)
+        self.assertFalse(set(first_ids) & set(second_ids))
+
+    def test_walks_whole_catalog(self):
+        url = reverse('products:api_productos')
+        ids, cursor = [], None
+        while True:
+            params = {'fields': 'id', 'limit': 7, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(url, params).json()
+            ids += [row['id'] for row in page['results']]
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(sorted(ids), sorted(self.fake_api.catalog.products))
+
+    def test_invalid_parameters(self):
+        url = reverse('products:api_productos')
+        self.assertEqual(self.client.get(url, {'fields': 'secreto'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'x'}).status_code, 400)
+
+
+# ---------------------------
+# BUSCADOR (search.py)
+# ---------------------------
+SEARCH_DOCS = [
+    {'id': 1, 'title': 'Camiseta básica', 'description': 'De algodón', 'category': {'id': 1, 'name': 'Ropa'}},
+    {'id': 2, 'title': 'Taza', 'description': 'Para regalar con una camiseta', 'category': {'id': 2, 'name': 'Hogar'}},
+    {'id': 3, 'title': 'Cámara réflex', 'description': 'Con lente', 'category': {'id': 3, 'name': 'Electrónica'}},
+]
+
+
+def _ids(results):
+    productos, total = results
+    return [p['id'] for p in productos], total
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MemoryIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.index = search.MemoryIndex()
+        patcher = mock.patch.object(self.index, '_load_catalog', return_value=list(SEARCH_DOCS))
+        self.load_catalog = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prefix_and_title_ranking(self):
+        ids, total = _ids(self.index.search('cam'))
+        self.assertEqual(total, 3)
+        # "cam" en el título pesa más que en la descripción
+        self.assertEqual(set(ids[:2]), {1, 3})
+        self.assertEqual(ids[2], 2)
+
+    def test_all_terms_and_accents(self):
+        self.assertEqual(_ids(self.index.search('camis REGAL')), ([2], 1))
+        self.assertEqual(_ids(self.index.search('camara')), ([3], 1))
+        self.assertEqual(_ids(self.index.search('electronica')), ([3], 1))
+        self.assertEqual(_ids(self.index.search('zapatos')), ([], 0))
+        self.assertEqual(_ids(self.index.search('  ')), ([], 0))
+
+    def test_pagination(self):
+        self.assertEqual(_ids(self.index.search('cam', limit=1, offset=2)), ([2], 3))
+
+    def test_incremental_updates(self):
+        self.index.search('cam')
+        # Cada escritura cambia la versión y avisa al índice (receivers.py)
+        product_cache.invalidate_lists()
+        self.index.index_product({'id': 4, 'title': 'Camisa', 'description': '', 'category': {'name': 'Ropa'}})
+        product_cache.invalidate_lists()
+        self.index.remove_product(1)
+        product_cache.invalidate_lists()
+        self.index.index_product({**SEARCH_DOCS[2], 'title': 'Objetivo'})
+
+        self.assertEqual(_ids(self.index.search('camis')), ([4, 2], 2))
+        self.assertEqual(_ids(self.index.search('objetivo')), ([3], 1))
+        self.assertEqual(_ids(self.index.search('camara')), ([], 0))
+        self.load_catalog.assert_called_once()
+
+    def test_foreign_write_rebuilds(self):
+        self.index.search('cam')
+        # Dos versiones de golpe: escribió otro worker y no sabemos qué
+        product_cache.invalidate_lists()
+        product_cache.invalidate_lists()
+        self.index.search('cam')
+        self.assertEqual(self.load_catalog.call_count, 2)
+
+
+class FTS5IndexTests(FakeAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        mirror.sync_catalog()
+        if not isinstance(search.get_index(), search.FTS5Index):
+            self.skipTest('SQLite sin FTS5')
+
+    def test_search_after_sync(self):
+        productos = self.fake_api.catalog.products.values()
+        expected = {p['id'] for p in productos if any(w.startswith('cami') for w in search.tokenize(p['title']))}
+        ids, total = _ids(search.search('cami', limit=100))
+        # Aparecen todos los que lo llevan en el título, y antes que el resto
+        self.assertEqual(set(ids[:len(expected)]), expected)
+        self.assertEqual(total, len(ids))
+
+    def test_signals_update_index(self):
+        producto = {**self.fake_api.catalog.get(7), 'title': 'Paraguas plegable'}
+        product_saved.send(sender=None, producto=producto)
+        self.assertEqual(_ids(search.search('paragu')), ([7], 1))
+
+        product_deleted.send(sender=None, product_id=7)
+        self.assertEqual(_ids(search.search('paragu')), ([], 0))
+
+    def test_invalid_query(self):
+        self.assertEqual(_ids(search.search('"')), ([], 0))
+
+
+# ---------------------------
+# MÉTRICAS (metrics.py, /metrics)
+# ---------------------------
+class MetricFormatTests(SimpleTestCase):
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('prueba_seconds', 'Prueba.', ('view',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, 'a"b')
+        self.assertEqual(histogram.expose(), [
+            '# HELP prueba_seconds Prueba.',
+            '# TYPE prueba_seconds histogram',
+            'prueba_seconds_bucket{view="a\\"b",le="0.1"} 1',
+            'prueba_seconds_bucket{view="a\\"b",le="1.0"} 2',
+            'prueba_seconds_bucket{view="a\\"b",le="+Inf"} 3',
+            'prueba_seconds_sum{view="a\\"b"} 5.55',
+            'prueba_seconds_count{view="a\\"b"} 3',
+        ])
+
+    def test_counter(self):
+        counter = metrics.Counter('prueba_total', 'Prueba.', ('cache', 'result'))
+        counter.inc('products', 'hit')
+        counter.inc('products', 'hit', amount=2)
+        self.assertEqual(counter.expose()[2:], ['prueba_total{cache="products",result="hit"} 3'])
+
+
+class MetricsViewTests(FakeAPITestCase):
+    url = reverse_lazy('products:metricas')
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_hidden_without_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_open_in_debug(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_token(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_records_requests(self):
+        listing = self.client.get(reverse('products:products'))
+        # La primera vez el listado sale de la API: aparece en Server-Timing
+        self.assertRegex(listing['Server-Timing'], r'upstream;dur=[\d.]+;desc="\d+".*total;dur=')
+
+        body = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+        self.assertIn(
+            'platzi_http_request_duration_seconds_count{view="products:products",method="GET",status="200"}', body,
+        )
+        self.assertRegex(body, r'platzi_upstream_responses_total\{endpoint="products",status="200"\} \d+')
+        self.assertIn('platzi_circuit_open{state="closed"} 0', body)
+        self.assertTrue(body.endswith('\n'))
+
+
+# ---------------------------
+# CACHÉ DE PÁGINAS (pagecache.py)
+# ---------------------------
+CSRF_VALUE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+@override_settings(PAGE_CACHE={'ALIAS': 'default', 'TIMEOUT': 30})
+class PageCacheTests(FakeAPITestCase):
+    url = reverse_lazy('products:pagar', args=[4])
+
+    def _hits(self):
+        return metrics.CACHE_REQUESTS.value('pages', 'hit')
+
+    def _lookups(self):
+        return self._hits() + metrics.CACHE_REQUESTS.value('pages', 'miss')
+
+    def test_csrf_token_per_visitor(self):
+        first = Client(enforce_csrf_checks=True)
+        first_token = CSRF_VALUE.search(first.get(self.url).content.decode()).group(1)
+
+        hits = self._hits()
+        second = Client(enforce_csrf_checks=True)
+        response = second.get(self.url)
+        self.assertEqual(self._hits(), hits + 1)
+        content = response.content.decode()
+        self.assertNotIn(PLACEHOLDER.decode(), content)
+        second_token = CSRF_VALUE.search(content).group(1)
+
+        # El token servido desde caché vale para la cookie del segundo visitante
+        login = reverse('admin:login')
+        data = {'username': 'nadie', 'password': 'x'}
+        self.assertEqual(second.post(login, {**data, 'csrfmiddlewaretoken': second_token}).status_code, 200)
+        self.assertEqual(second.post(login, {**data, 'csrfmiddlewaretoken': first_token}).status_code, 403)
+
+    def test_second_visit_revalidates(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_skipped_with_session_cookie(self):
+        self.client.get(self.url)
+        lookups = self._lookups()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'sesion-anonima'
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self._lookups(), lookups)
+
+    def test_skipped_when_authenticated(self):
+        self.client.get(self.url)
+        self.client.force_login(User.objects.create_user('comprador', password='x'))
+        lookups = self._lookups()
+        self.assertIn('private', self.client.get(self.url)['Cache-Control'])
+        self.assertEqual(self._lookups(), lookups)
+
+    def test_skipped_with_pending_messages(self):
+        self.client.get(self.url)
+        lookups = self._lookups()
+        with mock.patch('products.pagecache.messages.get_messages', return_value=['Producto eliminado']):
+            self.client.get(self.url)
+        self.assertEqual(self._lookups(), lookups)
+
+    def test_write_invalidates(self):
+        self.client.get(self.url)
+        product_cache.invalidate_lists()
+        misses = metrics.CACHE_REQUESTS.value('pages', 'miss')
+        self.client.get(self.url)
+        self.assertEqual(metrics.CACHE_REQUESTS.value('pages', 'miss'), misses + 1)
+
+
+# ---------------------------
+# COMPRESIÓN (middleware.CompressionMiddleware)
+# ---------------------------
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = ('<p>producto</p>' * 200).encode()
+
+    def _process(self, accept, response=None, content_type='text/html; charset=utf-8'):
+        if response is None:
+            response = HttpResponse(self.body, content_type=content_type)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    @skipUnless(brotli, 'brotli no está instalado')
+    def test_prefers_brotli(self):
+        response = self._process('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content).rstrip(), self.body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+    def test_gzip(self):
+        for accept in ('gzip', 'br;q=0, gzip'):
+            with self.subTest(accept=accept):
+                response = self._process(accept)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(zlib.decompress(response.content, 16 + zlib.MAX_WBITS), self.body)
+
+    def test_not_compressed(self):
+        self.assertFalse(self._process('identity').has_header('Content-Encoding'))
+        self.assertFalse(self._process('gzip', content_type='image/png').has_header('Content-Encoding'))
+        small = HttpResponse(b'{"ok": true}', content_type='application/json')
+        self.assertFalse(self._process('gzip', small).has_header('Content-Encoding'))
+        encoded = HttpResponse(self.body, content_type='text/css', headers={'Content-Encoding': 'br'})
+        self.assertEqual(self._process('gzip', encoded).content, self.body)
+
+    def test_min_size(self):
+        body = json.dumps([{'id': 1, 'title': 'Taza'}] * 12).encode()
+        self.assertLess(len(body), 512)
+        self.assertFalse(self._process('gzip', HttpResponse(body, content_type='application/json')).has_header(
+            'Content-Encoding'
+        ))
+        with self.settings(COMPRESSION={'MIN_SIZE': 100}):
+            response = self._process('gzip', HttpResponse(body, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_etag_becomes_weak(self):
+        response = HttpResponse(self.body, content_type='text/html', headers={'ETag': '"abc"'})
+        self.assertEqual(self._process('gzip', response)['ETag'], 'W/"abc"')
+
+    def test_streaming(self):
+        chunks = [b'<html>', self.body, self.body, b'</html>']
+        response = self._process('gzip', StreamingHttpResponse(iter(chunks), content_type='text/html'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        compressed = list(response.streaming_content)
+        # Un bloque comprimido por bloque recibido, más el cierre
+        self.assertEqual(len(compressed), len(chunks) + 1)
+        self.assertEqual(zlib.decompress(b''.join(compressed), 16 + zlib.MAX_WBITS), b''.join(chunks))
+
+
+# ---------------------------
+# SINGLE-FLIGHT (singleflight.py)
+# ---------------------------
+class SingleFlightTests(SimpleTestCase):
+
+    def _run_follower(self, flight, key, results):
+        def follower():
+            try:
+                results.append(flight.do(key, mock.Mock(return_value='propio'), wait_timeout=5))
+            except Exception as exc:
+                results.append(exc)
+        thread = threading.Thread(target=follower)
+        thread.start()
+        # El seguidor ya espera al líder
+        for _ in range(100):
+            if flight.in_flight() and thread.is_alive():
+                break
+            time.sleep(0.01)
+        time.sleep(0.05)
+        return thread
+
+    def test_follower_shares_result(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def leader_fn():
+            calls.append(1)
+            release.wait(5)
+            return 'compartido'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('k', leader_fn, wait_timeout=5)))
+        leader.start()
+        while not flight.in_flight():
+            time.sleep(0.01)
+        follower = self._run_follower(flight, 'k', results)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(results, ['compartido', 'compartido'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_slow_leader_follower_calls_itself(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=flight.do, args=('k', lambda: release.wait(5), 5))
+        leader.start()
+        while not flight.in_flight():
+            time.sleep(0.01)
+        try:
+            self.assertEqual(flight.do('k', lambda: 'propio', wait_timeout=0.01), 'propio')
+        finally:
+            release.set()
+            leader.join()
+        self.assertEqual(flight.do('k', lambda: 'nuevo', wait_timeout=5), 'nuevo')
+
+    def test_follower_gets_leader_error(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        error = requests.exceptions.ConnectionError('caída')
+
+        def leader_fn():
+            release.wait(5)
+            raise error
+
+        leader_results = []
+
+        def leader():
+            try:
+                flight.do('k', leader_fn, wait_timeout=5)
+            except Exception as exc:
+                leader_results.append(exc)
+
+        leader_thread = threading.Thread(target=leader)
+        leader_thread.start()
+        while not flight.in_flight():
+            time.sleep(0.01)
+        results = []
+        follower = self._run_follower(flight, 'k', results)
+        release.set()
+        leader_thread.join()
+        follower.join()
+
+        self.assertIs(leader_results[0], error)
+        self.assertIsInstance(results[0], requests.exceptions.ConnectionError)
+        # Cada hilo relanza su propia copia
+        self.assertIsNot(results[0], error)
+        self.assertEqual(str(results[0]), 'caída')
+        self.assertEqual(flight.in_flight(), 0)
+
+
+# ---------------------------
+# AGREGADOS (aggregates.py)
+# ---------------------------
+@override_settings(CACHES=TEST_CACHES)
+class AggregatesPatchTests(SimpleTestCase):
+    """
+    Parchear una fila debe dar lo mismo que recalcular desde el catálogo.
+    """
+    names = {1: 'Ropa', 2: 'Hogar'}
+    rows = [(1, 5.0, 1), (2, 15.0, 1), (3, 60.0, 2), (4, 600.0, 2), (5, 1200.0, aggregates.NO_CATEGORY)]
+
+    def setUp(self):
+        caches['products'].clear()
+
+    def _start(self, rows):
+        version = product_cache.version()
+        aggregates._store(version, aggregates._columns(*zip(*rows)), dict(self.names))
+        # La escritura sube la versión antes de que los receivers parcheen
+        product_cache.invalidate_lists()
+
+    def _expected(self, rows, names):
+        return aggregates.compute(aggregates._columns(*zip(*rows)), names)
+
+    def _implementations(self):
+        yield 'numpy' if aggregates.np is not None else 'python', aggregates.np
+        if aggregates.np is not None:
+            yield 'python', None
+
+    def test_update_matches_recompute(self):
+        for name, np in self._implementations():
+            with self.subTest(name), mock.patch.object(aggregates, 'np', np):
+                caches['products'].clear()
+                self._start(self.rows)
+                aggregates.product_saved({'id': 3, 'price': 8, 'category': {'id': 1, 'name': 'Ropa'}})
+                rows = [row for row in self.rows if row[0] != 3] + [(3, 8.0, 1)]
+                self.assertEqual(aggregates.get_aggregates(), self._expected(rows, self.names))
+
+    def test_create_with_new_category_matches_recompute(self):
+        for name, np in self._implementations():
+            with self.subTest(name), mock.patch.object(aggregates, 'np', np):
+                caches['products'].clear()
+                self._start(self.rows)
+                aggregates.product_saved({'id': 9, 'price': 50, 'category': {'id': 7, 'name': 'Nueva'}})
+                names = {**self.names, 7: 'Nueva'}
+                self.assertEqual(aggregates.get_aggregates(), self._expected(self.rows + [(9, 50.0, 7)], names))
+
+    def test_delete_matches_recompute(self):
+        for name, np in self._implementations():
+            with self.subTest(name), mock.patch.object(aggregates, 'np', np):
+                caches['products'].clear()
+                self._start(self.rows)
+                aggregates.product_deleted(4)
+                rows = [row for row in self.rows if row[0] != 4]
+                self.assertEqual(aggregates.get_aggregates(), self._expected(rows, self.names))
+
+    def test_missed_write_invalidates(self):
+        self._start(self.rows)
+        # Otra escritura que no pasó por los receivers
+        product_cache.invalidate_lists()
+        aggregates.product_saved({'id': 3, 'price': 8, 'category': {'id': 1}})
+        self.assertIsNone(caches['products'].get(aggregates.KEY))
+
+    def test_buckets_are_half_open(self):
+        facets = self._expected([(1, 0.0, 1), (2, 9.99, 1), (3, 10.0, 1), (4, 1000.0, 1)], self.names)
+        counts = {bucket['min']: bucket['count'] for bucket in facets['price_buckets']}
+        self.assertEqual(counts[0], 2)
+        self.assertEqual(counts[10], 1)
+        self.assertEqual(counts[1000], 1)
+        self.assertEqual(facets['price_buckets'][0]['price_max'], 9.99)
+
+
+class FacetsAPITests(FakeAPITestCase):
+    url = reverse_lazy('products:api_facetas_productos')
+
+    def test_computing_answers_503(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        aggregates.schedule_refresh.assert_called_once_with()
+
+    def test_facets(self):
+        aggregates.refresh()
+        data = self.client.get(self.url).json()
+
+        productos = list(self.fake_api.catalog.products.values())
+        self.assertEqual(data['count'], len(productos))
+        self.assertEqual(sum(row['count'] for row in data['categories']), len(productos))
+        self.assertEqual(data['price']['min'], min(p['price'] for p in productos))
+        self.assertEqual(sum(row['count'] for row in data['price_buckets']), len(productos))
+
+    def test_stale_facets_are_served(self):
+        aggregates.refresh()
+        product_cache.invalidate_lists()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        aggregates.schedule_refresh.assert_called_once_with()
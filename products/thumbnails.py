@@ -0,0 +1,309 @@
+"""
+Miniaturas de las imágenes de producto (vista views.miniatura, /img/<id>/<tamaño>).
+
+La imagen original se descarga una sola vez, se reduce con Pillow al
+tamaño pedido (uno de PRODUCTS_THUMBNAILS['SIZES']) y se guarda en disco con
+el sha256 de su contenido como nombre: productos que comparten imagen
+comparten archivo. La caché "products" guarda qué archivo corresponde a
+cada (URL, tamaño).
+
+El directorio tiene un tamaño máximo (MAX_BYTES); al superarlo se borran
+los archivos usados hace más tiempo (cada acierto actualiza su mtime).
+
+Si la imagen no se puede descargar o no es una imagen se sirve un
+marcador gris, y la URL no se vuelve a intentar durante BROKEN_TTL segundos.
+"""
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import socket
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import caches
+from PIL import Image, ImageOps
+
+from .images import clean_image_url
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'DIR': None,
+    'SIZES': (160, 320, 640),
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'MAX_SOURCE_BYTES': 10 * 1024 * 1024,
+    'MAX_AGE': 365 * 24 * 3600,
+    'BROKEN_TTL': 600,
+    'TIMEOUT': (3.05, 10),
+    'MAX_REDIRECTS': 3,
+    # Solo para desarrollo: permitir imágenes en localhost/redes privadas
+    'ALLOW_PRIVATE_HOSTS': False,
+}
+
+BROKEN = 'broken'
+PLACEHOLDER_COLOR = (200, 200, 200)
+
+
+class BrokenImage(Exception):
+    pass
+
+
+def get_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'PRODUCTS_THUMBNAILS', {})}
+
+
+class ThumbnailStore:
+    """
+    Archivos WEBP direccionados por contenido con expulsión LRU por tamaño.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def path_for(self, digest):
+        return self.directory / digest[:2] / f'{digest}.webp'
+
+    def get(self, digest):
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if path.exists():
+            os.utime(path)
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: otro proceso puede estar generando la misma miniatura
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        return digest
+
+    def _files(self):
+        return [path for path in self.directory.glob('*/*.webp') if path.is_file()]
+
+    def _scan_size(self):
+        return sum(path.stat().st_size for path in self._files())
+
+    def _evict(self):
+        # Los demás procesos también escriben: se recalcula con lo que hay en disco
+        files = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size = total
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = get_config()
+                directory = config['DIR'] or Path(settings.BASE_DIR) / '.cache' / 'thumbnails'
+                _store = ThumbnailStore(directory, config['MAX_BYTES'])
+    return _store
+
+
+# ---------------------------
+# DESCARGA Y REDIMENSIONADO
+# ---------------------------
+def _is_public(address):
+    return ipaddress.ip_address(address.split('%')[0]).is_global
+
+
+def _resolve(hostname, config):
+    """
+    Evita que el proxy sirva para pedir direcciones internas (SSRF): resuelve
+    el nombre y devuelve la dirección a la que conectarse, o lanza
+    BrokenImage si alguna no es pública.
+    """
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)]
+    except (socket.gaierror, UnicodeError):
+        raise BrokenImage(f'No se pudo resolver {hostname}')
+    if not addresses:
+        raise BrokenImage(f'No se pudo resolver {hostname}')
+    for address in addresses:
+        if not _is_public(address):
+            raise BrokenImage(f'{hostname} no es una dirección pública')
+    return addresses[0]
+
+
+class PinnedAdapter(HTTPAdapter):
+    """
+    Conecta con la dirección que validó _resolve en lugar de dejar que
+    urllib3 vuelva a resolver el nombre: si no, un DNS que cambia de
+    respuesta entre la comprobación y la conexión (DNS rebinding) llevaría
+    la petición a una dirección interna. El Host y el certificado (SNI) se
+    siguen comprobando contra el nombre original.
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        config = get_config()
+        if config['ALLOW_PRIVATE_HOSTS']:
+            return host_params, pool_kwargs
+        hostname = host_params['host']
+        host_params['host'] = _resolve(hostname, config)
+        if host_params['scheme'] == 'https':
+            pool_kwargs['server_hostname'] = hostname
+            pool_kwargs['assert_hostname'] = hostname
+        return host_params, pool_kwargs
+
+    def send(self, request, **kwargs):
+        request.headers.setdefault('Host', urlsplit(request.url).netloc)
+        return super().send(request, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Sesión propia de las miniaturas: sin los reintentos ni el circuit breaker
+    de la API de Platzi (una imagen rota no debe abrir el circuito del
+    catálogo) y con las conexiones fijadas a la dirección validada.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = PinnedAdapter(pool_connections=4, pool_maxsize=10, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def download(url, config=None):
+    config = config or get_config()
+    session = get_session()
+    for _ in range(config['MAX_REDIRECTS'] + 1):
+        try:
+            response = session.get(
+                url, stream=True, timeout=config['TIMEOUT'], allow_redirects=False,
+                headers={'Accept': 'image/*'},
+            )
+        except requests.exceptions.RequestException as exc:
+            raise BrokenImage(str(exc))
+        with response:
+            if response.is_redirect:
+                url = clean_image_url(urljoin(url, response.headers.get('Location', '')))
+                if url is None:
+                    raise BrokenImage('Redirección no válida')
+                continue
+            if response.status_code != 200:
+                raise BrokenImage(f'HTTP {response.status_code}')
+            if int(response.headers.get('Content-Length') or 0) > config['MAX_SOURCE_BYTES']:
+                raise BrokenImage('Imagen demasiado grande')
+            body = bytearray()
+            try:
+                for chunk in response.iter_content(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > config['MAX_SOURCE_BYTES']:
+                        raise BrokenImage('Imagen demasiado grande')
+            except requests.exceptions.RequestException as exc:
+                raise BrokenImage(str(exc))
+            return bytes(body)
+    raise BrokenImage('Demasiadas redirecciones')
+
+
+def resize(data, size):
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # En JPEG decodifica directamente a una escala cercana: mucho más rápido
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, 'WEBP', quality=80, method=4)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise BrokenImage(f'No es una imagen válida: {exc}')
+    return output.getvalue()
+
+
+def placeholder(size):
+    output = io.BytesIO()
+    Image.new('RGB', (size, size), PLACEHOLDER_COLOR).save(output, 'WEBP', quality=50)
+    return output.getvalue()
+
+
+# ---------------------------
+# API DEL MÓDULO
+# ---------------------------
+def _cache_key(url, size):
+    return f"thumb:{hashlib.sha1(url.encode()).hexdigest()}:{size}"
+
+
+def get_thumbnail(url, size):
+    """
+    Devuelve (ruta del archivo, digest, ok). ``ok`` es False si se sirve el
+    marcador porque la imagen original no está disponible.
+    """
+    config = get_config()
+    store = get_store()
+    cache = caches['products']
+
+    url = clean_image_url(url)
+    key = _cache_key(url, size) if url else None
+    digest = cache.get(key) if key else BROKEN
+    if digest and digest != BROKEN:
+        path = store.get(digest)
+        if path is not None:
+            return path, digest, True
+
+    if digest != BROKEN:
+        try:
+            digest = store.put(resize(download(url, config), size))
+        except BrokenImage as exc:
+            logger.info("Miniatura no disponible para %s: %s", url, exc)
+            cache.set(key, BROKEN, config['BROKEN_TTL'])
+        else:
+            cache.set(key, digest, timeout=None)
+            return store.path_for(digest), digest, True
+
+    digest = store.put(placeholder(size))
+    return store.path_for(digest), digest, False
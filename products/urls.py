@@ -1,22 +1,46 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Vistas de lectura: asíncronas bajo ASGI (ver Platzi_Store_Project/asgi.py)
+lectura = async_views if settings.PRODUCTS_ASYNC_VIEWS else views
 
 app_name = "products"
 
 urlpatterns = [
     path('', views.inicio, name="inicio"),
-    path('products/', views.porducts_views, name="products"),
+    path('products/', lectura.porducts_views, name="products"),
+    # Catálogo completo enviado por partes (StreamingHttpResponse)
+    path('products/todos/', views.porducts_stream_view, name="products_stream"),
+    path('products/buscar/', views.buscar_productos, name="buscar_productos"),
 
     # Crear producto
-    path('crear/', views.crear_producto_view_form, name="crear_producto"),
+    path('crear/', lectura.crear_producto_view_form, name="crear_producto"),
     path('api/crear/', views.crear_producto, name="api_crear_producto"),
 
     # Editar producto
-    path('products/editar/<int:product_id>', views.editar_producto_form, name="editar_producto_form"),
+    path('products/editar/<int:product_id>', lectura.editar_producto_form, name="editar_producto_form"),
     path('api/products/<int:product_id>/editar/', views.editar_producto, name="api_editar_producto"),
 
+    # API JSON de solo lectura del catálogo
+    path('api/products/', views.api_productos, name="api_productos"),
+    path('api/products/search/', views.api_buscar_productos, name="api_buscar_productos"),
+    path('api/products/facets/', views.api_facetas_productos, name="api_facetas_productos"),
+
+    # Operaciones en lote (crear/editar/eliminar)
+    path('api/products/bulk/', views.bulk_productos, name="api_bulk_productos"),
+
+    # Estado de una escritura diferida (outbox)
+    path('api/outbox/<str:key>/', views.estado_operacion, name="api_outbox_operacion"),
+
     # Eliminar producto
     path('products/<int:product_id>/eliminar/', views.eliminar_producto, name="eliminar_producto"),
-    path('pagar/<int:product_id>/', views.pagar_producto, name='pagar'),  # <--- NUEVA RUTA
+    path('pagar/<int:product_id>/', lectura.pagar_producto, name='pagar'),  # <--- NUEVA RUTA
+
+    # Miniatura de la imagen principal
+    path('img/<int:product_id>/<int:size>', views.miniatura, name='miniatura'),
+
+    # Métricas para Prometheus
+    path('metrics', views.metricas, name='metricas'),
 
 ]
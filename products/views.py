@@ -1,72 +1,336 @@
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.contrib.staticfiles.views import serve as serve_static
+from django.core.exceptions import RequestDataTooBig, SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
 import requests
 import json
+import mimetypes
+import os
+import secrets
+
+from . import aggregates, api, bulk, metrics, mirror, outbox, search, storage, thumbnails
+from .breaker import is_upstream_failure
+from .cache import product_cache
+from .categories import category_cache
+from .images import InvalidImages, normalize_images
+from .conditional import add_validators, listing_etag, not_modified, private_page, product_etag
+from .listing import SORT_OPTIONS, ListingQuery, ProductPage, get_product_page, iter_catalog
+from .models import OutboxOperation
+from .pagecache import anonymous_page_cache
+from .services import get_api_service
+from .signals import product_deleted, product_saved
+from .streaming import chunk_size, stream_listing
 
 # Página de inicio
+@anonymous_page_cache
 def inicio(request):
     return render(request, "inicio.html")
 
 # Listar productos
+@anonymous_page_cache
 def porducts_views(request):
     """
-    Obtiene la lista de productos desde la API y los pasa a la plantilla.
+    Obtiene una página de productos desde la API y la pasa a la plantilla.
+
+    Acepta ?page, ?limit, ?category, ?price_min, ?price_max, ?title y ?sort
+    (ver products/listing.py).
     """
+    query = ListingQuery.from_request(request)
     try:
-        response = requests.get("https://api.escuelajs.co/api/v1/products", timeout=10)
-
-        if response.status_code == 200:
-            productos = response.json()
-            return render(request, "lista_productos.html", {
-                'productos': productos,
-                'user_authenticated': request.user.is_authenticated
-            })
-        else:
-            return render(request, "lista_productos.html", {'error': f"Error en la API: {response.status_code}"})
-
+        page = get_product_page(query)
+        etag = listing_etag(request, request.user, page)
+        response = not_modified(request, etag) or render(request, "lista_productos.html", {
+            'productos': page.productos,
+            'page': page,
+            'stale': page.stale,
+            'query': query,
+            **aggregates.listing_context(category_cache.get()),
+            'sort_options': [(value, label) for value, (_, _, label) in SORT_OPTIONS.items()],
+            'user_authenticated': request.user.is_authenticated
+        })
+        return add_validators(response, request.user, etag)
+
+    except requests.exceptions.HTTPError as e:
+        return render(request, "lista_productos.html", {'error': f"Error en la API: {e.response.status_code}"}, status=502)
     except requests.exceptions.Timeout:
-        return render(request, "lista_productos.html", {'error': 'Tiempo de espera agotado al conectar con la API.'})
+        return render(request, "lista_productos.html", {'error': 'Tiempo de espera agotado al conectar con la API.'}, status=504)
     except requests.exceptions.ConnectionError:
-        return render(request, "lista_productos.html", {'error': 'Error de conexión. Verifique su conexión a internet.'})
+        return render(request, "lista_productos.html", {'error': 'Error de conexión. Verifique su conexión a internet.'}, status=503)
     except Exception as e:
-        return render(request, "lista_productos.html", {'error': f'Ocurrió un error inesperado: {str(e)}'})
+        return render(request, "lista_productos.html", {'error': f'Ocurrió un error inesperado: {str(e)}'}, status=500)
+
+
+# Listar todos los productos (streaming)
+def porducts_stream_view(request):
+    """
+    Todo el catálogo filtrado en una sola página, enviado por partes (ver
+    products/streaming.py). Acepta los mismos filtros y orden que el listado.
+    """
+    query = ListingQuery.from_request(request)
+    try:
+        productos, stale = iter_catalog(query, chunk_size=chunk_size())
+    except requests.exceptions.HTTPError as e:
+        return render(request, "lista_productos.html", {'error': f"Error en la API: {e.response.status_code}"}, status=502)
+    except requests.exceptions.Timeout:
+        return render(request, "lista_productos.html", {'error': 'Tiempo de espera agotado al conectar con la API.'}, status=504)
+    except requests.exceptions.ConnectionError:
+        return render(request, "lista_productos.html", {'error': 'Error de conexión. Verifique su conexión a internet.'}, status=503)
+
+    response = StreamingHttpResponse(stream_listing(request, productos, {
+        'stale': stale,
+        'query': query,
+        'categorias': category_cache.get(),
+        'sort_options': [(value, label) for value, (_, _, label) in SORT_OPTIONS.items()],
+    }), content_type='text/html; charset=utf-8')
+    return add_validators(response, request.user, None)
+
+
+# Buscar productos
+def buscar_productos(request):
+    """
+    Resultados del buscador local (products/search.py) ordenados por
+    relevancia, con la plantilla y la paginación del listado.
+    """
+    query = ListingQuery.from_request(request)
+    texto = request.GET.get('q', '').strip()
+    offset = (query.page - 1) * query.limit
+    try:
+        productos, total = search.search(texto, limit=query.limit, offset=offset)
+    except requests.exceptions.RequestException:
+        return render(request, "lista_productos.html", {
+            'error': 'El buscador no está disponible en este momento.',
+            'query': query,
+            'busqueda': texto,
+        }, status=503)
+    page = ProductPage(
+        productos,
+        number=query.page,
+        limit=query.limit,
+        has_next=offset + len(productos) < total,
+        count=total,
+        num_pages=max(1, -(-total // query.limit)),
+    )
+    return render(request, "lista_productos.html", {
+        'productos': productos,
+        'page': page,
+        'query': query,
+        'busqueda': texto,
+    })
+
+
+# API JSON de productos (solo lectura)
+@require_http_methods(["GET"])
+def api_productos(request):
+    """
+    Listado en JSON para clientes móviles: ?fields, ?cursor, ?limit y los
+    mismos filtros y orden que el listado HTML (ver products/api.py).
+    """
+    query = ListingQuery.from_request(request)
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+        data = api.product_list(query, fields, request.GET.get('cursor'))
+    except api.InvalidParameter as e:
+        return api.json_response({'success': False, 'error': str(e)}, status=400)
+    except requests.exceptions.HTTPError as e:
+        return api.json_response({'success': False, 'error': f'Error en la API: {e.response.status_code}'}, status=502)
+    except requests.exceptions.RequestException:
+        return api.json_response({'success': False, 'error': 'No se pudo conectar con la API.'}, status=503)
+    return api.conditional_json_response(request, {'success': True, **data})
+
+
+@require_http_methods(["GET"])
+def api_facetas_productos(request):
+    """
+    Agregados del catálogo: productos por categoría, estadísticas de precio
+    y rangos de precio (ver products/aggregates.py).
+    """
+    facets = aggregates.get_aggregates()
+    if facets is None:
+        response = api.json_response(
+            {'success': False, 'error': 'Los agregados se están calculando; inténtelo en unos segundos.'}, status=503,
+        )
+        response.headers['Retry-After'] = '5'
+        return response
+    return api.conditional_json_response(request, {'success': True, **facets})
+
+
+@require_http_methods(["GET"])
+def api_buscar_productos(request):
+    query = ListingQuery.from_request(request)
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+        data = api.search_results(request.GET.get('q', ''), fields, query.limit, request.GET.get('cursor'))
+    except api.InvalidParameter as e:
+        return api.json_response({'success': False, 'error': str(e)}, status=400)
+    except requests.exceptions.RequestException:
+        return api.json_response({'success': False, 'error': 'El buscador no está disponible en este momento.'}, status=503)
+    return api.json_response({'success': True, **data})
+
+
+# Miniatura de la imagen principal (ver products/thumbnails.py)
+def miniatura(request, product_id, size):
+    config = thumbnails.get_config()
+    if size not in config['SIZES']:
+        raise Http404("Tamaño no disponible")
+    try:
+        producto = _obtener_producto(product_id)
+    except requests.exceptions.RequestException:
+        raise Http404("Producto no encontrado")
+
+    images = producto.get('images') or []
+    url = images[0] if images else None
+    path, digest, ok = thumbnails.get_thumbnail(url, size)
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            archivo = open(path, 'rb')
+        except FileNotFoundError:
+            # Otro proceso la expulsó del directorio después de get_thumbnail: se regenera
+            path, digest, ok = thumbnails.get_thumbnail(url, size)
+            etag = f'"{digest}"'
+            archivo = open(path, 'rb')
+        response = FileResponse(archivo, content_type='image/webp')
+    response.headers['ETag'] = etag
+    if not ok:
+        patch_cache_control(response, public=True, max_age=config['BROKEN_TTL'])
+    elif 'v' in request.GET:
+        # Las plantillas añaden ?v=<updatedAt>: al editar el producto cambia la URL
+        patch_cache_control(response, public=True, max_age=config['MAX_AGE'], immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=24 * 3600)
+    return response
+
+
+# Métricas en formato Prometheus (ver products/metrics.py)
+@require_http_methods(["GET"])
+def metricas(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        auth = request.headers.get('Authorization', '')
+        if not secrets.compare_digest(auth, f'Bearer {token}'):
+            return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    elif not settings.DEBUG:
+        # Sin METRICS_TOKEN configurado no se exponen en producción
+        return HttpResponse(status=403)
+    response = HttpResponse(metrics.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+# Archivos estáticos de STATIC_ROOT (ver products/storage.py)
+@require_http_methods(["GET", "HEAD"])
+def archivo_estatico(request, path):
+    if settings.DEBUG:
+        # En desarrollo, directamente de products/static sin collectstatic
+        return serve_static(request, path)
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Archivo no encontrado")
+    if not os.path.isfile(full_path):
+        raise Http404("Archivo no encontrado")
+
+    encoded_path, encoding = storage.encoded_variant(full_path, request.headers.get('Accept-Encoding', ''))
+    stat = os.stat(encoded_path)
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type, _ = mimetypes.guess_type(full_path)
+        response = FileResponse(
+            open(encoded_path, 'rb'), content_type=content_type or 'application/octet-stream',
+            filename=os.path.basename(full_path),
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if storage.is_hashed(path):
+        # El nombre cambia con el contenido: se puede guardar para siempre
+        patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.STATIC_MAX_AGE)
+    return response
+
+
+def _obtener_producto(product_id):
+    """
+    Lee el producto del espejo local si está fresco; si no, de la caché/API.
+    """
+    if mirror.is_fresh():
+        producto = mirror.get_product(product_id)
+        if producto is not None:
+            return producto
+    try:
+        return product_cache.get_product(product_id)
+    except requests.exceptions.RequestException as exc:
+        # Con la API caída, una copia vieja del espejo es mejor que un error
+        producto = mirror.get_product(product_id) if is_upstream_failure(exc) else None
+        if producto is None:
+            raise
+        return producto
 
 
 # ---------------------------
-# CREAR PRODUCTO
+# OUTBOX (ver products/outbox.py)
 # ---------------------------
-@login_required
-def crear_producto_view_form(request):
+def _encolar(request, op, **kwargs):
     """
-    Obtiene la lista de categorías desde la API y renderiza
-    el formulario para crear un nuevo producto.
+    Guarda la escritura en el outbox y responde 202 con su estado. La
+    cabecera Idempotency-Key evita duplicados si el cliente reenvía.
     """
     try:
-        response = requests.get("https://api.escuelajs.co/api/v1/categories", timeout=10)
-        response.raise_for_status()
-        categorias = response.json()
+        operacion, _ = outbox.enqueue(op, request.user, key=request.headers.get('Idempotency-Key'), **kwargs)
+    except outbox.InvalidIdempotencyKey as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except outbox.IdempotencyConflict as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    return JsonResponse({'success': True, 'pending': True, 'operation': outbox.describe(operacion)}, status=202)
+
 
-        categorias_limpias = [
-            {'id': cat['id'], 'name': cat['name']}
-            for cat in categorias
-        ]
+@login_required
+@require_http_methods(["GET"])
+def estado_operacion(request, key):
+    """
+    Estado de una escritura del outbox (pending, processing, done o failed).
+    """
+    operacion = OutboxOperation.objects.filter(idempotency_key=key).first()
+    if operacion is None or (operacion.created_by_id != request.user.pk and not request.user.is_staff):
+        return JsonResponse({'success': False, 'error': 'Operación no encontrada.'}, status=404)
+    response = JsonResponse({'success': True, 'operation': outbox.describe(operacion)})
+    patch_cache_control(response, no_store=True)
+    return response
 
-        return render(request, "crear_producto.html", {'categorias': categorias_limpias})
 
-    except requests.exceptions.RequestException as e:
-        messages.error(request, f"No se pudieron cargar las categorías. Error: {e}")
-        return render(request, "crear_producto.html", {'categorias': []})
+# ---------------------------
+# CREAR PRODUCTO
+# ---------------------------
+@login_required
+def crear_producto_view_form(request):
+    """
+    Renderiza el formulario para crear un nuevo producto con las
+    categorías en memoria (ver products/categories.py).
+    """
+    categorias = category_cache.get()
+    if not categorias:
+        messages.error(request, "No se pudieron cargar las categorías.")
+    return private_page(render(request, "crear_producto.html", {'categorias': categorias}))
 
 
 @login_required
 @require_http_methods(["POST"])
 def crear_producto(request):
     """
-    Procesa la creación de un nuevo producto usando la API externa.
+    Procesa la creación de un nuevo producto usando la API externa (o la
+    deja en el outbox, ver _encolar).
     """
     try:
         data = json.loads(request.body)
@@ -84,21 +348,22 @@ def crear_producto(request):
             "price": float(precio),
             "description": descripcion,
             "categoryId": int(categoria_id),
-            "images": [imagen_url],
+            "images": normalize_images(imagen_url),
         }
 
-        subir_respuesta = requests.post("https://api.escuelajs.co/api/v1/products/", json=productos_data, timeout=10)
-        subir_respuesta.raise_for_status()
-
-        if subir_respuesta.status_code == 201:
-            datos = subir_respuesta.json()
-            return JsonResponse({'success': True, 'data': datos})
-        else:
-            return JsonResponse({
-                'success': False,
-                'error': f'Error en la API: {subir_respuesta.status_code} - {subir_respuesta.text}'
-            }, status=subir_respuesta.status_code)
-
+        if outbox.enabled():
+            return _encolar(request, OutboxOperation.CREATE, data=productos_data)
+        datos = get_api_service().create_product(productos_data)
+        product_saved.send(sender=None, producto=datos)
+        return JsonResponse({'success': True, 'data': datos})
+
+    except requests.exceptions.HTTPError as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Error en la API: {e.response.status_code} - {e.response.text}'
+        }, status=e.response.status_code)
+    except InvalidImages as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except (json.JSONDecodeError, ValueError):
         return JsonResponse({'success': False, 'error': 'Formato de datos no válido.'}, status=400)
     except requests.exceptions.RequestException as e:
@@ -114,10 +379,11 @@ def editar_producto_form(request, product_id):
     Obtiene los datos de un producto específico para prellenar el formulario de edición.
     """
     try:
-        response = requests.get(f"https://api.escuelajs.co/api/v1/products/{product_id}", timeout=10)
-        response.raise_for_status()
-        producto = response.json()
-        return render(request, "editar_producto.html", {'producto': producto})
+        producto = _obtener_producto(product_id)
+        return private_page(render(request, "editar_producto.html", {
+            'producto': producto,
+            'categorias': category_cache.get(),
+        }))
     except requests.exceptions.RequestException as e:
         messages.error(request, f"Error al obtener el producto para editar: {e}")
         return redirect('products:products')
@@ -149,17 +415,22 @@ def editar_producto(request, product_id):
             "price": float(price),
             "description": description,
             "categoryId": int(category_id),
-            "images": images if isinstance(images, list) else [images],
+            "images": normalize_images(images),
         }
 
-        subir_respuesta = requests.put(f"https://api.escuelajs.co/api/v1/products/{product_id}", json=productos_data, timeout=10)
-        subir_respuesta.raise_for_status()
-
-        if subir_respuesta.status_code == 200:
-            return JsonResponse({'success': True, 'data': subir_respuesta.json()})
+        if outbox.enabled():
+            return _encolar(request, OutboxOperation.UPDATE, data=productos_data, product_id=product_id)
+        datos = get_api_service().update_product(product_id, productos_data)
+        product_saved.send(sender=None, producto=datos, product_id=product_id)
+        return JsonResponse({'success': True, 'data': datos})
 
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'Formato de datos JSON no válido.'}, status=400)
+    except InvalidImages as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    except (TypeError, ValueError):
+        # Precio o categoría que no son números
+        return JsonResponse({'success': False, 'error': 'Formato de datos no válido.'}, status=400)
     except requests.exceptions.RequestException as e:
         return JsonResponse({'success': False, 'error': f'Error de conexión con la API: {str(e)}'}, status=500)
 
@@ -173,11 +444,23 @@ def eliminar_producto(request, product_id):
     """
     Elimina un producto existente usando la API externa.
     """
+    if outbox.enabled():
+        try:
+            outbox.enqueue(
+                OutboxOperation.DELETE, request.user, product_id=product_id,
+                key=request.headers.get('Idempotency-Key'),
+            )
+        except (outbox.InvalidIdempotencyKey, outbox.IdempotencyConflict) as e:
+            messages.error(request, f"No se pudo eliminar el producto: {e}")
+        else:
+            messages.success(request, "El producto se eliminará en unos segundos.")
+        return redirect('products:products')
+
     try:
-        response = requests.delete(f"https://api.escuelajs.co/api/v1/products/{product_id}", timeout=10)
-        response.raise_for_status()
+        eliminado = get_api_service().delete_product(product_id)
 
-        if response.status_code == 200:
+        if eliminado is not False:
+            product_deleted.send(sender=None, product_id=product_id)
             messages.success(request, "Producto eliminado exitosamente.")
         else:
             messages.error(request, "Hubo un problema al eliminar el producto.")
@@ -188,21 +471,107 @@ def eliminar_producto(request, product_id):
     return redirect('products:products')
 
 
+# ---------------------------
+# OPERACIONES EN LOTE
+# ---------------------------
+def _leer_operaciones(request):
+    """
+    Lee un arreglo JSON o, con Content-Type application/x-ndjson, una
+    operación por línea (leyendo el cuerpo línea a línea).
+
+    El NDJSON se deja de leer en cuanto pasa de bulk.max_items() líneas
+    (bulk.TooManyOperations) o de DATA_UPLOAD_MAX_MEMORY_SIZE bytes
+    (RequestDataTooBig, 400), igual que request.body.
+    """
+    if request.content_type == 'application/x-ndjson':
+        max_items = bulk.max_items()
+        remaining = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        operaciones = []
+        while True:
+            line = request.readline() if remaining is None else request.readline(remaining + 1)
+            if not line:
+                return operaciones
+            if remaining is not None:
+                remaining -= len(line)
+                if remaining < 0:
+                    raise RequestDataTooBig('El cuerpo supera DATA_UPLOAD_MAX_MEMORY_SIZE.')
+            if not line.strip():
+                continue
+            if len(operaciones) >= max_items:
+                raise bulk.TooManyOperations()
+            operaciones.append(json.loads(line))
+    operaciones = json.loads(request.body)
+    if not isinstance(operaciones, list):
+        raise ValueError('Se esperaba un arreglo de operaciones.')
+    return operaciones
+
+
+@login_required
+@require_http_methods(["POST"])
+def bulk_productos(request):
+    """
+    Crea, actualiza y elimina varios productos en una sola petición
+    (ver products/bulk.py para el formato de cada operación).
+    """
+    try:
+        operaciones = _leer_operaciones(request)
+    except bulk.TooManyOperations:
+        operaciones = None
+    except (json.JSONDecodeError, UnicodeDecodeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Formato de datos no válido.'}, status=400)
+
+    max_items = bulk.max_items()
+    if not operaciones or len(operaciones) > max_items:
+        return JsonResponse({
+            'success': False,
+            'error': f'Se requieren entre 1 y {max_items} operaciones.'
+        }, status=400)
+
+    # Validamos todo antes de enviar nada a la API
+    validas, errores = [], []
+    for index, raw in enumerate(operaciones):
+        operacion, error = bulk.validate_operation(raw)
+        if error:
+            errores.append({'index': index, 'error': error})
+        validas.append(operacion)
+    if errores:
+        return JsonResponse({'success': False, 'errors': errores}, status=400)
+
+    resultados = bulk.dispatch(validas)
+
+    # Las señales (caché, espejo) se envían desde este hilo, no desde el pool
+    for operacion, resultado in zip(validas, resultados):
+        if not resultado['success']:
+            continue
+        if operacion['op'] == 'delete':
+            product_deleted.send(sender=None, product_id=operacion['id'])
+        else:
+            product_saved.send(sender=None, producto=resultado['data'], product_id=operacion.get('id'))
+
+    fallidas = sum(1 for resultado in resultados if not resultado['success'])
+    return JsonResponse({
+        'success': fallidas == 0,
+        'summary': {'total': len(resultados), 'succeeded': len(resultados) - fallidas, 'failed': fallidas},
+        'results': resultados,
+    })
+
+
 # ---------------------------
 # PAGAR PRODUCTO (PUBLICO)
 # ---------------------------
+@anonymous_page_cache
 def pagar_producto(request, product_id):
     """
     Muestra el formulario de pago para un producto específico.
     """
     try:
         # Llamada a la API para obtener el producto
-        response = requests.get(f"https://api.escuelajs.co/api/v1/products/{product_id}", timeout=10)
-        response.raise_for_status()
-        producto = response.json()
+        producto = _obtener_producto(product_id)
+        etag = product_etag(request, request.user, producto)
 
         # Enviamos el producto al template
-        return render(request, "pagar_producto.html", {'producto': producto})
+        response = not_modified(request, etag) or render(request, "pagar_producto.html", {'producto': producto})
+        return add_validators(response, request.user, etag)
 
     except requests.exceptions.RequestException as e:
         messages.error(request, f"Error al obtener el producto para pago: {e}")